@@ -0,0 +1,300 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import asyncio
+import threading
+from collections import OrderedDict, Counter
+
+MEMORIA = "memoria"
+DISCO = "disco"
+
+
+def chave_resposta(modelo, prompt, parametros=None):
+    """Chave do cache: hash de (modelo, prompt, parâmetros de geração)."""
+    conteudo = json.dumps([modelo, prompt, parametros or {}], sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(conteudo.encode("utf-8")).hexdigest()
+
+
+class CacheMemoria:
+    """Cache LRU em memória com prazo de validade (TTL) por item."""
+
+    def __init__(self, capacidade=1024, ttl=None):
+        self.capacidade = capacidade
+        self.ttl = ttl
+        self._itens = OrderedDict()
+
+    def __len__(self):
+        return len(self._itens)
+
+    def obter(self, chave):
+        item = self._itens.get(chave)
+        if item is None:
+            return None
+        resposta, expira = item
+        if expira is not None and expira < time.time():
+            del self._itens[chave]
+            return None
+        self._itens.move_to_end(chave)
+        return resposta
+
+    def guardar(self, chave, resposta, expira=None):
+        if expira is None and self.ttl is not None:
+            expira = time.time() + self.ttl
+        self._itens[chave] = (resposta, expira)
+        self._itens.move_to_end(chave)
+        while len(self._itens) > self.capacidade:
+            self._itens.popitem(last=False)
+
+    def limpar(self):
+        self._itens.clear()
+
+
+class CacheDisco:
+    """
+    Cache persistente em SQLite: sobrevive a reinícios do serviço. Itens
+    vencidos são descartados e, acima de `tamanho_maximo` bytes, os menos
+    usados recentemente são removidos primeiro (até sobrar `fracao_despejo` do
+    máximo). O banco (em modo WAL) pode ser lido e escrito por vários
+    processos ao mesmo tempo; cada processo abre a sua própria conexão,
+    inclusive depois de um fork.
+
+    O tamanho total é mantido pelo próprio banco (em uma tabela de uma linha,
+    atualizada por gatilhos), então uma gravação não soma a tabela inteira. Os
+    acessos de cada leitura são acumulados em memória e gravados juntos quando
+    somam `acessos_por_gravacao` itens ou têm mais de `intervalo_acessos`
+    segundos, na próxima gravação ou ao fechar o cache; as outras leituras não
+    fazem commit.
+    """
+
+    def __init__(self, caminho, ttl=None, tamanho_maximo=256 * 1024 * 1024, tabela="respostas",
+                 acessos_por_gravacao=64, intervalo_acessos=60, fracao_despejo=0.9):
+        self.caminho = caminho
+        self.ttl = ttl
+        self.tamanho_maximo = tamanho_maximo
+        self.tabela = tabela
+        self.acessos_por_gravacao = acessos_por_gravacao
+        self.intervalo_acessos = intervalo_acessos
+        self.fracao_despejo = fracao_despejo
+        diretorio = os.path.dirname(caminho)
+        if diretorio:
+            os.makedirs(diretorio, exist_ok=True)
+        self._trava = threading.Lock()
+        self._conexao_aberta = None
+        self._pid = None
+        self._acessos = {}  # chave -> hora do último acesso ainda não gravada
+        self._primeiro_acesso = 0.0
+
+    @property
+    def _conexao(self):
+        # Aberta sob demanda, para que o cache possa ser fechado e reaberto; uma
+        # conexão herdada de outro processo não é usada
+        if self._conexao_aberta is None or self._pid != os.getpid():
+            conexao = sqlite3.connect(self.caminho, check_same_thread=False)
+            conexao.execute("PRAGMA journal_mode=WAL")
+            tabela = self.tabela
+            # Em uma transação, para que o total parta da soma dos itens já guardados
+            conexao.executescript(f"""
+                BEGIN IMMEDIATE;
+                CREATE TABLE IF NOT EXISTS {tabela} (
+                    chave TEXT PRIMARY KEY, resposta TEXT NOT NULL,
+                    expira REAL, acessado REAL NOT NULL, tamanho INTEGER NOT NULL);
+                CREATE INDEX IF NOT EXISTS {tabela}_acessado ON {tabela} (acessado);
+                CREATE TABLE IF NOT EXISTS {tabela}_total (
+                    id INTEGER PRIMARY KEY CHECK (id = 0), tamanho INTEGER NOT NULL);
+                INSERT OR IGNORE INTO {tabela}_total SELECT 0, COALESCE(SUM(tamanho), 0) FROM {tabela};
+                CREATE TRIGGER IF NOT EXISTS {tabela}_inserido AFTER INSERT ON {tabela} BEGIN
+                    UPDATE {tabela}_total SET tamanho = tamanho + new.tamanho;
+                END;
+                CREATE TRIGGER IF NOT EXISTS {tabela}_removido AFTER DELETE ON {tabela} BEGIN
+                    UPDATE {tabela}_total SET tamanho = tamanho - old.tamanho;
+                END;
+                CREATE TRIGGER IF NOT EXISTS {tabela}_alterado AFTER UPDATE OF tamanho ON {tabela} BEGIN
+                    UPDATE {tabela}_total SET tamanho = tamanho - old.tamanho + new.tamanho;
+                END;
+                COMMIT;
+            """)
+            self._conexao_aberta = conexao
+            self._pid = os.getpid()
+            self._acessos = {}
+        return self._conexao_aberta
+
+    def obter(self, chave):
+        """Devolve (resposta, expira) ou None."""
+        agora = time.time()
+        with self._trava:
+            try:
+                linha = self._conexao.execute(
+                    f"SELECT resposta, expira FROM {self.tabela} WHERE chave = ?", (chave,)
+                ).fetchone()
+                if linha is None:
+                    return None
+                if linha[1] is not None and linha[1] < agora:
+                    self._acessos.pop(chave, None)
+                    self._conexao.execute(f"DELETE FROM {self.tabela} WHERE chave = ?", (chave,))
+                    self._conexao.commit()
+                    return None
+                if not self._acessos:
+                    self._primeiro_acesso = agora
+                self._acessos[chave] = agora
+                if len(self._acessos) >= self.acessos_por_gravacao or agora - self._primeiro_acesso > self.intervalo_acessos:
+                    self._gravar_acessos()
+                    self._conexao.commit()
+            except sqlite3.Error:
+                self._desfazer()
+                raise
+        return linha
+
+    def guardar(self, chave, resposta):
+        agora = time.time()
+        expira = agora + self.ttl if self.ttl is not None else None
+        with self._trava:
+            self._acessos.pop(chave, None)
+            try:
+                self._gravar_acessos()
+                # Um upsert (e não INSERT OR REPLACE), para que o gatilho de alteração mantenha o total
+                self._conexao.execute(
+                    f"INSERT INTO {self.tabela} (chave, resposta, expira, acessado, tamanho) VALUES (?, ?, ?, ?, ?)"
+                    " ON CONFLICT (chave) DO UPDATE SET resposta = excluded.resposta, expira = excluded.expira,"
+                    " acessado = excluded.acessado, tamanho = excluded.tamanho",
+                    (chave, resposta, expira, agora, len(resposta.encode("utf-8"))),
+                )
+                if self._tamanho() > self.tamanho_maximo:
+                    self._despejar(agora)
+                self._conexao.commit()
+            except sqlite3.Error:
+                self._desfazer()
+                raise
+        return expira
+
+    def _desfazer(self):
+        # Sem o rollback, o que já tinha sido feito (como as horas de acesso gravadas)
+        # ficaria na transação aberta e entraria no commit de outra operação. As
+        # horas de acesso assim perdidas só adiantam um pouco o despejo dos itens
+        if self._conexao_aberta is not None:
+            try:
+                self._conexao_aberta.rollback()
+            except sqlite3.Error:
+                pass
+
+    def _tamanho(self):
+        return self._conexao.execute(f"SELECT tamanho FROM {self.tabela}_total").fetchone()[0]
+
+    def _gravar_acessos(self):
+        # Os acessos acumulados entram na transação em andamento; quem chama faz o commit
+        if self._acessos:
+            self._conexao.executemany(
+                f"UPDATE {self.tabela} SET acessado = MAX(acessado, ?) WHERE chave = ?",
+                [(acessado, chave) for chave, acessado in self._acessos.items()],
+            )
+            self._acessos.clear()
+
+    def _despejar(self, agora):
+        self._conexao.execute(f"DELETE FROM {self.tabela} WHERE expira IS NOT NULL AND expira < ?", (agora,))
+        excesso = self._tamanho() - self.tamanho_maximo * self.fracao_despejo
+        if excesso <= 0:
+            return
+        removidas = []
+        cursor = self._conexao.execute(f"SELECT chave, tamanho FROM {self.tabela} ORDER BY acessado")
+        while excesso > 0:
+            linhas = cursor.fetchmany(256)
+            if not linhas:
+                break
+            for chave, tamanho in linhas:
+                removidas.append((chave,))
+                excesso -= tamanho
+                if excesso <= 0:
+                    break
+        cursor.close()
+        self._conexao.executemany(f"DELETE FROM {self.tabela} WHERE chave = ?", removidas)
+
+    def limpar(self):
+        with self._trava:
+            self._acessos.clear()
+            try:
+                self._conexao.execute(f"DELETE FROM {self.tabela}")
+                self._conexao.commit()
+            except sqlite3.Error:
+                self._desfazer()
+                raise
+
+    def fechar(self):
+        with self._trava:
+            if self._conexao_aberta is not None and self._pid == os.getpid():
+                try:
+                    self._gravar_acessos()
+                    self._conexao_aberta.commit()
+                except sqlite3.Error:
+                    pass
+                self._conexao_aberta.close()
+            self._conexao_aberta = None
+            self._acessos = {}
+
+
+class CacheRespostas:
+    """
+    Cache de respostas do modelo em dois níveis: um LRU em memória, consultado
+    primeiro, e um nível opcional em disco (SQLite). Acertos no disco são
+    promovidos para a memória. As operações de disco rodam fora do event loop.
+    `estatisticas` conta os acertos de cada nível, as faltas, as gravações e os
+    erros do disco. Um erro do banco (travado por tempo demais, disco cheio)
+    não interrompe o pedido: na leitura conta como falta e, na gravação, a
+    resposta fica só na memória.
+    """
+
+    def __init__(self, caminho=None, capacidade=1024, ttl=7 * 24 * 3600, tamanho_maximo=256 * 1024 * 1024):
+        self.memoria = CacheMemoria(capacidade, ttl)
+        self.disco = CacheDisco(caminho, ttl, tamanho_maximo) if caminho else None
+        self.estatisticas = Counter()
+
+    @classmethod
+    def do_ambiente(cls):
+        """Configura o cache com as variáveis QWEN_CACHE, QWEN_CACHE_TTL, QWEN_CACHE_ITENS e QWEN_CACHE_MB."""
+        ambiente = os.environ
+        ttl = float(ambiente.get("QWEN_CACHE_TTL", 7 * 24 * 3600))
+        return cls(
+            caminho=ambiente.get("QWEN_CACHE", os.path.join("cache", "respostas.sqlite3")) or None,
+            capacidade=int(ambiente.get("QWEN_CACHE_ITENS", 1024)),
+            ttl=ttl if ttl > 0 else None,
+            tamanho_maximo=int(float(ambiente.get("QWEN_CACHE_MB", 256)) * 1024 * 1024),
+        )
+
+    async def obter(self, chave):
+        """Devolve (resposta, nível) ou (None, None) se a chave não está no cache."""
+        resposta = self.memoria.obter(chave)
+        if resposta is not None:
+            self.estatisticas["acertos_" + MEMORIA] += 1
+            return resposta, MEMORIA
+        item = None
+        if self.disco is not None:
+            try:
+                item = await asyncio.to_thread(self.disco.obter, chave)
+            except sqlite3.Error:
+                self.estatisticas["erros"] += 1
+        if item is None:
+            self.estatisticas["faltas"] += 1
+            return None, None
+        resposta, expira = item
+        self.memoria.guardar(chave, resposta, expira)
+        self.estatisticas["acertos_" + DISCO] += 1
+        return resposta, DISCO
+
+    async def guardar(self, chave, resposta):
+        expira = None
+        if self.disco is not None:
+            try:
+                expira = await asyncio.to_thread(self.disco.guardar, chave, resposta)
+            except sqlite3.Error:
+                self.estatisticas["erros"] += 1
+        self.memoria.guardar(chave, resposta, expira)
+        self.estatisticas["gravacoes"] += 1
+
+    def limpar(self):
+        self.memoria.limpar()
+        if self.disco is not None:
+            self.disco.limpar()
+
+    def fechar(self):
+        if self.disco is not None:
+            self.disco.fechar()
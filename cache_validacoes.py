@@ -0,0 +1,177 @@
+import os
+import json
+import sqlite3
+import hashlib
+from collections import Counter
+
+from relatorio import Relatorio
+from cache_respostas import CacheDisco
+
+# Muda quando o validador passa a dar resultados diferentes para a mesma entrada
+# (ou a chave muda), para que resultados antigos não sejam reaproveitados
+VERSAO = 2
+
+# Eventos que dependem do ambiente (Graphviz instalado ou não), e não da entrada.
+# erro_processamento também fica de fora: a mensagem pode repetir a linha como
+# foi enviada (com os espaços do início), e uma entrada mal formada falha logo
+_NAO_GUARDAR = {"graphviz_ausente", "erro_validacao", "erro_processamento"}
+
+
+def normalizar_passos(passos):
+    """
+    Passos sem linhas em branco e sem os espaços do início e do fim de cada
+    linha, separados por "\n". `validar` ignora essas diferenças (cada passo é
+    lido sem elas), então o relatório e o grafo são os mesmos. Os espaços dentro
+    de uma linha são mantidos, pois o texto do passo aparece no relatório e no grafo.
+    """
+    linhas = (linha.strip() for linha in passos.splitlines())
+    return "\n".join(linha for linha in linhas if linha)
+
+
+def chave_validacao(premissas_e_conclusao, passos, renderizar, verificar_sequente):
+    """Chave do cache: hash da entrada normalizada e das opções que mudam o resultado."""
+    conteudo = json.dumps(
+        [VERSAO, premissas_e_conclusao.strip(), normalizar_passos(passos), renderizar, verificar_sequente],
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(conteudo.encode("utf-8")).hexdigest()
+
+
+class CacheValidacoes:
+    """
+    Cache persistente (SQLite) de resultados inteiros de `validar`, endereçado
+    pelo conteúdo: entradas iguais, ou que só diferem nas quebras de linha,
+    nas linhas em branco e nos espaços no início e no fim de cada linha, têm a
+    mesma chave (veja `normalizar_passos`); um acerto devolve o mesmo
+    relatório que a validação da entrada daria. Guarda a validade, o relatório completo e a
+    referência ao grafo (o código DOT no modo "lazy" ou a chave do SVG em
+    `grafo.cache_grafos` no modo "eager"); um acerto não lê as fórmulas, não
+    verifica regras e não executa o Graphviz.
+
+    Itens mais velhos que `ttl` segundos são descartados e, acima de
+    `tamanho_maximo` bytes, os usados há mais tempo saem primeiro. Vários
+    processos podem usar o mesmo arquivo ao mesmo tempo. O armazenamento é o
+    CacheDisco de `cache_respostas`: uma gravação não percorre a tabela e um
+    acerto não faz commit (a hora do acesso é gravada depois, em lote, e por
+    isso o cache deve ser fechado com `fechar`). Falhas do banco
+    (por exemplo, travado por tempo demais) contam como faltas e não
+    interrompem a validação.
+    """
+
+    def __init__(self, caminho, ttl=30 * 24 * 3600, tamanho_maximo=256 * 1024 * 1024):
+        self.disco = CacheDisco(caminho, ttl, tamanho_maximo, tabela="validacoes")
+        self.estatisticas = Counter()
+
+    @classmethod
+    def do_ambiente(cls):
+        """Configura o cache com VALIDAR_CACHE (arquivo), VALIDAR_CACHE_TTL (segundos) e VALIDAR_CACHE_MB."""
+        ambiente = os.environ
+        ttl = float(ambiente.get("VALIDAR_CACHE_TTL", 30 * 24 * 3600))
+        return cls(
+            ambiente["VALIDAR_CACHE"],
+            ttl=ttl if ttl > 0 else None,
+            tamanho_maximo=int(float(ambiente.get("VALIDAR_CACHE_MB", 256)) * 1024 * 1024),
+        )
+
+    @staticmethod
+    def chave(premissas_e_conclusao, passos, renderizar, verificar_sequente):
+        return chave_validacao(premissas_e_conclusao, passos, renderizar, verificar_sequente)
+
+    def obter(self, chave):
+        """Devolve (valido, relatorio, caminho_grafo) guardado, ou None."""
+        try:
+            item = self.disco.obter(chave)
+        except sqlite3.Error:
+            self.estatisticas["erros"] += 1
+            item = None
+        if item is None:
+            self.estatisticas["faltas"] += 1
+            return None
+
+        dados = json.loads(item[0])
+        caminho_grafo = None
+        if "fonte" in dados:
+            from grafo import GrafoSVG
+            caminho_grafo = GrafoSVG(dados["fonte"])
+        elif "svg" in dados:
+            from grafo import cache_grafos
+            caminho_grafo = cache_grafos.obter(dados["svg"])
+            if caminho_grafo is None:
+                # O SVG saiu do cache de grafos: a dedução é validada de novo
+                self.estatisticas["faltas"] += 1
+                return None
+        self.estatisticas["acertos"] += 1
+        return dados["valido"], Relatorio.de_estado(dados["relatorio"]), caminho_grafo
+
+    def guardar(self, chave, valido, relatorio, caminho_grafo):
+        if any(evento.codigo in _NAO_GUARDAR for evento in relatorio.eventos):
+            return
+        dados = {"valido": valido, "relatorio": relatorio.para_estado()}
+        if hasattr(caminho_grafo, "fonte"):
+            dados["fonte"] = caminho_grafo.fonte
+        elif caminho_grafo is not None:
+            dados["svg"] = os.path.splitext(os.path.basename(os.fspath(caminho_grafo)))[0]
+        try:
+            self.disco.guardar(chave, json.dumps(dados, ensure_ascii=False, separators=(",", ":")))
+        except sqlite3.Error:
+            self.estatisticas["erros"] += 1
+            return
+        self.estatisticas["gravacoes"] += 1
+
+    def limpar(self):
+        self.disco.limpar()
+
+    def fechar(self):
+        self.disco.fechar()
+
+
+def conferir(quantidade=50):
+    """
+    Confere que um acerto devolve o mesmo que `validar(..., cache=False)` para
+    a mesma dedução reenviada com outros espaços, quebras de linha e linhas em
+    branco, e que espaços dentro de um passo não dão acerto. Devolve a lista
+    de divergências.
+    """
+    import tempfile
+    from motor_inferencia import validar
+    from gerador_provas import GeradorProvas
+
+    def variacoes(passos):
+        linhas = passos.splitlines()
+        yield "\r\n".join(f"  {linha}   " for linha in linhas) + "\r\n"
+        yield "\n\n" + "\n\n".join(f"\t{linha}" for linha in linhas) + "\n  \n"
+
+    divergencias = []
+    with tempfile.TemporaryDirectory() as pasta:
+        cache = CacheValidacoes(os.path.join(pasta, "validacoes.sqlite3"))
+        for indice in range(quantidade):
+            gerador = GeradorProvas(f"conferir:{indice}", passos=12, defeitos=indice % 3)
+            sequente, passos = gerador.sequente, "\n".join(gerador.linhas())
+            entradas = [(sequente, passos), *((f" {sequente} ", variacao) for variacao in variacoes(passos))]
+            # Um passo com espaços a mais por dentro é outra entrada
+            primeira, resto = passos.split("\n", 1)
+            entradas.append((sequente, primeira.replace(" ", "  ") + "\n" + resto))
+            # Um número de passo inválido aparece na mensagem de erro com os espaços enviados
+            entradas += [(sequente, f"{passos}\n x. P"), (sequente, f"{passos}\n   x. P  ")]
+            for renderizar in ("off", "lazy"):
+                for sequente_enviado, passos_enviados in entradas:
+                    esperado = validar(sequente_enviado, passos_enviados, renderizar, cache=False)
+                    obtido = validar(sequente_enviado, passos_enviados, renderizar, cache=cache)
+                    if (obtido[0], str(obtido[1]), getattr(obtido[2], "fonte", None)) != \
+                            (esperado[0], str(esperado[1]), getattr(esperado[2], "fonte", None)):
+                        divergencias.append((indice, renderizar, passos_enviados))
+        estatisticas = dict(cache.estatisticas)
+        cache.fechar()
+    if not estatisticas.get("acertos"):
+        divergencias.append(("nenhum acerto", estatisticas, None))
+    return divergencias
+
+
+if __name__ == "__main__":
+    import sys
+
+    divergencias = conferir()
+    for divergencia in divergencias:
+        print("Divergência:", divergencia)
+    print("Acertos do cache iguais à validação sem cache." if not divergencias else f"{len(divergencias)} divergência(s).")
+    sys.exit(1 if divergencias else 0)
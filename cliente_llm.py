@@ -0,0 +1,187 @@
+import os
+import time
+import random
+import asyncio
+
+import httpx
+
+from metricas import Histograma
+
+URL_MODELO = "https://api-inference.huggingface.co/models/Qwen/Qwen2.5-72B-Instruct"
+
+# Respostas do upstream que valem uma nova tentativa
+STATUS_REPETIVEIS = {408, 425, 429, 500, 502, 503, 504}
+
+
+class ErroUpstream(Exception):
+    """
+    Falha ao consultar o modelo. `status` é o código HTTP devolvido pelo
+    upstream, ou None se não houve resposta (timeout ou erro de conexão).
+    """
+    def __init__(self, mensagem, status=None):
+        self.mensagem = mensagem
+        self.status = status
+
+    def __str__(self):
+        return self.mensagem
+
+
+def extrair_resposta(dados):
+    """Extrai o texto gerado da resposta da API de inferência."""
+    if isinstance(dados, list) and dados and "generated_text" in dados[0]:
+        return dados[0]["generated_text"]
+    if isinstance(dados, dict) and "generated_text" in dados:
+        return dados["generated_text"]
+    raise ErroUpstream(f"Resposta inesperada do modelo: {str(dados)[:200]}")
+
+
+class ClienteLLM:
+    """
+    Cliente assíncrono para a API de inferência do modelo. Mantém um pool de
+    conexões persistentes (sem um novo handshake TCP/TLS por pedido), limita o
+    número de chamadas simultâneas ao upstream e repete as falhas transitórias
+    com espera exponencial aleatória ("full jitter"). A duração de cada
+    chamada ao upstream fica em `latencias`, pelo status da resposta
+    ("timeout" ou "conexao" quando não houve resposta).
+
+    O cliente precisa ser aberto antes do uso (`await cliente.abrir()` ou
+    `async with cliente:`). `url` pode apontar para um servidor local que imite
+    a API, o que permite testar o serviço sem acesso à Hugging Face.
+    """
+
+    def __init__(self, url=URL_MODELO, token=None, timeout=60.0, timeout_conexao=5.0,
+                 tentativas=3, espera_base=0.5, espera_maxima=8.0, concorrencia=8, transport=None):
+        self.url = url
+        self.token = token
+        self.tentativas = max(1, tentativas)
+        self.espera_base = espera_base
+        self.espera_maxima = espera_maxima
+        self.concorrencia = concorrencia
+        self._timeout = httpx.Timeout(timeout, connect=timeout_conexao)
+        self._limites = httpx.Limits(max_connections=concorrencia, max_keepalive_connections=concorrencia)
+        self._transport = transport
+        self._semaforo = asyncio.Semaphore(concorrencia)
+        self._cliente = None
+        self.latencias = Histograma("qwen_upstream_latencia_segundos", "Duração das chamadas ao modelo.", ("status",))
+
+    @classmethod
+    def do_ambiente(cls, **opcoes):
+        """Cria o cliente a partir das variáveis de ambiente QWEN_* e HUGGING_FACE_API_TOKEN."""
+        ambiente = os.environ
+        configuracao = {
+            "url": ambiente.get("QWEN_URL", URL_MODELO),
+            "token": ambiente.get("HUGGING_FACE_API_TOKEN"),
+            "timeout": float(ambiente.get("QWEN_TIMEOUT", 60.0)),
+            "tentativas": int(ambiente.get("QWEN_TENTATIVAS", 3)),
+            "concorrencia": int(ambiente.get("QWEN_CONCORRENCIA", 8)),
+        }
+        configuracao.update(opcoes)
+        return cls(**configuracao)
+
+    @property
+    def aberto(self):
+        return self._cliente is not None
+
+    async def abrir(self):
+        if self._cliente is None:
+            cabecalhos = {"Authorization": f"Bearer {self.token}"} if self.token else {}
+            self._cliente = httpx.AsyncClient(
+                headers=cabecalhos, timeout=self._timeout, limits=self._limites, transport=self._transport,
+            )
+        return self
+
+    async def fechar(self):
+        if self._cliente is not None:
+            await self._cliente.aclose()
+            self._cliente = None
+
+    async def __aenter__(self):
+        return await self.abrir()
+
+    async def __aexit__(self, *excecao):
+        await self.fechar()
+
+    def espera(self, tentativa, minimo=0.0):
+        """Tempo de espera antes da próxima tentativa (exponencial com jitter)."""
+        limite = min(self.espera_maxima, self.espera_base * 2 ** tentativa)
+        return max(minimo, random.uniform(0, limite))
+
+    async def _enviar(self, carga):
+        async with self._semaforo:
+            return await self._cliente.post(self.url, json=carga)
+
+    async def gerar(self, prompt, **parametros):
+        """Envia o prompt ao modelo e devolve o texto gerado."""
+        if self._cliente is None:
+            raise RuntimeError("O cliente não foi aberto; use `await cliente.abrir()`.")
+        carga = {"inputs": prompt}
+        if parametros:
+            carga["parameters"] = parametros
+
+        for tentativa in range(self.tentativas):
+            minimo = 0.0
+            comeco = time.perf_counter()
+            try:
+                resposta = await self._enviar(carga)
+            except httpx.TimeoutException:
+                self.latencias.observar(time.perf_counter() - comeco, "timeout")
+                erro = ErroUpstream("Tempo esgotado ao consultar o modelo")
+            except httpx.TransportError as e:
+                self.latencias.observar(time.perf_counter() - comeco, "conexao")
+                erro = ErroUpstream(f"Falha de conexão com o modelo: {e}")
+            else:
+                self.latencias.observar(time.perf_counter() - comeco, str(resposta.status_code))
+                if resposta.status_code < 400:
+                    try:
+                        dados = resposta.json()
+                    except ValueError:
+                        raise ErroUpstream("O modelo devolveu uma resposta que não é JSON", resposta.status_code)
+                    return extrair_resposta(dados)
+
+                erro = ErroUpstream(
+                    f"O modelo respondeu {resposta.status_code}: {resposta.text[:200]}", resposta.status_code
+                )
+                if resposta.status_code not in STATUS_REPETIVEIS:
+                    raise erro
+                # Respeita o Retry-After (em segundos) quando o upstream o informa
+                retry_after = resposta.headers.get("Retry-After", "")
+                if retry_after.isdigit():
+                    minimo = min(float(retry_after), self.espera_maxima)
+
+            if tentativa + 1 < self.tentativas:
+                await asyncio.sleep(self.espera(tentativa, minimo))
+        raise erro
+
+
+class Coalescedor:
+    """
+    Agrupa chamadas idênticas simultâneas ("single flight"): enquanto uma
+    chamada com certa chave está em andamento, novos pedidos com a mesma chave
+    aguardam o mesmo resultado em vez de consultar o upstream de novo.
+    """
+
+    def __init__(self):
+        self._em_andamento = {}
+
+    def __len__(self):
+        return len(self._em_andamento)
+
+    def _concluir(self, chave, tarefa):
+        self._em_andamento.pop(chave, None)
+        # Se todos os interessados desistiram, o erro não fica sem tratamento
+        if not tarefa.cancelled():
+            tarefa.exception()
+
+    async def executar(self, chave, fabrica):
+        """
+        Executa `fabrica()` (uma função que devolve uma corrotina) ou aguarda a
+        execução já em andamento para `chave`. Devolve (resultado, compartilhado).
+        """
+        tarefa = self._em_andamento.get(chave)
+        compartilhado = tarefa is not None
+        if tarefa is None:
+            tarefa = asyncio.ensure_future(fabrica())
+            self._em_andamento[chave] = tarefa
+            tarefa.add_done_callback(lambda tarefa: self._concluir(chave, tarefa))
+        # shield: um cliente que desiste não cancela a chamada dos demais
+        return await asyncio.shield(tarefa), compartilhado
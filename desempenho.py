@@ -0,0 +1,390 @@
+import io
+import os
+import sys
+import json
+import time
+import timeit
+import platform
+import subprocess
+import argparse
+import tracemalloc
+import contextlib
+from collections import namedtuple
+from statistics import median
+
+from formulas import TabelaFormulas
+from relatorio import Relatorio
+from motor_inferencia import (
+    validar, ler_passo, analisar_deducao, verificar_passo, ValidacaoAoVivo, REGRAS,
+)
+
+ARQUIVO_CASOS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "casostestes.py")
+
+TAMANHOS = (10, 100, 1000, 10000, 100000)
+PROFUNDIDADES = (10, 100, 1000, 10000)
+# Com --rapido, nada passa destes limites
+TAMANHO_RAPIDO = 10000
+PROFUNDIDADE_RAPIDA = 1000
+# Tamanhos em que a memória da dedução analisada é comparada entre as duas formas
+TAMANHOS_DEDUCAO = (10000, 100000)
+
+# Módulos cuja importação a frio é medida; o núcleo não deve puxar o Graphviz nem a interface
+IMPORTACOES = ("motor_inferencia", "grafo")
+
+# Uma dedução mínima para cada regra: (sequente, passos, passo medido)
+EXEMPLOS_REGRAS = {
+    "MP": ("P → Q, P ⊢ Q", "1. P → Q (Hipótese)\n2. P (Hipótese)\n3. Q MP(1,2)", "3"),
+    "SP": ("P ∧ Q ⊢ P", "1. P ∧ Q (Hipótese)\n2. P SP(1)", "2"),
+    "CJ": ("P, Q ⊢ P ∧ Q", "1. P (Hipótese)\n2. Q (Hipótese)\n3. P ∧ Q CJ(1,2)", "3"),
+    "MT": ("P → Q, ¬Q ⊢ ¬P", "1. P → Q (Hipótese)\n2. ¬Q (Hipótese)\n3. ¬P MT(1,2)", "3"),
+    "SD": ("P v Q, ¬P ⊢ Q", "1. P v Q (Hipótese)\n2. ¬P (Hipótese)\n3. Q SD(1,2)", "3"),
+    "SH": ("P → Q, Q → R ⊢ P → R", "1. P → Q (Hipótese)\n2. Q → R (Hipótese)\n3. P → R SH(1,2)", "3"),
+    "DN": ("¬¬P ⊢ P", "1. ¬¬P (Hipótese)\n2. P DN(1)", "2"),
+    "AD": ("P ⊢ P v Q", "1. P (Hipótese)\n2. P v Q AD(1)", "2"),
+    "vE": (
+        "P v Q, P → R, Q → R ⊢ R",
+        "1. P v Q (Hipótese)\n2. P → R (Hipótese)\n3. Q → R (Hipótese)\n4. R vE(1,2,3)",
+        "4",
+    ),
+    "↔I": ("P → Q, Q → P ⊢ P ↔ Q", "1. P → Q (Hipótese)\n2. Q → P (Hipótese)\n3. P ↔ Q ↔I(1,2)", "3"),
+    "↔E": ("P ↔ Q ⊢ P → Q", "1. P ↔ Q (Hipótese)\n2. P → Q ↔E(1)", "2"),
+    "PC": (
+        "P → Q ⊢ P → Q",
+        "1. P → Q (Hipótese)\n2. P (Hip-PC)\n3. Q MP(1,2)\n4. P → Q PC(2-3)",
+        "4",
+    ),
+    "RAA": (
+        "P → Q, ¬Q ⊢ ¬P",
+        "1. P → Q (Hipótese)\n2. ¬Q (Hipótese)\n3. P (Hip-RAA)\n4. Q MP(1,3)\n5. Q ∧ ¬Q CJ(4,2)\n6. ¬P RAA(3-5)",
+        "6",
+    ),
+    "COM": ("P ∧ Q ⊢ Q ∧ P", "1. P ∧ Q (Hipótese)\n2. Q ∧ P COM(1)", "2"),
+    "DMOR": ("¬(P ∧ Q) ⊢ ¬P v ¬Q", "1. ¬(P ∧ Q) (Hipótese)\n2. ¬P v ¬Q DMOR(1)", "2"),
+    "COND": ("P → Q ⊢ ¬P v Q", "1. P → Q (Hipótese)\n2. ¬P v Q COND(1)", "2"),
+}
+
+Caso = namedtuple("Caso", ["nome", "preparar", "memoria", "passos", "tempos"], defaults=(False, None, None))
+Caso.__doc__ = """
+Uma medição. `preparar()` monta a carga (fora do tempo medido) e devolve a
+função cronometrada; `memoria` indica se o pico de memória é medido, `passos`
+é o tamanho da dedução, usado para calcular a vazão, e `tempos` é a lista em
+que a função guarda os tempos das fases de `validar` de cada execução.
+"""
+
+
+def casos_de_teste():
+    """Lê os pares (sequente, passos) de casostestes.py, sem imprimir nada."""
+    casos = []
+
+    def coletar(premissas_e_conclusao, passos, *args, **kwargs):
+        casos.append((premissas_e_conclusao, passos))
+        return True, "", None
+
+    with open(ARQUIVO_CASOS, encoding="utf-8") as arquivo:
+        fonte = arquivo.read()
+    with contextlib.redirect_stdout(io.StringIO()):
+        exec(compile(fonte, ARQUIVO_CASOS, "exec"), {"validar": coletar})
+    return casos
+
+
+def prova_sintetica(tamanho):
+    """
+    Dedução válida de "P, P → Q ⊢ Q" com exatamente `tamanho` passos (no
+    mínimo 3), repetindo um bloco com MP, CJ, COM, SP e AD.
+    """
+    linhas = ["1. P (Hipótese)", "2. P → Q (Hipótese)"]
+    while len(linhas) < tamanho:
+        n = len(linhas) + 1
+        bloco = [
+            f"{n}. Q MP(2,1)",
+            f"{n + 1}. P ∧ Q CJ(1,{n})",
+            f"{n + 2}. Q ∧ P COM({n + 1})",
+            f"{n + 3}. Q SP({n + 2})",
+            f"{n + 4}. Q v P AD({n + 3})",
+        ]
+        linhas.extend(bloco[:tamanho - len(linhas)])
+    return "P, P → Q ⊢ Q", "\n".join(linhas)
+
+
+def formula_profunda(profundidade):
+    """Fórmula com `profundidade` conectivos aninhados à direita, alternando ∧, v e →."""
+    formula = "P"
+    for i in range(profundidade):
+        formula = f"(Q {'∧v→'[i % 3]} {formula})"
+    return formula
+
+
+def _ler_passos(passos):
+    return dict(ler_passo(linha) for linha in passos.splitlines() if linha.strip())
+
+
+def _caso_regra(regra):
+    sequente, passos, alvo = EXEMPLOS_REGRAS[regra]
+
+    def preparar():
+        valido, relatorio, _ = validar(sequente, passos, renderizar="off")
+        if not valido:
+            raise RuntimeError(f"O exemplo da regra {regra} não é válido:\n{relatorio}")
+        deducao, _ = analisar_deducao(_ler_passos(passos), TabelaFormulas(), Relatorio())
+        justificativa = deducao.justificativas[alvo]
+        return lambda: verificar_passo(alvo, justificativa, deducao)
+
+    return Caso(f"regra/{regra}", preparar)
+
+
+def _validacao(problemas, renderizar, tempos):
+    # Guarda os tempos de cada fase de cada execução
+    def executar():
+        for premissas_e_conclusao, passos in problemas:
+            _, relatorio, _ = validar(premissas_e_conclusao, passos, renderizar=renderizar)
+            tempos.append(relatorio.tempos)
+    return executar
+
+
+def _caso_validar(nome, gerar, passos=None, renderizar="off"):
+    tempos = []
+
+    def preparar():
+        tempos.clear()
+        return _validacao(gerar(), renderizar, tempos)
+
+    return Caso(nome, preparar, True, passos, tempos)
+
+
+def _caso_deducao(tamanho, compacta):
+    # Só a análise, para comparar a memória da DeducaoCompacta com a dos dicionários de Deducao
+    def preparar():
+        passos = _ler_passos(prova_sintetica(tamanho)[1])
+        return lambda: analisar_deducao(passos, TabelaFormulas(), Relatorio(), compacta=compacta)
+
+    forma = "compacta" if compacta else "dicionarios"
+    return Caso(f"deducao/{forma}/{tamanho}", preparar, True, tamanho)
+
+
+def _caso_ao_vivo(tamanho, etapa):
+    # "edicao" é só o motor; "interface" inclui a cópia da versão, que a interface
+    # gráfica também faz na sua thread; "relatorio" e "grafo" são montados no pool
+    def preparar():
+        sequente, passos = prova_sintetica(tamanho)
+        linhas = passos.splitlines()
+        meio = len(linhas) // 2
+        numero = meio + 1
+        # Alterna um passo do meio entre duas versões (uma delas inválida)
+        versoes = [passos, "\n".join(linhas[:meio] + [f"{numero}. R MP(2,1)"] + linhas[meio + 1:])]
+        sessao = ValidacaoAoVivo(sequente)
+        sessao.atualizar(passos)
+        if etapa == "relatorio":
+            versao = sessao.versao()
+            return lambda: str(versao.relatorio())
+        if etapa == "grafo":
+            versao = sessao.versao()
+            return lambda: versao.grafo()
+        contador = iter(range(sys.maxsize))
+        if etapa == "interface":
+            return lambda: (sessao.atualizar(versoes[next(contador) % 2]), sessao.versao())
+        return lambda: sessao.atualizar(versoes[next(contador) % 2])
+
+    return Caso(f"ao_vivo/{etapa}/{tamanho}", preparar, passos=tamanho)
+
+
+def _caso_importacao(nome, codigo):
+    # Um interpretador novo por execução, para medir a importação a frio; sem o
+    # site (-S), cujos ganchos de pacotes instalados variam de máquina para máquina
+    comando = [sys.executable, "-S", "-E", "-c", codigo]
+    pasta = os.path.dirname(ARQUIVO_CASOS)
+
+    def preparar():
+        return lambda: subprocess.run(comando, cwd=pasta, check=True)
+
+    return Caso(f"importacao/{nome}", preparar)
+
+
+def montar_casos(rapido=False):
+    casos = [_caso_regra(regra) for regra in REGRAS]
+
+    # O custo de importar um módulo é a diferença para "importacao/interpretador"
+    casos.append(_caso_importacao("interpretador", "pass"))
+    for modulo in IMPORTACOES:
+        casos.append(_caso_importacao(modulo, f"import {modulo}"))
+
+    casos.append(_caso_validar("casostestes", casos_de_teste))
+
+    for tamanho in TAMANHOS:
+        if rapido and tamanho > TAMANHO_RAPIDO:
+            continue
+        gerar = lambda tamanho=tamanho: [prova_sintetica(tamanho)]
+        casos.append(_caso_validar(f"validar/{tamanho}", gerar, tamanho))
+        # Montar o código DOT do grafo e editar ao vivo só são medidos até o limite do modo rápido
+        if tamanho <= TAMANHO_RAPIDO:
+            casos.append(_caso_validar(f"validar_grafo/{tamanho}", gerar, tamanho, renderizar="lazy"))
+            for etapa in ("edicao", "interface", "relatorio", "grafo"):
+                casos.append(_caso_ao_vivo(tamanho, etapa))
+
+    for tamanho in TAMANHOS_DEDUCAO:
+        if rapido and tamanho > TAMANHO_RAPIDO:
+            continue
+        casos.append(_caso_deducao(tamanho, compacta=False))
+        casos.append(_caso_deducao(tamanho, compacta=True))
+
+    for profundidade in PROFUNDIDADES:
+        if rapido and profundidade > PROFUNDIDADE_RAPIDA:
+            continue
+        formula = formula_profunda(profundidade)
+        problema = (f"{formula} ⊢ {formula} ∧ {formula}", f"1. {formula} (Hipótese)\n2. {formula} ∧ {formula} CJ(1,1)")
+        casos.append(_caso_validar(f"profundidade/{profundidade}", lambda problema=problema: [problema]))
+    return casos
+
+
+def cronometrar(funcao, repeticoes=5, tempo_minimo=0.2):
+    """
+    Mede `funcao` como o timeit: calibra quantas chamadas somam `tempo_minimo`
+    segundos e repete a medição. Devolve os tempos por chamada. Cargas que
+    levam mais de um segundo são repetidas menos vezes.
+    """
+    cronometro = timeit.Timer(funcao)
+    numero, total = 1, 0.0
+    while True:
+        total = cronometro.timeit(numero)
+        if total >= tempo_minimo:
+            break
+        numero *= 10 if total < tempo_minimo / 10 else 2
+    amostras = [total / numero]
+    if total / numero > 1.0:
+        repeticoes = 2
+    amostras += [t / numero for t in cronometro.repeat(repeticoes - 1, numero)]
+    return amostras
+
+
+def pico_memoria(funcao):
+    """Pico de memória (em bytes) alocada pelo Python durante uma chamada."""
+    tracemalloc.start()
+    try:
+        tracemalloc.reset_peak()
+        funcao()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def medir(caso, repeticoes=5, tempo_minimo=0.2):
+    funcao = caso.preparar()
+    amostras = cronometrar(funcao, repeticoes, tempo_minimo)
+    resultado = {
+        "mediana": median(amostras),
+        "minimo": min(amostras),
+        "repeticoes": len(amostras),
+    }
+    if caso.passos:
+        resultado["passos_por_segundo"] = caso.passos / resultado["mediana"]
+    if caso.tempos:
+        fases = {fase for registro in caso.tempos for fase in registro}
+        resultado["fases"] = {
+            fase: median(registro.get(fase, 0.0) for registro in caso.tempos) for fase in sorted(fases)
+        }
+    if caso.memoria:
+        resultado["memoria_pico"] = pico_memoria(funcao)
+    return resultado
+
+
+def ambiente():
+    return {
+        "python": platform.python_version(),
+        "plataforma": platform.platform(),
+        "processador": platform.processor() or platform.machine(),
+        "cpus": os.cpu_count(),
+        "data": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+
+
+def comparar(atual, base, tolerancia=0.25, tolerancia_memoria=0.25):
+    """
+    Compara as medições com a linha de base. Um caso só é acusado como
+    regressão se a mediana e o mínimo pioraram mais que `tolerancia`, o que
+    evita alarmes por uma única amostra ruidosa. Devolve {nome: motivos}.
+    """
+    regressoes = {}
+    for nome, medicao in atual.items():
+        anterior = base.get(nome)
+        if anterior is None:
+            continue
+        motivos = []
+        variacao = min(medicao["mediana"] / anterior["mediana"], medicao["minimo"] / anterior["minimo"]) - 1
+        if variacao > tolerancia:
+            motivos.append(f"tempo +{variacao:.0%}")
+        if "memoria_pico" in medicao and anterior.get("memoria_pico"):
+            variacao = medicao["memoria_pico"] / anterior["memoria_pico"] - 1
+            if variacao > tolerancia_memoria:
+                motivos.append(f"memória +{variacao:.0%}")
+        if motivos:
+            regressoes[nome] = motivos
+    return regressoes
+
+
+def formatar_tempo(segundos):
+    for unidade, fator in (("s", 1), ("ms", 1e-3), ("µs", 1e-6)):
+        if segundos >= fator:
+            return f"{segundos / fator:.3g} {unidade}"
+    return f"{segundos / 1e-9:.3g} ns"
+
+
+def formatar_memoria(tamanho):
+    for unidade, fator in (("MiB", 1024 ** 2), ("KiB", 1024)):
+        if tamanho >= fator:
+            return f"{tamanho / fator:.3g} {unidade}"
+    return f"{tamanho} B"
+
+
+def linha(nome, *colunas):
+    return f"{nome:<28}" + "".join(f" {coluna:>10}" for coluna in colunas)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python desempenho.py",
+        description="Mede o tempo e a memória do validador (regras, fases e deduções de 10 a 100 mil passos).",
+    )
+    parser.add_argument("--rapido", action="store_true",
+                        help=f"Só deduções de até {TAMANHO_RAPIDO} passos e fórmulas de profundidade até {PROFUNDIDADE_RAPIDA}")
+    parser.add_argument("--filtro", action="append", default=[], help="Mede só os casos cujo nome contém o texto (repetível)")
+    parser.add_argument("--repeticoes", type=int, default=5, help="Repetições de cada medição")
+    parser.add_argument("--tempo-minimo", type=float, default=0.2, help="Duração mínima de cada repetição, em segundos")
+    parser.add_argument("--salvar", metavar="ARQUIVO", help="Grava as medições (linha de base) em JSON")
+    parser.add_argument("--comparar", metavar="ARQUIVO", help="Compara com uma linha de base; sai com código 1 se houver regressão")
+    parser.add_argument("--tolerancia", type=float, default=0.25, help="Piora de tempo tolerada (0.25 = 25%%)")
+    parser.add_argument("--tolerancia-memoria", type=float, default=0.25, help="Aumento do pico de memória tolerado")
+    args = parser.parse_args(argv)
+
+    base = None
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as arquivo:
+            base = json.load(arquivo)["casos"]
+
+    casos = [caso for caso in montar_casos(args.rapido) if not args.filtro or any(f in caso.nome for f in args.filtro)]
+    medicoes = {}
+    print(linha("caso", "mediana", "mínimo", "memória", "passos/s", "vs. base"))
+    for caso in casos:
+        medicao = medicoes[caso.nome] = medir(caso, args.repeticoes, args.tempo_minimo)
+        anterior = base.get(caso.nome) if base else None
+        print(linha(
+            caso.nome,
+            formatar_tempo(medicao["mediana"]),
+            formatar_tempo(medicao["minimo"]),
+            formatar_memoria(medicao["memoria_pico"]) if "memoria_pico" in medicao else "-",
+            f"{medicao['passos_por_segundo']:.0f}" if "passos_por_segundo" in medicao else "-",
+            f"{medicao['mediana'] / anterior['mediana'] - 1:+.0%}" if anterior else "-",
+        ), flush=True)
+
+    if args.salvar:
+        with open(args.salvar, "w", encoding="utf-8") as arquivo:
+            json.dump({"ambiente": ambiente(), "casos": medicoes}, arquivo, ensure_ascii=False, indent=2)
+
+    if base is not None:
+        regressoes = comparar(medicoes, base, args.tolerancia, args.tolerancia_memoria)
+        for nome, motivos in regressoes.items():
+            print(f"REGRESSÃO {nome}: {', '.join(motivos)}")
+        if regressoes:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,258 @@
+import re
+
+# Operadores da lógica proposicional
+ATOMO = "atomo"
+NAO = "¬"
+E = "∧"
+OU = "∨"
+IMPLICA = "→"
+EQUIVALE = "↔"
+
+# Precedência dos operadores binários (maior valor = liga mais forte)
+PRECEDENCIA = {E: 4, OU: 3, IMPLICA: 2, EQUIVALE: 1}
+ASSOCIATIVOS_A_DIREITA = {IMPLICA, EQUIVALE}
+
+# Símbolo usado ao exibir cada operador (a disjunção segue a notação "v" das entradas)
+SIMBOLOS = {NAO: "¬", E: "∧", OU: "v", IMPLICA: "→", EQUIVALE: "↔"}
+
+_TOKENS = re.compile(r"""
+    (?P<espaco>[\s"]+)
+  | (?P<equivale>↔|<->)
+  | (?P<implica>→|->)
+  | (?P<e>∧|&|\^)
+  | (?P<ou>∨|v|\|)
+  | (?P<nao>¬|~|!)
+  | (?P<abre>\()
+  | (?P<fecha>\))
+  | (?P<atomo>[A-Za-uw-z][0-9_']*)
+""", re.VERBOSE)
+
+_OPERADOR_DO_TOKEN = {"equivale": EQUIVALE, "implica": IMPLICA, "e": E, "ou": OU}
+
+
+class FormulaInvalidaError(ValueError):
+    def __init__(self, texto, mensagem):
+        self.texto = texto
+        self.mensagem = mensagem
+
+    def __str__(self):
+        return f"Fórmula inválida '{self.texto}': {self.mensagem}"
+
+
+class Formula:
+    """
+    Nó imutável de uma fórmula. Os nós são internados pela TabelaFormulas
+    (hash-consing), então duas fórmulas iguais são sempre o mesmo objeto e
+    podem ser comparadas com `is`.
+    """
+    __slots__ = ("op", "filhos", "nome", "id", "_texto")
+
+    def __init__(self, op, filhos, nome, id):
+        self.op = op
+        self.filhos = filhos
+        self.nome = nome
+        self.id = id
+        self._texto = None
+
+    @property
+    def esquerda(self):
+        return self.filhos[0]
+
+    @property
+    def direita(self):
+        return self.filhos[-1]
+
+    def __repr__(self):
+        return f"Formula({str(self)!r})"
+
+    def __str__(self):
+        if self._texto is None:
+            self._texto = _renderizar(self)
+        return self._texto
+
+
+def _renderizar(formula):
+    """Converte a fórmula em texto de forma iterativa (fórmulas profundas não estouram a pilha)."""
+    partes = []
+    pilha = [formula]
+    while pilha:
+        item = pilha.pop()
+        if isinstance(item, str):
+            partes.append(item)
+        elif item.op == ATOMO:
+            partes.append(item.nome)
+        elif item.op == NAO:
+            filho = item.filhos[0]
+            if filho.op in PRECEDENCIA:
+                pilha.extend((")", filho, "(", "¬"))
+            else:
+                pilha.extend((filho, "¬"))
+        else:
+            esquerda, direita = item.filhos
+            _empilhar_operando(pilha, direita)
+            pilha.append(f" {SIMBOLOS[item.op]} ")
+            _empilhar_operando(pilha, esquerda)
+    return "".join(partes)
+
+
+def _empilhar_operando(pilha, filho):
+    # Operandos binários sempre recebem parênteses, como nas entradas dos usuários
+    if filho.op in PRECEDENCIA:
+        pilha.extend((")", filho, "("))
+    else:
+        pilha.append(filho)
+
+
+class TabelaFormulas:
+    """
+    Tabela de internação de fórmulas. Cada fórmula distinta é criada uma única
+    vez; textos já analisados são reaproveitados sem nova análise sintática.
+    """
+
+    def __init__(self):
+        self._nos = {}
+        self._textos = {}
+        self._sem_dupla_negacao = {}
+        self.nos = []
+
+    def __len__(self):
+        return len(self.nos)
+
+    def no(self, op, *filhos, nome=None):
+        chave = (op, nome) if op == ATOMO else (op,) + filhos
+        formula = self._nos.get(chave)
+        if formula is None:
+            formula = Formula(op, filhos, nome, len(self.nos))
+            self._nos[chave] = formula
+            self.nos.append(formula)
+        return formula
+
+    def atomo(self, nome):
+        return self.no(ATOMO, nome=nome)
+
+    def nao(self, formula):
+        return self.no(NAO, formula)
+
+    def e(self, esquerda, direita):
+        return self.no(E, esquerda, direita)
+
+    def ou(self, esquerda, direita):
+        return self.no(OU, esquerda, direita)
+
+    def implica(self, antecedente, consequente):
+        return self.no(IMPLICA, antecedente, consequente)
+
+    def equivale(self, esquerda, direita):
+        return self.no(EQUIVALE, esquerda, direita)
+
+    def negacao_simplificada(self, formula):
+        """Nega a fórmula, cancelando uma negação existente (¬A vira A)."""
+        if formula.op == NAO:
+            return formula.filhos[0]
+        return self.nao(formula)
+
+    def sem_dupla_negacao(self, formula):
+        """Remove todas as negações duplas (¬¬A vira A) em qualquer nível da fórmula."""
+        memo = self._sem_dupla_negacao
+        pilha = [formula]
+        while pilha:
+            atual = pilha[-1]
+            if atual in memo:
+                pilha.pop()
+                continue
+            if atual.op == ATOMO:
+                memo[atual] = atual
+                pilha.pop()
+                continue
+            if atual.op == NAO and atual.filhos[0].op == NAO:
+                interno = atual.filhos[0].filhos[0]
+                if interno in memo:
+                    memo[atual] = memo[interno]
+                    pilha.pop()
+                else:
+                    pilha.append(interno)
+                continue
+            pendentes = [f for f in atual.filhos if f not in memo]
+            if pendentes:
+                pilha.extend(pendentes)
+                continue
+            memo[atual] = self.no(atual.op, *(memo[f] for f in atual.filhos))
+            pilha.pop()
+        return memo[formula]
+
+    def parse(self, texto):
+        """
+        Converte um texto em fórmula respeitando a precedência ¬ > ∧ > ∨ > → > ↔.
+        Textos repetidos devolvem o mesmo nó sem serem analisados novamente.
+        """
+        formula = self._textos.get(texto)
+        if formula is None:
+            formula = self._analisar(texto)
+            self._textos[texto] = formula
+        return formula
+
+    def _analisar(self, texto):
+        # Algoritmo shunting-yard: não usa recursão, então suporta fórmulas profundas
+        operandos = []
+        operadores = []
+        espera_operando = True
+
+        def reduzir():
+            op = operadores.pop()
+            if op == NAO:
+                operandos.append(self.nao(operandos.pop()))
+            else:
+                direita = operandos.pop()
+                esquerda = operandos.pop()
+                operandos.append(self.no(op, esquerda, direita))
+
+        posicao = 0
+        while posicao < len(texto):
+            token = _TOKENS.match(texto, posicao)
+            if token is None:
+                raise FormulaInvalidaError(texto, f"símbolo inesperado '{texto[posicao]}'")
+            posicao = token.end()
+            tipo = token.lastgroup
+            if tipo == "espaco":
+                continue
+
+            if espera_operando:
+                if tipo == "atomo":
+                    operandos.append(self.atomo(token.group()))
+                    while operadores and operadores[-1] == NAO:
+                        reduzir()
+                    espera_operando = False
+                elif tipo == "nao":
+                    operadores.append(NAO)
+                elif tipo == "abre":
+                    operadores.append("(")
+                else:
+                    raise FormulaInvalidaError(texto, f"esperava uma proposição antes de '{token.group()}'")
+            else:
+                if tipo == "fecha":
+                    while operadores and operadores[-1] != "(":
+                        reduzir()
+                    if not operadores:
+                        raise FormulaInvalidaError(texto, "parêntese ')' sem correspondente")
+                    operadores.pop()
+                    while operadores and operadores[-1] == NAO:
+                        reduzir()
+                elif tipo in _OPERADOR_DO_TOKEN:
+                    op = _OPERADOR_DO_TOKEN[tipo]
+                    while operadores and operadores[-1] in PRECEDENCIA and (
+                        PRECEDENCIA[operadores[-1]] > PRECEDENCIA[op]
+                        or (PRECEDENCIA[operadores[-1]] == PRECEDENCIA[op] and op not in ASSOCIATIVOS_A_DIREITA)
+                    ):
+                        reduzir()
+                    operadores.append(op)
+                    espera_operando = True
+                else:
+                    raise FormulaInvalidaError(texto, f"esperava um operador antes de '{token.group()}'")
+
+        if espera_operando:
+            raise FormulaInvalidaError(texto, "fórmula incompleta")
+        while operadores:
+            if operadores[-1] == "(":
+                raise FormulaInvalidaError(texto, "parêntese '(' sem correspondente")
+            reduzir()
+        return operandos[0]
@@ -0,0 +1,571 @@
+import sys
+import json
+import random
+import argparse
+from collections import namedtuple, deque
+
+# Conectivos como o validador os lê e os equivalentes aceitos por converter_latex_para_legivel
+NAO, E, OU, IMPLICA, EQUIVALE = "¬", "∧", "v", "→", "↔"
+LATEX = {NAO: r"\neg ", E: r"\land", OU: r"\lor", IMPLICA: r"\rightarrow", EQUIVALE: r"\leftrightarrow", "⊢": r"\vdash"}
+NOTACOES = ("unicode", "latex")
+
+# Tipos de defeito; cada um torna inválido o próprio passo em que é aplicado
+DEFEITOS = ("formula_trocada", "referencia_ausente", "justificativa_ausente", "hipotese_falsa", "formula_mal_formada")
+
+# Passos recentes de cada escopo que podem ser citados (além das premissas)
+JANELA = 32
+
+Defeito = namedtuple("Defeito", ["passo", "tipo"])
+
+
+def nome_atomo(indice):
+    """P, Q, R, ..., Z (sem o v, que é a disjunção) e depois P1, Q1, ..."""
+    letras = "PQRSTUWXYZ"
+    volta, posicao = divmod(indice, len(letras))
+    return letras[posicao] + (str(volta) if volta else "")
+
+
+# Fórmulas são tuplas (op, profundidade, filhos...); um átomo é (None, 0, nome)
+def atomo(nome):
+    return (None, 0, nome)
+
+
+def no(op, *filhos):
+    return (op, 1 + max(filho[1] for filho in filhos)) + filhos
+
+
+def escrever(formula, latex=False):
+    """Texto da fórmula, com parênteses em volta de toda subfórmula binária."""
+    op = formula[0]
+    if op is None:
+        return formula[2]
+
+    def operando(filho):
+        texto = escrever(filho, latex)
+        return f"({texto})" if filho[0] not in (None, NAO) else texto
+
+    simbolo = LATEX[op] if latex else op
+    if op == NAO:
+        return simbolo + operando(formula[2])
+    return f"{operando(formula[2])} {simbolo} {operando(formula[3])}"
+
+
+class _Escopo:
+    """Passos disponíveis em um nível de subprova: só os `JANELA` mais recentes."""
+
+    def __init__(self, hipotese=None, alvo=0):
+        self.hipotese = hipotese  # (número, fórmula) do Hip-PC que abriu a subprova
+        self.alvo = alvo  # Tamanho planejado do corpo da subprova
+        self.corpo = 0
+        self.ultimo = hipotese
+        self.janela = deque()
+        self.indice = {}
+
+    def registrar(self, numero, formula):
+        if len(self.janela) == JANELA:
+            antigo, formula_antiga = self.janela.popleft()
+            if self.indice.get(formula_antiga) == antigo:
+                del self.indice[formula_antiga]
+        self.janela.append((numero, formula))
+        self.indice[formula] = numero
+        self.ultimo = (numero, formula)
+        self.corpo += 1
+
+
+class GeradorProvas:
+    """
+    Gera deduções aleatórias válidas, usando todas as regras do validador, no
+    formato lido por `validar`. A mesma `semente` gera sempre a mesma dedução.
+    `passos` é o tamanho exato da dedução, `profundidade` limita o aninhamento
+    das fórmulas, `atomos` o número de átomos distintos e `aninhamento` o de
+    subprovas (Hip-PC) umas dentro das outras. Com `defeitos`, esse número de
+    passos é estragado de propósito (ver DEFEITOS); os defeitos aplicados ficam
+    em `defeitos` ao final da geração.
+
+    O sequente (`sequente`) é conhecido antes dos passos, e `linhas()` produz
+    os passos um a um guardando só uma janela dos passos recentes, então
+    deduções de milhões de passos não ficam na memória:
+
+        gerador = GeradorProvas(semente=7, passos=1000)
+        print(gerador.sequente)
+        for linha in gerador.linhas():
+            print(linha)
+    """
+
+    def __init__(self, semente=0, passos=100, profundidade=4, atomos=4, premissas=3, aninhamento=2,
+                 notacao="unicode", defeitos=0):
+        if notacao not in NOTACOES:
+            raise ValueError(f"Notação inválida: {notacao!r} (use {' ou '.join(NOTACOES)})")
+        if profundidade < 3:
+            raise ValueError("A profundidade das fórmulas deve ser pelo menos 3.")
+        if atomos < 1 or premissas < 1:
+            raise ValueError("São necessários pelo menos um átomo e uma premissa.")
+        if passos < premissas + 1:
+            raise ValueError(f"Uma dedução com {premissas} premissas tem pelo menos {premissas + 1} passos.")
+        if not 0 <= defeitos <= passos - premissas:
+            raise ValueError(f"O número de defeitos deve estar entre 0 e {passos - premissas}.")
+
+        self.aleatorio = random.Random(semente)
+        self.total = passos
+        self.profundidade = profundidade
+        self.aninhamento = aninhamento
+        self.latex = notacao == "latex"
+        self.atomos = [atomo(nome_atomo(i)) for i in range(atomos)]
+
+        self.premissas = [self._formula(self.aleatorio.randint(1, profundidade - 2)) for _ in range(premissas)]
+        # A conclusão é fixada antes dos passos para que o sequente possa ser escrito primeiro
+        self.conclusao = no(OU, self.premissas[0], self._formula(self.aleatorio.randint(0, profundidade - 2)))
+        self.sequente = "{} {} {}".format(
+            ", ".join(self._texto(premissa) for premissa in self.premissas),
+            LATEX["⊢"] if self.latex else "⊢",
+            self._texto(self.conclusao),
+        )
+
+        # Os defeitos caem nos primeiros passos com regra a partir de posições sorteadas
+        self._posicoes = sorted(self.aleatorio.sample(range(premissas + 1, passos + 1), defeitos))
+        self.defeitos = []
+        self.valido = not defeitos
+
+        self._movimentos = [
+            self._mp, self._sp, self._cj, self._mt, self._sd, self._sh, self._dn, self._ad, self._ve,
+            self._equivalencia_i, self._equivalencia_e, self._pc, self._raa, self._com, self._dmor, self._cond,
+        ]
+
+    # Fórmulas e texto
+
+    def _formula(self, profundidade):
+        if profundidade == 0:
+            return self.aleatorio.choice(self.atomos)
+        op = self.aleatorio.choice((NAO, E, OU, IMPLICA, EQUIVALE))
+        if op == NAO:
+            return no(NAO, self._formula(profundidade - 1))
+        filhos = [self._formula(profundidade - 1), self._formula(self.aleatorio.randint(0, profundidade - 1))]
+        self.aleatorio.shuffle(filhos)
+        return no(op, *filhos)
+
+    def _texto(self, formula):
+        return escrever(formula, self.latex)
+
+    def _cabe(self, *formulas):
+        return all(formula[1] <= self.profundidade for formula in formulas)
+
+    # Passos disponíveis
+
+    def _escolher(self, condicao=None, tentativas=8):
+        """Sorteia um passo (número, fórmula) citável no escopo atual, opcionalmente com uma condição."""
+        fontes = [self._fixos] + [escopo.janela for escopo in self._escopos]
+        total = sum(len(fonte) for fonte in fontes)
+        for _ in range(tentativas if condicao else 1):
+            sorteado = self.aleatorio.randrange(total)
+            for fonte in fontes:
+                if sorteado < len(fonte):
+                    candidato = fonte[sorteado]
+                    break
+                sorteado -= len(fonte)
+            if condicao is None or condicao(candidato[1]):
+                return candidato
+        return None
+
+    def _procurar(self, formula):
+        """Número de um passo citável com a fórmula, ou None."""
+        for escopo in reversed(self._escopos):
+            if formula in escopo.indice:
+                return escopo.indice[formula]
+        return self._indice_fixos.get(formula)
+
+    # Emissão
+
+    def _emitir(self, formula, regra, referencias=(), intervalo=None, registrar=True):
+        self._numero += 1
+        numero = self._numero
+        if intervalo is not None:
+            justificativa = f"{regra}({intervalo[0]}-{intervalo[1]})"
+        elif referencias:
+            justificativa = f"{regra}({','.join(map(str, referencias))})"
+        else:
+            justificativa = f"({regra})"
+        texto = self._texto(formula)
+
+        marcador = regra in ("Hipótese", "Hip-PC", "Hip-RAA")
+        if not marcador and self._posicoes and self._posicoes[0] <= numero:
+            self._posicoes.pop(0)
+            tipo = self.aleatorio.choice(DEFEITOS)
+            if tipo == "hipotese_falsa" and formula in self.premissas:
+                tipo = "formula_trocada"
+            if tipo == "formula_trocada":
+                texto = f"f{numero}"  # Átomo que não aparece em nenhuma outra fórmula
+            elif tipo == "referencia_ausente":
+                # A última referência passa a apontar para depois do fim da dedução
+                if intervalo is not None:
+                    justificativa = f"{regra}({intervalo[0]}-{self.total + 1})"
+                else:
+                    justificativa = f"{regra}({','.join(map(str, referencias[:-1] + (self.total + 1,)))})"
+            elif tipo == "justificativa_ausente":
+                justificativa = ""
+            elif tipo == "hipotese_falsa":
+                justificativa = "(Hipótese)"
+            else:
+                texto = f"({texto}"
+            self.defeitos.append(Defeito(str(numero), tipo))
+
+        self._saida.append(f"{numero}. {texto} {justificativa}".rstrip())
+        if registrar:
+            self._escopos[-1].registrar(numero, formula)
+        return numero
+
+    def _implicar(self, hipotese, citado):
+        """Subprova curta que deriva `hipotese` → B, com B = fórmula do passo `citado`. 4 passos."""
+        numero_b, b = citado
+        self._escopos.append(_Escopo())
+        inicio = self._emitir(hipotese, "Hip-PC")
+        conjuncao = self._emitir(no(E, b, b), "CJ", (numero_b, numero_b))
+        fim = self._emitir(b, "SP", (conjuncao,))
+        self._escopos.pop()
+        implicacao = no(IMPLICA, hipotese, b)
+        return self._emitir(implicacao, "PC", intervalo=(inicio, fim)), implicacao
+
+    def _cabe_implicar(self, hipotese, b):
+        return self._cabe(no(E, b, b), no(IMPLICA, hipotese, b))
+
+    # Um movimento por regra: devolve True se emitiu passos (no máximo `livre`)
+
+    def _cj(self, livre):
+        (a, fa), (b, fb) = self._escolher(), self._escolher()
+        formula = no(E, fa, fb)
+        if livre < 1 or not self._cabe(formula):
+            return False
+        self._emitir(formula, "CJ", (a, b))
+        return True
+
+    def _ad(self, livre):
+        a, fa = self._escolher()
+        outra = self._formula(self.aleatorio.randint(0, self.profundidade - 2))
+        formula = no(OU, fa, outra) if self.aleatorio.random() < 0.5 else no(OU, outra, fa)
+        if livre < 1 or not self._cabe(formula):
+            return False
+        self._emitir(formula, "AD", (a,))
+        return True
+
+    def _sp(self, livre):
+        conjuncao = self._escolher(lambda f: f[0] == E)
+        if livre < 1 or conjuncao is None:
+            return self._cj(livre)
+        self._emitir(self.aleatorio.choice(conjuncao[1][2:]), "SP", (conjuncao[0],))
+        return True
+
+    def _com(self, livre):
+        candidato = self._escolher(lambda f: f[0] in (E, OU))
+        if livre < 1 or candidato is None:
+            return False
+        numero, formula = candidato
+        self._emitir(no(formula[0], formula[3], formula[2]), "COM", (numero,))
+        return True
+
+    def _dn(self, livre):
+        numero, formula = self._escolher()
+        if formula[0] == NAO and formula[2][0] == NAO:
+            resultado = formula[2][2]
+        else:
+            resultado = no(NAO, no(NAO, formula))
+        if livre < 1 or not self._cabe(resultado):
+            return False
+        self._emitir(resultado, "DN", (numero,))
+        return True
+
+    def _cond(self, livre):
+        candidato = self._escolher(lambda f: f[0] in (IMPLICA, OU))
+        if livre < 1 or candidato is None:
+            return False
+        numero, formula = candidato
+        esquerda, direita = formula[2:]
+        resultado = no(OU if formula[0] == IMPLICA else IMPLICA, no(NAO, esquerda), direita)
+        if not self._cabe(resultado):
+            return False
+        self._emitir(resultado, "COND", (numero,))
+        return True
+
+    def _dmor(self, livre):
+        candidato = self._escolher(lambda f: f[0] == NAO and f[2][0] in (E, OU))
+        if candidato is not None and livre >= 1:
+            numero, formula = candidato
+            interna = formula[2]
+            resultado = no(OU if interna[0] == E else E, no(NAO, interna[2]), no(NAO, interna[3]))
+            if self._cabe(resultado):
+                self._emitir(resultado, "DMOR", (numero,))
+                return True
+        # ¬¬A v ¬¬B vira ¬(¬A ∧ ¬B)
+        (a, fa), (_, fb) = self._escolher(), self._escolher()
+        dupla_a, dupla_b = no(NAO, no(NAO, fa)), no(NAO, no(NAO, fb))
+        disjuncao = no(OU, dupla_a, dupla_b)
+        resultado = no(NAO, no(E, no(NAO, fa), no(NAO, fb)))
+        if livre < 3 or not self._cabe(disjuncao, resultado):
+            return False
+        passo_dn = self._emitir(dupla_a, "DN", (a,))
+        passo_ad = self._emitir(disjuncao, "AD", (passo_dn,))
+        self._emitir(resultado, "DMOR", (passo_ad,))
+        return True
+
+    def _mp(self, livre):
+        implicacao = self._escolher(lambda f: f[0] == IMPLICA and self._procurar(f[2]) is not None)
+        if implicacao is not None and livre >= 1:
+            numero, formula = implicacao
+            self._emitir(formula[3], "MP", (numero, self._procurar(formula[2])))
+            return True
+        (a, fa), citado = self._escolher(), self._escolher()
+        if livre < 5 or not self._cabe_implicar(fa, citado[1]):
+            return False
+        passo_implicacao, formula = self._implicar(fa, citado)
+        self._emitir(formula[3], "MP", (passo_implicacao, a))
+        return True
+
+    def _mt(self, livre):
+        # D v ¬E, ¬D → ¬E (COND), ¬¬E (DN) e, por MT, ¬¬D
+        (d, fd), (e, fe) = self._escolher(), self._escolher()
+        disjuncao = no(OU, fd, no(NAO, fe))
+        implicacao = no(IMPLICA, no(NAO, fd), no(NAO, fe))
+        dupla_e, dupla_d = no(NAO, no(NAO, fe)), no(NAO, no(NAO, fd))
+        if livre < 4 or not self._cabe(disjuncao, implicacao, dupla_e, dupla_d):
+            return False
+        passo_ad = self._emitir(disjuncao, "AD", (d,))
+        passo_cond = self._emitir(implicacao, "COND", (passo_ad,))
+        passo_dn = self._emitir(dupla_e, "DN", (e,))
+        self._emitir(dupla_d, "MT", (passo_cond, passo_dn))
+        return True
+
+    def _sd(self, livre):
+        # A → B vira ¬A v B (COND); com ¬¬A (DN), SD dá B
+        implicacao = self._escolher(lambda f: f[0] == IMPLICA and self._procurar(f[2]) is not None)
+        if implicacao is not None:
+            fa, fb = implicacao[1][2:]
+            necessarios = 3
+        else:
+            (a, fa), citado = self._escolher(), self._escolher()
+            fb = citado[1]
+            necessarios = 7
+            if not self._cabe_implicar(fa, fb):
+                return False
+        disjuncao, dupla = no(OU, no(NAO, fa), fb), no(NAO, no(NAO, fa))
+        if livre < necessarios or not self._cabe(disjuncao, dupla):
+            return False
+        if implicacao is None:
+            implicacao = self._implicar(fa, citado)
+        else:
+            a = self._procurar(fa)
+        passo_cond = self._emitir(disjuncao, "COND", (implicacao[0],))
+        passo_dn = self._emitir(dupla, "DN", (a,))
+        self._emitir(fb, "SD", (passo_cond, passo_dn))
+        return True
+
+    def _sh(self, livre):
+        # A → B (do escopo ou derivada) e B → C (derivada) dão A → C
+        implicacao = self._escolher(lambda f: f[0] == IMPLICA)
+        citado = self._escolher()
+        if implicacao is None:
+            (_, fa), outro = self._escolher(), self._escolher()
+            necessarios = 9
+            primeira = no(IMPLICA, fa, outro[1])
+            pode = self._cabe_implicar(fa, outro[1])
+        else:
+            necessarios = 5
+            primeira = implicacao[1]
+            pode = True
+        resultado = no(IMPLICA, primeira[2], citado[1])
+        if livre < necessarios or not pode or not self._cabe_implicar(primeira[3], citado[1]) or not self._cabe(resultado):
+            return False
+        if implicacao is None:
+            implicacao = self._implicar(fa, outro)
+        segunda, _ = self._implicar(primeira[3], citado)
+        self._emitir(resultado, "SH", (implicacao[0], segunda))
+        return True
+
+    def _ve(self, livre):
+        # D v X, D → C e X → C dão C
+        (d, fd), citado = self._escolher(), self._escolher()
+        outra = self._formula(self.aleatorio.randint(0, self.profundidade - 2))
+        disjuncao = no(OU, fd, outra) if self.aleatorio.random() < 0.5 else no(OU, outra, fd)
+        if (livre < 10 or not self._cabe(disjuncao)
+                or not self._cabe_implicar(fd, citado[1]) or not self._cabe_implicar(outra, citado[1])):
+            return False
+        passo_ad = self._emitir(disjuncao, "AD", (d,))
+        primeira, _ = self._implicar(fd, citado)
+        segunda, _ = self._implicar(outra, citado)
+        self._emitir(citado[1], "vE", (passo_ad, primeira, segunda))
+        return True
+
+    def _introduzir_equivalencia(self, livre):
+        (a, fa), (b, fb) = self._escolher(), self._escolher()
+        equivalencia = no(EQUIVALE, fa, fb)
+        if (livre < 9 or not self._cabe(equivalencia)
+                or not self._cabe_implicar(fa, fb) or not self._cabe_implicar(fb, fa)):
+            return None
+        ida, _ = self._implicar(fa, (b, fb))
+        volta, _ = self._implicar(fb, (a, fa))
+        return self._emitir(equivalencia, "↔I", (ida, volta)), equivalencia
+
+    def _equivalencia_i(self, livre):
+        return self._introduzir_equivalencia(livre) is not None
+
+    def _equivalencia_e(self, livre):
+        equivalencia = self._escolher(lambda f: f[0] == EQUIVALE)
+        if equivalencia is None:
+            equivalencia = self._introduzir_equivalencia(livre - 1)
+        if livre < 1 or equivalencia is None:
+            return False
+        numero, formula = equivalencia
+        esquerda, direita = formula[2:]
+        resultado = no(IMPLICA, esquerda, direita) if self.aleatorio.random() < 0.5 else no(IMPLICA, direita, esquerda)
+        self._emitir(resultado, "↔E", (numero,))
+        return True
+
+    def _raa(self, livre):
+        # Supõe ¬D, chega a D ∧ ¬D e conclui ¬¬D
+        d, fd = self._escolher()
+        negacao = no(NAO, fd)
+        contradicao, resultado = no(E, fd, negacao), no(NAO, negacao)
+        if livre < 3 or not self._cabe(contradicao, resultado):
+            return False
+        self._escopos.append(_Escopo())
+        inicio = self._emitir(negacao, "Hip-RAA")
+        fim = self._emitir(contradicao, "CJ", (d, inicio))
+        self._escopos.pop()
+        self._emitir(resultado, "RAA", intervalo=(inicio, fim))
+        return True
+
+    def _pc(self, livre):
+        """Abre uma subprova com Hip-PC; ela é fechada pelo laço principal depois de alguns passos."""
+        if livre < 3 or len(self._escopos) > self.aninhamento:
+            return self._implicar_qualquer(livre)
+        hipotese = self._formula(self.aleatorio.randint(0, self.profundidade - 2))
+        escopo = _Escopo(alvo=self.aleatorio.randint(1, max(1, min(64, livre // 2))))
+        self._escopos.append(escopo)
+        numero = self._emitir(hipotese, "Hip-PC")
+        escopo.hipotese = (numero, hipotese)
+        escopo.corpo = 0
+        return True
+
+    def _implicar_qualquer(self, livre):
+        hipotese, citado = self._formula(self.aleatorio.randint(0, self.profundidade - 2)), self._escolher()
+        if livre < 4 or not self._cabe_implicar(hipotese, citado[1]):
+            return False
+        self._implicar(hipotese, citado)
+        return True
+
+    def _fechar(self):
+        """Fecha a subprova atual com PC (1 passo, ou 2 se a última fórmula for profunda demais)."""
+        escopo = self._escopos[-1]
+        numero_h, hipotese = escopo.hipotese
+        numero_fim, fim = escopo.ultimo
+        if not self._cabe(no(IMPLICA, hipotese, fim)):
+            fim = no(E, hipotese, hipotese)
+            numero_fim = self._emitir(fim, "CJ", (numero_h, numero_h))
+        self._escopos.pop()
+        self._emitir(no(IMPLICA, hipotese, fim), "PC", intervalo=(numero_h, numero_fim))
+
+    def _reiterar(self):
+        """Movimento de um passo sempre possível: P ∧ P a partir de uma premissa."""
+        numero, formula = self.aleatorio.choice(self._fixos)
+        self._emitir(no(E, formula, formula), "CJ", (numero, numero))
+
+    def linhas(self):
+        """Gera as linhas dos passos ("N. fórmula justificativa"), uma a uma."""
+        self._numero = 0
+        self._saida = []
+        self._escopos = [_Escopo()]
+        self._fixos = []
+        self._indice_fixos = {}
+        self._baralho = []
+
+        for premissa in self.premissas:
+            numero = self._emitir(premissa, "Hipótese", registrar=False)
+            self._fixos.append((numero, premissa))
+            self._indice_fixos.setdefault(premissa, numero)
+        yield from self._saida
+        self._saida.clear()
+
+        while True:
+            restante = self.total - self._numero
+            abertas = len(self._escopos) - 1
+            # Cada subprova aberta reserva 2 passos para ser fechada; a conclusão reserva 1
+            livre = restante - 2 * abertas - 1
+            escopo = self._escopos[-1]
+            if abertas and (livre <= 0 or escopo.corpo >= escopo.alvo):
+                self._fechar()
+            elif not abertas and restante == 1:
+                self._emitir(self.conclusao, "AD", (self._fixos[0][0],))
+                yield from self._saida
+                return
+            else:
+                for _ in range(len(self._movimentos)):
+                    if not self._baralho:
+                        # Cada rodada usa todas as regras, em ordem aleatória
+                        self._baralho = list(self._movimentos)
+                        self.aleatorio.shuffle(self._baralho)
+                    if self._baralho.pop()(livre):
+                        break
+                else:
+                    self._reiterar()
+            yield from self._saida
+            self._saida.clear()
+
+
+def gerar_deducao(semente=0, **opcoes):
+    """Devolve (sequente, passos) de uma dedução gerada, já montada em memória."""
+    gerador = GeradorProvas(semente, **opcoes)
+    return gerador.sequente, "\n".join(gerador.linhas())
+
+
+def escrever_jsonl(arquivo, gerador, **extras):
+    """
+    Escreve a dedução como uma linha JSONL (campos de `motor_inferencia batch`
+    mais `valido` e `defeitos`). O campo `passos` é escrito à medida que as
+    linhas são geradas, sem montar o texto inteiro.
+    """
+    arquivo.write('{"premissas_e_conclusao":' + json.dumps(gerador.sequente, ensure_ascii=False) + ',"passos":"')
+    for linha in gerador.linhas():
+        arquivo.write(json.dumps(linha + "\n", ensure_ascii=False)[1:-1])
+    final = {"valido": gerador.valido, "defeitos": [defeito._asdict() for defeito in gerador.defeitos], **extras}
+    arquivo.write('",' + json.dumps(final, ensure_ascii=False, separators=(",", ":"))[1:] + "\n")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python gerador_provas.py",
+        description="Gera deduções aleatórias (válidas ou com defeitos) para testes de escala e de carga.",
+    )
+    parser.add_argument("--quantidade", type=int, default=1, help="Número de deduções")
+    parser.add_argument("--passos", type=int, default=100, help="Passos de cada dedução")
+    parser.add_argument("--semente", default="0", help="Semente; a dedução i usa '<semente>:<i>'")
+    parser.add_argument("--profundidade", type=int, default=4, help="Profundidade máxima das fórmulas (mínimo 3)")
+    parser.add_argument("--atomos", type=int, default=4, help="Número de átomos distintos")
+    parser.add_argument("--premissas", type=int, default=3, help="Número de premissas")
+    parser.add_argument("--aninhamento", type=int, default=2, help="Máximo de subprovas umas dentro das outras")
+    parser.add_argument("--notacao", choices=NOTACOES, default="unicode", help="Notação das fórmulas")
+    parser.add_argument("--defeitos", type=int, default=0, help="Passos estragados de propósito em cada dedução")
+    parser.add_argument("--formato", choices=("jsonl", "texto"), default="jsonl",
+                        help="jsonl (entrada de 'motor_inferencia batch') ou texto (sequente na primeira linha e os passos)")
+    parser.add_argument("--saida", default="-", help="Arquivo de saída ('-' para stdout)")
+    args = parser.parse_args(argv)
+
+    saida = sys.stdout if args.saida == "-" else open(args.saida, "w", encoding="utf-8")
+    try:
+        for indice in range(args.quantidade):
+            semente = f"{args.semente}:{indice}"
+            gerador = GeradorProvas(
+                semente, passos=args.passos, profundidade=args.profundidade, atomos=args.atomos,
+                premissas=args.premissas, aninhamento=args.aninhamento, notacao=args.notacao, defeitos=args.defeitos,
+            )
+            if args.formato == "jsonl":
+                escrever_jsonl(saida, gerador, semente=semente)
+            else:
+                if indice:
+                    saida.write("\n")
+                saida.write(gerador.sequente + "\n")
+                for linha in gerador.linhas():
+                    saida.write(linha + "\n")
+    finally:
+        if saida is not sys.stdout:
+            saida.close()
+
+
+if __name__ == "__main__":
+    main()
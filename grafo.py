@@ -0,0 +1,199 @@
+import os
+import re
+import time
+import hashlib
+import subprocess
+
+# Grafo de uma dedução: montagem do código DOT, renderização pelo Graphviz e
+# cache dos SVGs. Fica fora de motor_inferencia para que a validação não
+# dependa do Graphviz; o pacote graphviz só é importado quando um grafo é montado.
+
+
+def construir_grafo(passos_dict, relacoes):
+    """Monta (sem renderizar) o grafo com os passos da dedução e as relações entre eles."""
+    from graphviz import Digraph
+
+    dot = Digraph(format="svg")
+    dot.attr(rankdir="LR")
+    dot.attr("node", shape="box", style="rounded,filled", fillcolor="lightgrey")
+    dot.attr("edge", arrowsize="0.8", fontsize="10")
+
+    # Adicionar nós
+    validos = {passo for referencias, passo, regra, valido in relacoes if valido}
+    for numero, conteudo in passos_dict.items():
+        if "(Hipótese)" in conteudo or conteudo.endswith("(Hip-RAA)") or conteudo.endswith("(Hip-PC)"):
+            cor_no = "lightgreen"  # Hipóteses, Hip-RAA e Hip-PC sempre verdes
+        else:
+            cor_no = "lightgreen" if numero in validos else "lightcoral"
+
+        dot.node(numero, f"{numero}: {conteudo}", fillcolor=cor_no)
+
+    # Adicionar arestas
+    for referencias, passo, regra, valido in relacoes:
+        cor_aresta = "green" if valido else "red"
+        for ref in referencias:
+            dot.edge(ref, passo, label=f"{regra} {'(OK)' if valido else '(Erro)'}", color=cor_aresta, fontcolor=cor_aresta)
+
+    return dot
+
+
+class CacheGrafos:
+    """
+    Cache de SVGs endereçado pelo conteúdo: cada grafo é salvo em
+    <diretorio>/<sha256 do código DOT>.svg. Grafos iguais compartilham o mesmo
+    arquivo e grafos diferentes nunca se sobrescrevem. A escrita é atômica
+    (arquivo temporário + os.replace), então validações concorrentes não se
+    atrapalham. Quando o diretório passa de `tamanho_maximo` bytes, os arquivos
+    usados há mais tempo são removidos, até sobrar `fracao_despejo` do máximo.
+
+    O tamanho do diretório é acompanhado em memória: só é lido de novo (com
+    uma varredura de todos os arquivos) quando a estimativa passa do máximo ou
+    a cada `varredura_a_cada` gravações, para contar o que outros processos
+    gravaram no mesmo diretório.
+    """
+
+    def __init__(self, diretorio, tamanho_maximo=64 * 1024 * 1024, varredura_a_cada=256, fracao_despejo=0.9):
+        self.diretorio = diretorio
+        self.tamanho_maximo = tamanho_maximo
+        self.varredura_a_cada = varredura_a_cada
+        self.fracao_despejo = fracao_despejo
+        self._tamanho = None  # Estimativa do tamanho do diretório (None antes da primeira varredura)
+        self._gravacoes = 0
+
+    def caminho(self, chave):
+        return os.path.join(self.diretorio, f"{chave}.svg")
+
+    def obter(self, chave):
+        caminho = self.caminho(chave)
+        try:
+            os.utime(caminho)  # Marca o arquivo como usado recentemente
+        except FileNotFoundError:
+            return None
+        return caminho
+
+    def guardar(self, chave, svg):
+        os.makedirs(self.diretorio, exist_ok=True)
+        caminho = self.caminho(chave)
+        temporario = f"{caminho}.{os.getpid()}.{time.monotonic_ns()}.tmp"
+        with open(temporario, "wb") as arquivo:
+            arquivo.write(svg)
+        os.replace(temporario, caminho)
+        self._gravacoes += 1
+        if self._tamanho is not None:
+            self._tamanho += len(svg)
+        if self._tamanho is None or self._tamanho > self.tamanho_maximo or self._gravacoes >= self.varredura_a_cada:
+            self.despejar()
+        return caminho
+
+    def despejar(self):
+        """
+        Lê o tamanho do diretório e, se ele passar do máximo, remove os SVGs
+        usados há mais tempo até sobrar `fracao_despejo` do tamanho máximo.
+        """
+        arquivos = []
+        total = 0
+        with os.scandir(self.diretorio) as entradas:
+            for entrada in entradas:
+                if entrada.name.endswith(".svg"):
+                    try:
+                        info = entrada.stat()
+                    except FileNotFoundError:
+                        continue
+                    arquivos.append((info.st_mtime, info.st_size, entrada.path))
+                    total += info.st_size
+        if total > self.tamanho_maximo:
+            arquivos.sort()
+            alvo = self.tamanho_maximo * self.fracao_despejo
+            for _, tamanho, caminho in arquivos:
+                if total <= alvo:
+                    break
+                try:
+                    os.remove(caminho)
+                except FileNotFoundError:
+                    pass
+                total -= tamanho
+        self._tamanho = total
+        self._gravacoes = 0
+
+
+cache_grafos = CacheGrafos(os.path.join("grafos", "cache"))
+
+
+class GrafoSVG:
+    """
+    Grafo de uma dedução cujo SVG é gerado sob demanda. O caminho do arquivo é
+    obtido com `caminho`, str() ou os.fspath(), o que dispara a renderização
+    (ou reaproveita o SVG do cache) apenas na primeira vez.
+    """
+
+    def __init__(self, fonte, cache=None):
+        self.fonte = fonte
+        self.chave = hashlib.sha256(fonte.encode("utf-8")).hexdigest()
+        self.cache = cache or cache_grafos
+        self._caminho = None
+
+    @property
+    def renderizado(self):
+        return self._caminho is not None
+
+    @property
+    def caminho(self):
+        if self._caminho is None:
+            self._caminho = self.cache.obter(self.chave)
+        if self._caminho is None:
+            self._caminho = self.cache.guardar(self.chave, executar_dot(self.fonte))
+        return self._caminho
+
+    def __fspath__(self):
+        return self.caminho
+
+    def __str__(self):
+        return self.caminho
+
+    def __repr__(self):
+        return f"GrafoSVG({self.chave[:12]}, renderizado={self.renderizado})"
+
+
+def executar_dot(fonte):
+    """
+    Executa o Graphviz uma única vez para todo o código DOT recebido e devolve o
+    SVG gerado. Levanta FileNotFoundError se o Graphviz não estiver instalado.
+    """
+    processo = subprocess.run(["dot", "-Tsvg"], input=fonte.encode("utf-8"), capture_output=True)
+    if processo.returncode != 0:
+        raise RuntimeError(f"Graphviz falhou: {processo.stderr.decode('utf-8', 'replace').strip()}")
+    return processo.stdout
+
+
+def renderizar_grafos(grafos):
+    """
+    Renderiza vários grafos em uma única execução do Graphviz. Grafos já
+    presentes no cache não são enviados ao dot. Devolve os caminhos dos SVGs.
+    """
+    pendentes = {}
+    for grafo in grafos:
+        if not grafo.renderizado and grafo.cache.obter(grafo.chave) is None:
+            pendentes.setdefault(grafo.chave, grafo)
+
+    if pendentes:
+        # O dot aceita vários grafos na mesma entrada e gera um documento SVG para cada um
+        saida = executar_dot("\n".join(grafo.fonte for grafo in pendentes.values())).decode("utf-8")
+        documentos = [d for d in re.split(r'(?=<\?xml )', saida) if d.strip()]
+        if len(documentos) != len(pendentes):
+            raise RuntimeError("Graphviz não gerou um SVG para cada grafo.")
+        for grafo, svg in zip(pendentes.values(), documentos):
+            grafo.cache.guardar(grafo.chave, svg.encode("utf-8"))
+
+    return [grafo.caminho for grafo in grafos]
+
+
+def gerar_grafo(passos_dict, relacoes, premissas, renderizar="eager"):
+    """
+    Gera o grafo da dedução. No modo "eager" o SVG é renderizado (ou obtido do
+    cache) imediatamente e o caminho é devolvido; no modo "lazy" é devolvido um
+    GrafoSVG que só renderiza quando o caminho for pedido.
+    """
+    grafo = GrafoSVG(construir_grafo(passos_dict, relacoes).source)
+    if renderizar == "lazy":
+        return grafo
+    return grafo.caminho
@@ -1,23 +1,395 @@
 import sys
-import requests
+from collections import namedtuple
+from xml.etree import ElementTree
 from PyQt5.QtWidgets import (
-    QApplication, QMainWindow, QVBoxLayout, QLabel, QTextEdit, QPushButton, 
-    QWidget, QMessageBox, QGraphicsView, QGraphicsScene, QScrollArea
+    QApplication, QMainWindow, QVBoxLayout, QLabel, QTextEdit, QPlainTextEdit, QPushButton,
+    QWidget, QMessageBox, QGraphicsView, QGraphicsScene, QGraphicsItem, QStyleOptionGraphicsItem, QProgressBar,
+    QCheckBox, QHBoxLayout
 )
-from PyQt5.QtGui import QFont, QPainter, QPixmap  # Importa QPainter e QPixmap
-from PyQt5.QtSvg import QSvgRenderer
-from PyQt5.QtCore import Qt
-from motor_inferencia import validar  # Importação do backend
+from PyQt5.QtGui import QFont, QPainter, QColor, QTransform, QTextCharFormat, QTextFormat, QTextCursor
+from PyQt5.QtSvg import QSvgRenderer, QGraphicsSvgItem
+from PyQt5.QtCore import Qt, QObject, QRunnable, QThreadPool, QCoreApplication, QByteArray, QRectF, QTimer, pyqtSignal
+from motor_inferencia import validar, ValidacaoAoVivo  # Importação do backend
 import os
 
+# Endereço da API do Qwen (veja qwen.py)
+URL_API = os.environ.get("QWEN_API", "http://localhost:8000")
+TIMEOUT_API = (5, 300)  # (conexão, leitura) em segundos
+
+# Pausa na digitação após a qual a validação ao vivo é refeita
+ATRASO_AO_VIVO_MS = 300
+
+
+class SinaisTarefa(QObject):
+    concluida = pyqtSignal(object)
+    falhou = pyqtSignal(str)
+    terminada = pyqtSignal()
+
+
+class Tarefa(QRunnable):
+    """
+    Executa `funcao(*args)` em uma thread do QThreadPool e entrega o resultado
+    à thread da interface pelos sinais `concluida` e `falhou`. Uma tarefa
+    cancelada termina normalmente, mas o resultado é descartado.
+    """
+
+    def __init__(self, funcao, *args):
+        super().__init__()
+        self.setAutoDelete(False)
+        self.funcao = funcao
+        self.args = args
+        self.sinais = SinaisTarefa()
+        self.cancelada = False
+
+    def cancelar(self):
+        self.cancelada = True
+
+    def run(self):
+        try:
+            resultado = self.funcao(*self.args)
+        except Exception as e:
+            if not self.cancelada:
+                self.sinais.falhou.emit(str(e))
+        else:
+            if not self.cancelada:
+                self.sinais.concluida.emit(resultado)
+        finally:
+            self.sinais.terminada.emit()
+
+
+def consultar_modelo(sessao, prompt, max_tokens):
+    """Pede a resposta ao Qwen (executada fora da thread da interface)."""
+    response = sessao.post(
+        f"{URL_API}/generate",
+        json={"prompt": prompt, "max_tokens": max_tokens},
+        timeout=TIMEOUT_API,
+    )
+    response.raise_for_status()
+    data = response.json()
+
+    full_answer = data['answer']
+    return full_answer.split("Explicação:")[0].strip()
+
+
+SVG = "{http://www.w3.org/2000/svg}"
+
+ElementoGrafo = namedtuple("ElementoGrafo", ["id", "tipo", "assinatura", "cor", "textos"])
+ElementoGrafo.__doc__ = """
+Nó ou aresta do SVG gerado pelo Graphviz. `assinatura` identifica o conteúdo
+do elemento (incluindo as coordenadas), `cor` é o preenchimento do nó, usado
+quando o grafo é desenhado sem detalhes, e `textos` é um retângulo aproximado
+(x, y, largura, altura) que cobre os rótulos, ou None.
+"""
+
+GrafoVetorial = namedtuple("GrafoVetorial", ["caminho", "renderer", "elementos"])
+
+
+def ler_grafo(caminho_grafo):
+    """
+    Carrega o SVG em um QSvgRenderer e lista os nós e arestas (executada fora
+    da thread da interface). O renderer é transferido para a thread da
+    interface, onde será usado pelos itens da cena.
+    """
+    with open(caminho_grafo, "rb") as arquivo:
+        dados = arquivo.read()
+    renderer = QSvgRenderer(QByteArray(dados))
+
+    elementos = []
+    raiz = ElementTree.fromstring(dados)
+    # A transformação do grupo principal afeta a posição de todos os elementos
+    grupo = raiz.find(f"{SVG}g")
+    transformacao = grupo.get("transform", "") if grupo is not None else ""
+    for g in raiz.iter(f"{SVG}g"):
+        tipo = g.get("class")
+        if tipo not in ("node", "edge") or not g.get("id"):
+            continue
+        forma = next((filho for filho in g if filho.get("fill") not in (None, "none")), None)
+        cor = forma.get("fill") if tipo == "node" and forma is not None else None
+        assinatura = hash((transformacao, ElementTree.tostring(g)))
+        elementos.append(ElementoGrafo(g.get("id"), tipo, assinatura, cor, limites_textos(g)))
+
+    renderer.moveToThread(QCoreApplication.instance().thread())
+    return GrafoVetorial(os.fspath(caminho_grafo), renderer, elementos)
+
+
+def limites_textos(g):
+    """
+    Estima o retângulo ocupado pelos <text> do elemento. O QSvgRenderer não
+    inclui texto em boundsOnElement, e os rótulos das arestas ficam fora do
+    traçado, então sem isso eles seriam cortados.
+    """
+    retangulo = None
+    for texto in g.iter(f"{SVG}text"):
+        tamanho = float(texto.get("font-size", 14))
+        largura = 0.6 * tamanho * len(texto.text or "")
+        x, y = float(texto.get("x", 0)), float(texto.get("y", 0))
+        ancora = texto.get("text-anchor", "start")
+        x -= largura / 2 if ancora == "middle" else largura if ancora == "end" else 0
+        atual = (x, y - tamanho, x + largura, y + 0.3 * tamanho)
+        if retangulo is not None:
+            atual = (min(retangulo[0], atual[0]), min(retangulo[1], atual[1]),
+                     max(retangulo[2], atual[2]), max(retangulo[3], atual[3]))
+        retangulo = atual
+    if retangulo is None:
+        return None
+    return (retangulo[0], retangulo[1], retangulo[2] - retangulo[0], retangulo[3] - retangulo[1])
+
+
+def validar_e_carregar_grafo(premissas_e_conclusao, passos):
+    """Valida a dedução e prepara o grafo para exibição (executada fora da thread da interface)."""
+    resultado, relatorio, caminho_grafo = validar(premissas_e_conclusao, passos)
+    grafo = None
+    if caminho_grafo and os.path.exists(caminho_grafo):
+        grafo = ler_grafo(caminho_grafo)
+    return resultado, str(relatorio), caminho_grafo, grafo
+
+
+def carregar_grafo(grafo):
+    """Renderiza (ou obtém do cache) o SVG de um GrafoSVG e o prepara para exibição."""
+    try:
+        caminho = grafo.caminho
+    except FileNotFoundError:
+        return None  # Graphviz não instalado
+    return ler_grafo(caminho)
+
+
+def carregar_grafo_ao_vivo(versao):
+    """Monta o código DOT de uma versão da validação ao vivo e prepara o grafo (executada fora da thread da interface)."""
+    grafo = versao.grafo()
+    return carregar_grafo(grafo) if grafo is not None else None
+
+
+def montar_relatorio_ao_vivo(versao, passos):
+    """
+    Monta as linhas do relatório de uma versão da validação ao vivo e acha as
+    linhas de `passos` que devem ser destacadas (executada fora da thread da interface).
+    """
+    relatorio = versao.relatorio()
+    # Algumas mensagens ocupam mais de uma linha; cada linha vira um bloco do documento
+    linhas = [parte for linha in relatorio.linhas() for parte in linha.split("\n")]
+    return linhas, linhas_com_erro(relatorio, passos)
+
+
+def linhas_com_erro(relatorio, passos):
+    """Números (a partir de 0) das linhas do texto dos passos com erro ou mal formadas."""
+    invalidos = {passo for passo, item in relatorio.passos.items() if not item.valido}
+    linhas_invalidas = {evento.args["linha"] for evento in relatorio.eventos if evento.codigo == "linha_invalida"}
+    if not invalidos and not linhas_invalidas:
+        return []
+    numeros = []
+    # Cada linha do texto (separadas por "\n" em toPlainText) é um bloco do documento
+    for numero, linha in enumerate(passos.split("\n")):
+        passo, ponto, _ = linha.partition(".")
+        if (ponto and passo.strip() in invalidos) or linha.strip() in linhas_invalidas:
+            numeros.append(numero)
+    return numeros
+
+
+def substituir_linhas(editor, antigas, novas):
+    """
+    Troca o texto do editor, com uma linha por bloco, de `antigas` para `novas`
+    reescrevendo só os blocos que mudaram. Com o mesmo número de linhas, cada
+    linha diferente é trocada no lugar; senão, o trecho entre o início e o fim
+    em comum. Em um QPlainTextEdit com o relatório de 10 mil passos, isso custa
+    poucos milissegundos, contra cerca de 70 ms para refazer o documento com
+    setPlainText (que ainda volta a rolagem ao início).
+    """
+    if not antigas or not novas:
+        editor.setPlainText("\n".join(novas))
+        return
+    if len(antigas) == len(novas):
+        trechos = [(i, i + 1, i + 1) for i, (antiga, nova) in enumerate(zip(antigas, novas)) if antiga != nova]
+    else:
+        inicio = 0
+        while inicio < min(len(antigas), len(novas)) and antigas[inicio] == novas[inicio]:
+            inicio += 1
+        fim_antigas, fim_novas = len(antigas), len(novas)
+        while fim_antigas > inicio and fim_novas > inicio and antigas[fim_antigas - 1] == novas[fim_novas - 1]:
+            fim_antigas -= 1
+            fim_novas -= 1
+        # Os dois trechos precisam de ao menos uma linha (uma igual serve)
+        if fim_antigas == inicio or fim_novas == inicio:
+            if inicio > 0:
+                inicio -= 1
+            else:
+                fim_antigas += 1
+                fim_novas += 1
+        trechos = [(inicio, fim_antigas, fim_novas)]
+    if sum(fim - inicio for inicio, fim, _ in trechos) > len(antigas) // 2:
+        editor.setPlainText("\n".join(novas))
+        return
+
+    documento = editor.document()
+    cursor = QTextCursor(documento)
+    cursor.beginEditBlock()
+    for inicio, fim_antigas, fim_novas in trechos:
+        cursor.setPosition(documento.findBlockByNumber(inicio).position())
+        ultimo = documento.findBlockByNumber(fim_antigas - 1)
+        cursor.setPosition(ultimo.position() + ultimo.length() - 1, QTextCursor.KeepAnchor)
+        cursor.insertText("\n".join(novas[inicio:fim_novas]))
+    cursor.endEditBlock()
+
+
+class ItemGrafo(QGraphicsSvgItem):
+    """
+    Um nó ou aresta do grafo, desenhado como vetor a partir do renderer
+    compartilhado. Com zoom muito afastado, em que o texto ficaria ilegível,
+    os nós viram retângulos coloridos, bem mais baratos de desenhar.
+    """
+
+    DETALHE_MINIMO = 0.35
+
+    def __init__(self, elemento, renderer):
+        super().__init__()
+        self.setCacheMode(QGraphicsItem.DeviceCoordinateCache)
+        self.associar(elemento, renderer)
+
+    def associar(self, elemento, renderer):
+        self.elemento = elemento
+        self.renderizador = renderer  # Mantém o renderer vivo enquanto o item o usa
+        self.cor = QColor(elemento.cor) if elemento.cor else None
+        self.setSharedRenderer(renderer)
+        self.prepareGeometryChange()
+        self.limites = None
+        if elemento.id:
+            self.setElementId(elemento.id)
+            # O item desenha o elemento a partir da origem; a posição vem dos limites do elemento
+            limites = renderer.boundsOnElement(elemento.id)
+            self.setTransform(QTransform.fromTranslate(limites.x(), limites.y()) * renderer.transformForElement(elemento.id))
+            if elemento.textos:
+                textos = QRectF(*elemento.textos).translated(-limites.x(), -limites.y())
+                self.limites = super().boundingRect().united(textos)
+
+    def boundingRect(self):
+        # Inclui os rótulos; o desenho continua nos limites do traçado
+        return self.limites if self.limites is not None else super().boundingRect()
+
+    def paint(self, painter, option, widget=None):
+        detalhe = QStyleOptionGraphicsItem.levelOfDetailFromTransform(painter.worldTransform())
+        if self.cor is not None and detalhe < self.DETALHE_MINIMO:
+            painter.fillRect(self.boundingRect(), self.cor)
+            return
+        super().paint(painter, option, widget)
+
+
+class VisualizadorGrafo(QGraphicsView):
+    """
+    Exibe o grafo da dedução como vetor, com zoom pela roda do mouse (centrado
+    no cursor) e arraste para mover. Só os itens visíveis são desenhados e
+    cada um guarda o próprio cache na resolução da tela. Ao exibir um novo
+    grafo, os itens são reaproveitados pelo id do elemento; os que não mudaram
+    continuam com o renderer antigo e não são redesenhados.
+    """
+
+    ZOOM_MINIMO = 0.02
+    ZOOM_MAXIMO = 8.0
+    # Acima deste número de renderers em uso, todos os itens passam para o mais recente
+    RENDERERS_MAXIMO = 3
+
+    def __init__(self):
+        super().__init__()
+        self.setScene(QGraphicsScene(self))
+        self.setRenderHints(QPainter.Antialiasing | QPainter.TextAntialiasing | QPainter.SmoothPixmapTransform)
+        self.setDragMode(QGraphicsView.ScrollHandDrag)
+        self.setTransformationAnchor(QGraphicsView.AnchorUnderMouse)
+        self.setBackgroundBrush(Qt.white)
+        self.grafo = None
+        self.itens = {}
+        self.ajustado = True  # Enquanto o usuário não mexer no zoom, o grafo acompanha o tamanho da janela
+
+    def mostrar(self, grafo):
+        if self.grafo is not None and grafo.caminho == self.grafo.caminho:
+            return  # Mesmo SVG (o cache de grafos é endereçado pelo conteúdo)
+
+        elementos = grafo.elementos or [ElementoGrafo("", "documento", None, None, None)]
+        renderers = {id(item.renderizador) for item in self.itens.values()} | {id(grafo.renderer)}
+        reassociar_todos = len(renderers) > self.RENDERERS_MAXIMO
+
+        novos = {}
+        for elemento in elementos:
+            item = self.itens.pop(elemento.id, None)
+            if item is None:
+                item = ItemGrafo(elemento, grafo.renderer)
+                self.scene().addItem(item)
+            elif reassociar_todos or elemento.assinatura is None or item.elemento.assinatura != elemento.assinatura:
+                item.associar(elemento, grafo.renderer)
+            novos[elemento.id] = item
+        for item in self.itens.values():
+            self.scene().removeItem(item)
+        self.itens = novos
+        self.grafo = grafo
+
+        self.scene().setSceneRect(grafo.renderer.viewBoxF())
+        if self.ajustado:
+            self.ajustar()
+
+    def limpar(self):
+        self.scene().clear()
+        self.itens = {}
+        self.grafo = None
+
+    def ajustar(self):
+        self.fitInView(self.sceneRect(), Qt.KeepAspectRatio)
+        self.ajustado = True
+
+    def zoom(self, fator):
+        escala = self.transform().m11()
+        fator = max(self.ZOOM_MINIMO / escala, min(fator, self.ZOOM_MAXIMO / escala))
+        self.scale(fator, fator)
+        self.ajustado = False
+
+    def wheelEvent(self, event):
+        # Proporcional ao deslocamento, para um zoom suave também em touchpads
+        passo = event.angleDelta().y() or event.pixelDelta().y()
+        if passo:
+            self.zoom(1.0015 ** passo)
+
+    def keyPressEvent(self, event):
+        if event.key() in (Qt.Key_Plus, Qt.Key_Equal):
+            self.zoom(1.25)
+        elif event.key() == Qt.Key_Minus:
+            self.zoom(0.8)
+        elif event.key() == Qt.Key_0:
+            self.ajustar()
+        else:
+            super().keyPressEvent(event)
+
+    def mouseDoubleClickEvent(self, event):
+        self.ajustar()
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        if self.ajustado and self.grafo is not None:
+            self.ajustar()
+
 
 class SistemaDeDeducao(QMainWindow):
     def __init__(self):
         super().__init__()
         self.setWindowTitle("Sistema de Dedução Natural")
         self.resize(1200, 800)
+
+        # Trabalho pesado roda no pool; a sessão HTTP reaproveita as conexões
+        self.pool = QThreadPool.globalInstance()
+        self._sessao = None
+        self.tarefas = {}
+        self.em_execucao = set()  # Mantém vivas as tarefas (inclusive canceladas) até terminarem
+
+        # Validação ao vivo: a sessão guarda o resultado de cada passo entre as edições
+        self.sessao_ao_vivo = None
+        self.sequente_ao_vivo = None
+        self.grafo_ao_vivo_exibido = False  # O grafo na tela é o da sessão ao vivo atual
+        self.linhas_resultado = None  # Linhas do relatório ao vivo na área de resultado
         self.initUI()
 
+    @property
+    def sessao(self):
+        # O requests só é importado na primeira consulta ao modelo
+        if self._sessao is None:
+            import requests
+            self._sessao = requests.Session()
+        return self._sessao
+
     def initUI(self):
         # Layout principal
         main_layout = QVBoxLayout()
@@ -66,29 +438,97 @@ class SistemaDeDeducao(QMainWindow):
         self.validate_button = QPushButton("Validar Dedução")
         self.validate_button.setFont(QFont("Arial", 12))
         self.validate_button.clicked.connect(self.validar_deducao)
-        main_layout.addWidget(self.validate_button)
+        self.live_checkbox = QCheckBox("Validação ao vivo")
+        self.live_checkbox.setFont(QFont("Arial", 12))
+        self.live_checkbox.toggled.connect(self.alternar_ao_vivo)
+        botoes = QHBoxLayout()
+        botoes.addWidget(self.validate_button, 1)
+        botoes.addWidget(self.live_checkbox)
+        main_layout.addLayout(botoes)
+
+        # Cada edição reinicia o temporizador; a validação só roda quando a digitação pausa
+        self.temporizador = QTimer(self)
+        self.temporizador.setSingleShot(True)
+        self.temporizador.setInterval(ATRASO_AO_VIVO_MS)
+        self.temporizador.timeout.connect(self.validar_ao_vivo)
+        self.input_field.textChanged.connect(self.agendar_ao_vivo)
+        self.steps_field.textChanged.connect(self.agendar_ao_vivo)
 
         # Área para exibição de mensagens de validação
         self.result_label = QLabel("Resultado:")
         self.result_label.setFont(QFont("Arial", 12))
         main_layout.addWidget(self.result_label)
-        self.result_area = QTextEdit()
+        # Texto simples: o QPlainTextEdit só refaz o layout dos blocos alterados, e a
+        # validação ao vivo reescreve só as linhas do relatório que mudaram
+        self.result_area = QPlainTextEdit()
         self.result_area.setReadOnly(True)
+        self.result_area.setUndoRedoEnabled(False)
         main_layout.addWidget(self.result_area)
 
-        # Área para exibição do gráfico SVG com QGraphicsView e QScrollArea
-        self.svg_area = QScrollArea()
-        self.svg_view = QGraphicsView()
-        self.scene = QGraphicsScene()
-        self.svg_view.setScene(self.scene)
-        self.svg_area.setWidget(self.svg_view)
-        self.svg_area.setWidgetResizable(True)
-        main_layout.addWidget(self.svg_area) # Adiciona a área de scroll ao layout
+        # Área para exibição do grafo (vetorial, com zoom e arraste)
+        self.svg_view = VisualizadorGrafo()
+        self.svg_view.setToolTip("Roda do mouse: zoom · arrastar: mover · duplo clique ou 0: ajustar")
+        main_layout.addWidget(self.svg_view)
+
+        # Indicador de progresso das tarefas em andamento
+        self.progress_bar = QProgressBar()
+        self.progress_bar.setRange(0, 0)
+        self.progress_bar.setMaximumWidth(200)
+        self.progress_bar.hide()
+        self.statusBar().addPermanentWidget(self.progress_bar)
 
         # Widget principal
         container = QWidget()
         container.setLayout(main_layout)
         self.setCentralWidget(container)
+
+    def executar(self, tipo, mensagem, funcao, *args, ao_concluir, ao_falhar):
+        """
+        Executa `funcao` no pool. Uma nova tarefa do mesmo tipo cancela a
+        anterior, cujo resultado é ignorado quando chegar.
+        """
+        anterior = self.tarefas.get(tipo)
+        if anterior is not None:
+            anterior.cancelar()
+
+        tarefa = Tarefa(funcao, *args)
+        tarefa.sinais.concluida.connect(lambda resultado: self.finalizar(tipo, tarefa, ao_concluir, resultado))
+        tarefa.sinais.falhou.connect(lambda erro: self.finalizar(tipo, tarefa, ao_falhar, erro))
+        tarefa.sinais.terminada.connect(lambda: self.em_execucao.discard(tarefa))
+        self.tarefas[tipo] = tarefa
+        self.em_execucao.add(tarefa)
+        self.atualizar_progresso(mensagem)
+        self.pool.start(tarefa)
+
+    def cancelar(self, *tipos):
+        for tipo in tipos:
+            tarefa = self.tarefas.pop(tipo, None)
+            if tarefa is not None:
+                tarefa.cancelar()
+        self.atualizar_progresso()
+
+    def finalizar(self, tipo, tarefa, callback, valor):
+        if self.tarefas.get(tipo) is not tarefa:
+            return
+        del self.tarefas[tipo]
+        self.atualizar_progresso()
+        callback(valor)
+
+    def atualizar_progresso(self, mensagem=None):
+        if self.tarefas:
+            self.progress_bar.show()
+            self.statusBar().showMessage(mensagem or "Processando...")
+        else:
+            self.progress_bar.hide()
+            self.statusBar().clearMessage()
+
+    def closeEvent(self, event):
+        for tarefa in self.tarefas.values():
+            tarefa.cancelar()
+        # Sem consultas ao modelo, não há sessão (nem o requests) para fechar
+        if self._sessao is not None:
+            self._sessao.close()
+        super().closeEvent(event)
    
 
     def gerar_resposta(self):
@@ -99,20 +539,11 @@ class SistemaDeDeducao(QMainWindow):
             QMessageBox.warning(self, "Erro", "Por favor, insira um prompt!")
             return
 
-        try:
-            response = requests.post(
-                "http://localhost:8000/generate",
-                json={"prompt": prompt, "max_tokens": max_tokens}  
-            )
-            response.raise_for_status()
-            data = response.json()
-
-            full_answer = data['answer']
-            filtered_answer = full_answer.split("Explicação:")[0].strip()
-            self.generated_response_area.setText(filtered_answer)
-
-        except requests.exceptions.RequestException as e:
-            QMessageBox.critical(self, "Erro", f"Erro ao conectar com a API: {e}")
+        self.executar(
+            "geracao", "Gerando resposta...", consultar_modelo, self.sessao, prompt, max_tokens,
+            ao_concluir=self.generated_response_area.setText,
+            ao_falhar=lambda erro: QMessageBox.critical(self, "Erro", f"Erro ao conectar com a API: {erro}"),
+        )
 
 
     def validar_deducao(self):
@@ -123,33 +554,121 @@ class SistemaDeDeducao(QMainWindow):
             QMessageBox.warning(self, "Erro", "Por favor, preencha todos os campos!")
             return
 
-        try:
-            resultado, feedback, caminho_grafo = validar(premissas_e_conclusao, passos)
-            self.result_area.setText(feedback)
-
-            if caminho_grafo and os.path.exists(caminho_grafo):
-                self.scene.clear()
-                renderer = QSvgRenderer(caminho_grafo)
-                bounds = renderer.viewBoxF()  # Obtém as dimensões da viewbox do SVG
-                pixmap = QPixmap(bounds.size().toSize()) # Cria um pixmap com o tamanho correto
-                pixmap.fill(Qt.transparent) # Preenche com fundo transparente
-                painter = QPainter(pixmap)
-                renderer.render(painter)
-                painter.end()
-                item = self.scene.addPixmap(pixmap)
-                self.scene.setSceneRect(bounds) # Define o retângulo da cena
-                self.svg_view.fitInView(bounds, Qt.KeepAspectRatio)
-            elif caminho_grafo:
+        self.executar(
+            "validacao", "Validando dedução...", validar_e_carregar_grafo, premissas_e_conclusao, passos,
+            ao_concluir=self.exibir_validacao,
+            ao_falhar=lambda erro: QMessageBox.critical(self, "Erro", erro),
+        )
+
+    def exibir_validacao(self, resultado_validacao):
+        resultado, relatorio, caminho_grafo, grafo = resultado_validacao
+        # Resultados ao vivo ainda pendentes não sobrescrevem os desta validação
+        self.cancelar("relatorio", "grafo")
+        self.result_area.setPlainText(relatorio)
+        self.linhas_resultado = None
+        self.grafo_ao_vivo_exibido = False  # A validação ao vivo volta a exibir o próprio grafo
+
+        if grafo is not None:
+            self.svg_view.mostrar(grafo)
+        else:
+            self.svg_view.limpar()
+            if caminho_grafo:
                 QMessageBox.warning(self, "Erro", "Arquivo SVG não encontrado.")
 
-            if resultado:
-                QMessageBox.information(self, "Validação", "Dedução válida!")
-            else:
-                QMessageBox.warning(self, "Validação", "Dedução inválida.")
+        if resultado:
+            QMessageBox.information(self, "Validação", "Dedução válida!")
+        else:
+            QMessageBox.warning(self, "Validação", "Dedução inválida.")
 
-        except Exception as e:
-            QMessageBox.critical(self, "Erro", str(e))
+    def alternar_ao_vivo(self, ativo):
+        if ativo:
+            self.validar_ao_vivo()
+        else:
+            self.temporizador.stop()
+            self.cancelar("relatorio", "grafo")
+            self.sessao_ao_vivo = None
+            self.sequente_ao_vivo = None
+            self.steps_field.setExtraSelections([])
+            self.result_label.setText("Resultado:")
+
+    def agendar_ao_vivo(self):
+        if self.live_checkbox.isChecked():
+            self.temporizador.start()
+
+    def validar_ao_vivo(self):
+        """
+        Revalida a dedução após uma edição. Só os passos alterados e os que os
+        citam são verificados de novo, então isso roda na própria thread da
+        interface, junto com a cópia da versão (`ValidacaoAoVivo.versao`).
+        O relatório e o código DOT, que percorrem todos os passos, são montados
+        no pool; o grafo só quando algum nó ou aresta mudou.
+        """
+        premissas_e_conclusao = self.input_field.toPlainText().strip()
+        if premissas_e_conclusao != self.sequente_ao_vivo:
+            self.sequente_ao_vivo = premissas_e_conclusao
+            self.grafo_ao_vivo_exibido = False
+            try:
+                self.sessao_ao_vivo = ValidacaoAoVivo(premissas_e_conclusao)
+            except Exception as e:
+                self.sessao_ao_vivo = None
+                self.cancelar("relatorio", "grafo")
+                self.result_label.setText("Resultado: sequente inválido")
+                self.result_area.setPlainText(f"Erro durante o processamento: {e}")
+                self.linhas_resultado = None
+                return
+        if self.sessao_ao_vivo is None:
+            return
+
+        passos = self.steps_field.toPlainText()
+        valido, _ = self.sessao_ao_vivo.atualizar(passos)
+        versao = self.sessao_ao_vivo.versao()
+        self.result_label.setText("Resultado: dedução válida" if valido else "Resultado: dedução inválida")
+        # O destaque só vale para o texto validado; se ele mudou, outra validação já está agendada
+        revisao = self.steps_field.document().revision()
+        self.executar(
+            "relatorio", "Montando o relatório...", montar_relatorio_ao_vivo, versao, passos,
+            ao_concluir=lambda resultado: self.exibir_relatorio_ao_vivo(resultado, revisao),
+            ao_falhar=lambda erro: self.statusBar().showMessage(f"O relatório não foi atualizado: {erro}", 5000),
+        )
+
+        if self.grafo_ao_vivo_exibido and not self.sessao_ao_vivo.grafo_alterado:
+            return
+        self.grafo_ao_vivo_exibido = True
+        self.executar(
+            "grafo", "Atualizando o grafo...", carregar_grafo_ao_vivo, versao,
+            ao_concluir=self.exibir_grafo,
+            ao_falhar=lambda erro: self.statusBar().showMessage(f"O grafo não foi atualizado: {erro}", 5000),
+        )
+
+    def exibir_relatorio_ao_vivo(self, resultado, revisao):
+        linhas, com_erro = resultado
+        if self.linhas_resultado is None:
+            self.result_area.setPlainText("\n".join(linhas))
+        else:
+            substituir_linhas(self.result_area, self.linhas_resultado, linhas)
+        self.linhas_resultado = linhas
+        if revisao == self.steps_field.document().revision():
+            self.marcar_linhas(com_erro)
+
+    def exibir_grafo(self, grafo):
+        if grafo is None:
+            self.svg_view.limpar()
+        else:
+            self.svg_view.mostrar(grafo)
 
+    def marcar_linhas(self, numeros):
+        """Destaca no campo de passos as linhas com erro."""
+        formato = QTextCharFormat()
+        formato.setBackground(QColor("#ffd6d6"))
+        formato.setProperty(QTextFormat.FullWidthSelection, True)
+        documento = self.steps_field.document()
+        selecoes = []
+        for numero in numeros:
+            selecao = QTextEdit.ExtraSelection()
+            selecao.format = formato
+            selecao.cursor = QTextCursor(documento.findBlockByNumber(numero))
+            selecoes.append(selecao)
+        self.steps_field.setExtraSelections(selecoes)
 
 if __name__ == "__main__":
     app = QApplication(sys.argv)
@@ -0,0 +1,199 @@
+import os
+import time
+import bisect
+import threading
+
+# Limites (segundos) dos histogramas de latência
+LIMITES_PADRAO = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+class Medicao:
+    """
+    Tempos de uma validação: para cada fase de `validar` e para cada regra,
+    o número de chamadas e o total em segundos (e, nas regras, quantas
+    aplicações foram rejeitadas).
+    """
+    __slots__ = ("fases", "regras", "total")
+
+    def __init__(self):
+        self.fases = {}
+        self.regras = {}
+        self.total = 0.0
+
+    def fase(self, nome, segundos):
+        dados = self.fases.setdefault(nome, [0, 0.0])
+        dados[0] += 1
+        dados[1] += segundos
+
+    def regra(self, nome, segundos, erro=False):
+        dados = self.regras.setdefault(nome, [0, 0.0, 0])
+        dados[0] += 1
+        dados[1] += segundos
+        dados[2] += erro
+
+    def medir_regras(self, verificar):
+        """Envolve `verificar(passo, justificativa, deducao)` medindo cada chamada pela regra do passo."""
+        def verificar_medindo(passo, justificativa, deducao):
+            comeco = time.perf_counter()
+            try:
+                verificar(passo, justificativa, deducao)
+            except Exception:
+                self.regra(justificativa.regra, time.perf_counter() - comeco, erro=True)
+                raise
+            self.regra(justificativa.regra, time.perf_counter() - comeco)
+        return verificar_medindo
+
+    def para_dict(self):
+        return {
+            "total": self.total,
+            "fases": {nome: {"chamadas": c, "segundos": s} for nome, (c, s) in self.fases.items()},
+            "regras": {nome: {"chamadas": c, "segundos": s, "erros": e} for nome, (c, s, e) in self.regras.items()},
+        }
+
+
+class Cronometro:
+    """Marca o fim de cada fase; sem uma Medicao, não faz nada."""
+    __slots__ = ("medicao", "_ultimo")
+
+    def __init__(self, medicao):
+        self.medicao = medicao
+        self._ultimo = time.perf_counter() if medicao is not None else 0.0
+
+    def marcar(self, fase):
+        if self.medicao is not None:
+            agora = time.perf_counter()
+            self.medicao.fase(fase, agora - self._ultimo)
+            self._ultimo = agora
+
+
+def _rotulos(nomes, valores, extra=None):
+    pares = list(zip(nomes, valores))
+    if extra is not None:
+        pares.append(extra)
+    if not pares:
+        return ""
+    texto = ",".join(
+        '{}="{}"'.format(nome, str(valor).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+        for nome, valor in pares
+    )
+    return "{" + texto + "}"
+
+
+def _numero(valor):
+    return repr(float(valor)) if isinstance(valor, float) else str(valor)
+
+
+def formatar_metrica(nome, tipo, ajuda, amostras, rotulos=()):
+    """Linhas no formato de texto do Prometheus para `amostras` ({valores dos rótulos: valor})."""
+    linhas = [f"# HELP {nome} {ajuda}", f"# TYPE {nome} {tipo}"]
+    for valores, valor in amostras.items():
+        linhas.append(f"{nome}{_rotulos(rotulos, valores)} {_numero(valor)}")
+    return linhas
+
+
+class Histograma:
+    """Histograma cumulativo no estilo do Prometheus, opcionalmente com rótulos."""
+
+    def __init__(self, nome, ajuda, rotulos=(), limites=LIMITES_PADRAO):
+        self.nome = nome
+        self.ajuda = ajuda
+        self.rotulos = tuple(rotulos)
+        self.limites = tuple(limites)
+        self._series = {}  # valores dos rótulos -> [contagem por faixa..., soma]
+        self._trava = threading.Lock()
+
+    def observar(self, valor, *valores_rotulos):
+        with self._trava:
+            serie = self._series.get(valores_rotulos)
+            if serie is None:
+                serie = self._series[valores_rotulos] = [0] * (len(self.limites) + 1) + [0.0]
+            serie[bisect.bisect_left(self.limites, valor)] += 1
+            serie[-1] += valor
+
+    def limpar(self):
+        with self._trava:
+            self._series.clear()
+
+    def prometheus(self):
+        linhas = [f"# HELP {self.nome} {self.ajuda}", f"# TYPE {self.nome} histogram"]
+        with self._trava:
+            series = {valores: list(serie) for valores, serie in self._series.items()}
+        for valores, serie in sorted(series.items()):
+            acumulado = 0
+            for limite, contagem in zip(self.limites + (float("inf"),), serie):
+                acumulado += contagem
+                le = "+Inf" if limite == float("inf") else repr(limite)
+                linhas.append(f"{self.nome}_bucket{_rotulos(self.rotulos, valores, ('le', le))} {acumulado}")
+            linhas.append(f"{self.nome}_sum{_rotulos(self.rotulos, valores)} {_numero(serie[-1])}")
+            linhas.append(f"{self.nome}_count{_rotulos(self.rotulos, valores)} {acumulado}")
+        return linhas
+
+
+class MetricasValidacao:
+    """
+    Soma das medições de todas as validações do processo. A medição só é
+    feita quando `ativo` (VALIDAR_METRICAS=1 ou ativar()) ou quando `validar`
+    recebe medir=True; desativada, não custa nada por passo.
+    """
+
+    def __init__(self, ativo=False):
+        self.ativo = ativo
+        self.duracao = Histograma("validar_duracao_segundos", "Duração de cada validação.", ("valido",))
+        self._trava = threading.Lock()
+        self.limpar()
+
+    def limpar(self):
+        with self._trava:
+            self.validacoes = 0
+            self.fases = {}
+            self.regras = {}
+        self.duracao.limpar()
+
+    def acumular(self, medicao, valido):
+        with self._trava:
+            self.validacoes += 1
+            for nome, (chamadas, segundos) in medicao.fases.items():
+                dados = self.fases.setdefault(nome, [0, 0.0])
+                dados[0] += chamadas
+                dados[1] += segundos
+            for nome, (chamadas, segundos, erros) in medicao.regras.items():
+                dados = self.regras.setdefault(nome, [0, 0.0, 0])
+                dados[0] += chamadas
+                dados[1] += segundos
+                dados[2] += erros
+        self.duracao.observar(medicao.total, "true" if valido else "false")
+
+    def para_dict(self):
+        with self._trava:
+            medicao = Medicao()
+            medicao.fases = {nome: list(dados) for nome, dados in self.fases.items()}
+            medicao.regras = {nome: list(dados) for nome, dados in self.regras.items()}
+            validacoes = self.validacoes
+        return {"validacoes": validacoes, **medicao.para_dict()}
+
+    def prometheus(self):
+        with self._trava:
+            fases = {(nome,): dados for nome, dados in self.fases.items()}
+            regras = {(nome,): dados for nome, dados in self.regras.items()}
+            validacoes = self.validacoes
+        linhas = formatar_metrica("validar_validacoes_total", "counter", "Validações medidas.", {(): validacoes})
+        linhas += formatar_metrica("validar_fase_chamadas_total", "counter", "Execuções de cada fase de validar.",
+                                   {chave: dados[0] for chave, dados in fases.items()}, ("fase",))
+        linhas += formatar_metrica("validar_fase_segundos_total", "counter", "Tempo gasto em cada fase de validar.",
+                                   {chave: dados[1] for chave, dados in fases.items()}, ("fase",))
+        linhas += formatar_metrica("validar_regra_chamadas_total", "counter", "Passos verificados por regra.",
+                                   {chave: dados[0] for chave, dados in regras.items()}, ("regra",))
+        linhas += formatar_metrica("validar_regra_segundos_total", "counter", "Tempo gasto verificando cada regra.",
+                                   {chave: dados[1] for chave, dados in regras.items()}, ("regra",))
+        linhas += formatar_metrica("validar_regra_erros_total", "counter", "Passos rejeitados por regra.",
+                                   {chave: dados[2] for chave, dados in regras.items()}, ("regra",))
+        return linhas + self.duracao.prometheus()
+
+
+# Métricas de validação do processo
+VALIDACAO = MetricasValidacao(ativo=os.environ.get("VALIDAR_METRICAS", "") not in ("", "0"))
+
+
+def ativar(ativo=True):
+    """Liga (ou desliga) a medição de todas as chamadas de `validar` no processo."""
+    VALIDACAO.ativo = ativo
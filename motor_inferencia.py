@@ -1,27 +1,55 @@
 import re
-from graphviz import Digraph
+import sys
+import time
+import threading
+from collections import namedtuple, deque, OrderedDict
+from itertools import islice
 import os
+from abc import abstractmethod
+from array import array
+from collections.abc import Mapping
+from types import MappingProxyType
+from formulas import TabelaFormulas, FormulaInvalidaError, NAO, E, OU, IMPLICA, EQUIVALE
+from relatorio import Relatorio, Evento, formatar_mensagem
+from semantica import Avaliador, MuitosAtomosError, atomos, formatar_valoracao
+from metricas import Medicao, Cronometro, VALIDACAO
+
+# O grafo (e o Graphviz) só é carregado quando uma validação pede o grafo
+_NOMES_GRAFO = {
+    "construir_grafo", "CacheGrafos", "cache_grafos", "GrafoSVG", "executar_dot", "renderizar_grafos", "gerar_grafo",
+}
+
+
+def __getattr__(nome):
+    # Compatibilidade: os nomes do grafo continuam disponíveis em motor_inferencia
+    if nome in _NOMES_GRAFO:
+        import grafo
+        return getattr(grafo, nome)
+    raise AttributeError(f"module {__name__!r} has no attribute {nome!r}")
 
 class DeducaoInvalidaError(Exception):
-    def __init__(self, passo, regra, mensagem):
+    """
+    Erro na aplicação de uma regra. O texto é identificado por um código (veja
+    relatorio.MENSAGENS) e só é montado, a partir de `detalhes`, quando exibido.
+    """
+    def __init__(self, passo, regra, codigo, **detalhes):
+        super().__init__(passo, regra, codigo)
         self.passo = passo
         self.regra = regra
-        self.mensagem = mensagem
+        self.codigo = codigo
+        self.detalhes = detalhes
+
+    @property
+    def mensagem(self):
+        return formatar_mensagem(self.codigo, self.passo, self.regra, self.detalhes)
     
     def __str__(self):
         return f"Erro no passo {self.passo} ({self.regra}): {self.mensagem}"
 
-# Função para normalizar expressões
-def normalizar(expr):
-    """
-    Remove espaços, parênteses redundantes e normaliza o símbolo de disjunção.
-    """
-    expr = expr.replace("v", "∨")  # Substitui "v" por "∨"
-    return expr.replace(" ", "").replace("(", "").replace(")", "")
-
-# Função para comparar proposições normalizadas
-def proposicoes_iguais(expr1, expr2):
-    return normalizar(expr1) == normalizar(expr2)
+# Função para comparar proposições pela sua estrutura (respeitando a precedência)
+def proposicoes_iguais(expr1, expr2, tabela=None):
+    tabela = tabela or TabelaFormulas()
+    return tabela.parse(expr1) is tabela.parse(expr2)
 
 # Função para converter LaTeX para formato legível
 def converter_latex_para_legivel(entrada):
@@ -40,947 +68,2005 @@ def converter_latex_para_legivel(entrada):
         entrada = re.sub(latex, simbolo, entrada)
     return entrada.strip()
 
+# Regras com referências (ex.: MP(1,2), PC(3-5)) e marcadores de hipótese (ex.: (Hip-PC))
+REGRAS = ("MP", "SP", "CJ", "MT", "SD", "SH", "DN", "AD", "vE", "↔I", "↔E", "PC", "RAA", "COM", "DMOR", "COND")
+MARCADORES = ("Hipótese", "Hip-PC", "Hip-RAA")
+# Hipóteses que abrem uma subprova (descartada por PC ou RAA)
+HIPOTESES_ADICIONAIS = ("Hip-PC", "Hip-RAA")
+
+# Uma única expressão reconhece a justificativa no final de cada passo
+_JUSTIFICATIVA = re.compile(
+    r'\s*(?:\((?P<marcador>' + "|".join(MARCADORES) + r')\)'
+    r'|(?P<regra>' + "|".join(REGRAS) + r')\(\s*(?P<referencias>\d+(?:\s*[,-]\s*\d+)*)\s*\))\s*$'
+)
+_SEPARADOR_REFERENCIAS = re.compile(r'\s*,\s*')
+_INTERVALO = re.compile(r'(\d+)\s*-\s*(\d+)')
+
+
+class Justificativa(namedtuple("Justificativa", ["regra", "referencias", "intervalo"])):
+    """
+    Justificativa de um passo: a regra aplicada, os passos referenciados
+    (ex.: ("1", "2") em MP(1,2)) e o intervalo de uma subprova (ex.: ("3", "5") em PC(3-5)).
+    """
+    __slots__ = ()
+
+    @property
+    def passos_citados(self):
+        return self.intervalo if self.intervalo is not None else self.referencias
+
+
+def ler_justificativa(conteudo):
+    """
+    Separa a proposição da justificativa de um passo em uma única passada.
+    Devolve o texto da proposição e a Justificativa (ou None se não houver).
+    """
+    match = _JUSTIFICATIVA.search(conteudo)
+    if not match:
+        return conteudo.strip(), None
+
+    proposicao = conteudo[:match.start()].strip()
+    if match.group("marcador"):
+        return proposicao, Justificativa(match.group("marcador"), (), None)
+
+    referencias = match.group("referencias")
+    intervalo = _INTERVALO.fullmatch(referencias)
+    if intervalo:
+        return proposicao, Justificativa(match.group("regra"), (), intervalo.groups())
+    if "-" in referencias:
+        # Intervalos misturados com referências avulsas não são aceitos por nenhuma regra
+        return proposicao, Justificativa(match.group("regra"), (), None)
+    return proposicao, Justificativa(match.group("regra"), tuple(_SEPARADOR_REFERENCIAS.split(referencias)), None)
+
+
 def extrair_conclusao(conteudo):
     """
-    Extrai a conclusão de um passo, removendo justificativas e regras lógicas do final,
-    e preservando aspas externas que delimitam a proposição.
+    Extrai a conclusão de um passo, removendo a justificativa do final.
     """
-    # Remove justificativas no formato (Regra)
-    conteudo = re.sub(r'\((Hipótese|MP|SP|CJ|MT|SD|SH|DN|AD|vE|↔I|↔E|PC|RAA|Hip-PC|Hip-RAA|COM|DMOR|COND)\)', '', conteudo).strip()
-    
-    # Remove justificativas no formato Regra(1,2,...)
-    conteudo = re.sub(r'\s*(?:MP|SP|CJ|MT|SD|SH|DN|AD|vE|↔I|↔E|PC|RAA|Hip-PC|Hip-RAA|COM|DMOR|COND)\(\d+(?:,\d+|-\d+)*\)$', '', conteudo).strip()
-
-    # Remove aspas internas, mas mantém as aspas externas se presentes
-    if conteudo.startswith('"') and conteudo.endswith('"'):
-        conteudo = conteudo[1:-1]  # Remove aspas externas
-        conteudo = conteudo.replace('"', '') # Remove aspas internas
-        conteudo = '"' + conteudo + '"' # Adiciona novamente as aspas externas
-    else:
-        conteudo = conteudo.replace('"', '') # Remove aspas internas se não houver aspas externas
+    return ler_justificativa(conteudo)[0]
+
+
+class Subprova:
+    """
+    Subprova aberta por uma hipótese adicional: as posições de `inicio` (o
+    passo da hipótese) até antes de `fim` (o passo que a fecha; None enquanto
+    estiver aberta). `externa` é a subprova em que ela está.
+    """
+    __slots__ = ("hipotese", "inicio", "fim", "fechamento", "externa")
+
+    def __init__(self, hipotese, inicio, externa):
+        self.hipotese = hipotese
+        self.inicio = inicio
+        self.fim = None
+        self.fechamento = None  # Passo PC/RAA que descartou a hipótese
+        self.externa = externa
+
+    def contem(self, posicao):
+        return self.inicio <= posicao and (self.fim is None or posicao < self.fim)
+
+
+class Escopos:
+    """
+    Subprovas de uma dedução, montadas em uma passada na ordem dos passos. Cada
+    Hip-PC ou Hip-RAA abre uma subprova, que fica aberta até o PC ou RAA que
+    cita o seu intervalo; como as subprovas formam uma pilha, são intervalos de
+    posições aninhados. Cada passo guarda a sua posição e os passos dentro de
+    subprovas guardam a mais interna em que estão, então um passo citado está
+    acessível se a subprova dele contém o passo que cita (duas comparações), e
+    as hipóteses ativas em um passo são a cadeia de subprovas externas.
+    Premissas (Hipótese) valem em qualquer ponto e ficam sempre fora das subprovas.
+    """
+
+    def __init__(self, posicoes=None):
+        # DeducaoCompacta passa o seu índice de passos, que já é a posição de cada um
+        self.posicoes = {} if posicoes is None else posicoes
+        self.subprovas = {}  # passo -> subprova mais interna que o contém (só passos dentro de subprovas)
+        self.abertas = []
+        self._por_hipotese = {}
+        self._proxima = 0
+
+    def adicionar(self, passo, justificativa):
+        """Acrescenta o próximo passo da dedução."""
+        posicao = self._proxima
+        self._proxima += 1
+        if justificativa is not None and justificativa.intervalo is not None:
+            self._fechar(passo, posicao, justificativa.intervalo[0])
+        self.posicoes[passo] = posicao
+
+        subprova = self.abertas[-1] if self.abertas else None
+        if justificativa is not None and justificativa.regra in HIPOTESES_ADICIONAIS:
+            subprova = Subprova(passo, posicao, subprova)
+            self.abertas.append(subprova)
+            self._por_hipotese[passo] = subprova
+        elif justificativa is not None and justificativa.regra == "Hipótese":
+            subprova = None
+        if subprova is not None:
+            self.subprovas[passo] = subprova
+
+    def _fechar(self, passo, posicao, hipotese):
+        subprova = self._por_hipotese.get(hipotese)
+        if subprova is None or subprova.fim is not None:
+            return
+        # Subprovas internas ainda abertas são abandonadas junto com esta
+        while True:
+            aberta = self.abertas.pop()
+            aberta.fim = posicao
+            if aberta is subprova:
+                break
+        subprova.fechamento = passo
+
+    def remover(self, passo):
+        """Retira um passo que não abre nem fecha subprovas (as posições dos outros continuam em ordem)."""
+        del self.posicoes[passo]
+        self.subprovas.pop(passo, None)
+
+    def subprova_da_hipotese(self, passo):
+        """Subprova aberta pela hipótese do passo (None se o passo não é Hip-PC nem Hip-RAA)."""
+        return self._por_hipotese.get(passo)
+
+    def acessivel(self, citado, passo):
+        subprova = self.subprovas.get(citado)
+        return subprova is None or subprova.contem(self.posicoes[passo])
+
+    def hipoteses_ativas(self, passo):
+        """Passos das hipóteses ainda não descartadas no passo, da mais externa à mais interna."""
+        hipoteses = []
+        subprova = self.subprovas.get(passo)
+        while subprova is not None:
+            hipoteses.append(subprova.hipotese)
+            subprova = subprova.externa
+        return tuple(reversed(hipoteses))
+
+    def contexto(self, passo):
+        """O que a verificação de um passo usa das subprovas (muda se o passo mudar de subprova)."""
+        contexto = []
+        subprova = self.subprovas.get(passo)
+        while subprova is not None:
+            contexto.append((subprova.hipotese, subprova.fechamento))
+            subprova = subprova.externa
+        return tuple(contexto)
+
+
+def montar_escopos(deducao):
+    """Escopos de todos os passos de `deducao`, na ordem em que aparecem."""
+    escopos = Escopos()
+    for passo, justificativa in deducao.justificativas.items():
+        escopos.adicionar(passo, justificativa)
+    return escopos
+
+
+class Deducao:
+    """
+    Passos de uma dedução já analisados: o texto, a justificativa e a fórmula
+    internada de cada passo, além do resultado da verificação de cada regra.
+    `ocorrencias` indexa os passos pela fórmula, então saber se uma fórmula já
+    foi deduzida (ou em que passos se repete) é uma consulta a um dicionário, e
+    `escopos` guarda as subprovas e as hipóteses ativas em cada passo.
+    """
+
+    def __init__(self, tabela):
+        self.tabela = tabela
+        self.passos = {}
+        self.justificativas = {}
+        self.formulas = {}
+        self.ocorrencias = {}  # fórmula -> passos em que aparece, na ordem em que chegaram
+        self.resultados = {}
+        self.escopos = Escopos()
+
+    def regra(self, passo):
+        justificativa = self.justificativas.get(passo)
+        return justificativa.regra if justificativa is not None else None
+
+    def definir_formula(self, passo, formula):
+        """Guarda a fórmula do passo (None se inválida) e atualiza o índice de ocorrências."""
+        anterior = self.formulas.get(passo)
+        if anterior is not None:
+            passos = self.ocorrencias[anterior]
+            passos.remove(passo)
+            if not passos:
+                del self.ocorrencias[anterior]
+        self.formulas[passo] = formula
+        if formula is not None:
+            self.ocorrencias.setdefault(formula, []).append(passo)
+
+    def passos_com(self, formula):
+        """Passos cuja fórmula é `formula` (vazio se ela não foi deduzida)."""
+        return self.ocorrencias.get(formula, ())
+
+    def deduzida(self, formula):
+        """Se `formula` foi deduzida fora de qualquer subprova (sem hipóteses adicionais ativas)."""
+        return any(passo not in self.escopos.subprovas for passo in self.passos_com(formula))
+
+    def acrescentar(self, passo, conteudo, justificativa, formula):
+        """Guarda o próximo passo da dedução e devolve a sua justificativa."""
+        self.passos[passo] = conteudo
+        self.justificativas[passo] = justificativa
+        self.escopos.adicionar(passo, justificativa)
+        self.definir_formula(passo, formula)
+        return justificativa
+
+
+# Código de um byte de cada regra e marcador em DeducaoCompacta; o bit alto marca um intervalo (ex.: PC(3-5))
+CODIGOS_REGRAS = REGRAS + MARCADORES
+_CODIGO_DA_REGRA = {regra: codigo for codigo, regra in enumerate(CODIGOS_REGRAS)}
+_BIT_INTERVALO = 0x80
+_SEM_JUSTIFICATIVA = 0xFF
+# Cria a Justificativa sem passar pelo __new__ em Python da namedtuple (usado a cada passo)
+_nova_tupla = tuple.__new__
+
+
+class _VisaoCompacta(Mapping):
+    """
+    Dicionário somente de leitura (passo -> valor) sobre os arrays de uma
+    DeducaoCompacta, com a interface do dicionário correspondente de Deducao.
+    O valor é montado a cada consulta; `items()` devolve um iterador. A visão
+    guarda só os arrays que lê (e não a dedução), então não forma ciclos e a
+    dedução é liberada assim que deixa de ser usada.
+    """
+    __slots__ = ("_indices", "_numeros")
+
+    def __init__(self, deducao):
+        self._indices = deducao.indices
+        self._numeros = deducao.numeros
+
+    @abstractmethod
+    def _valor(self, indice):
+        """Valor do passo de índice `indice`."""
+
+    def __getitem__(self, passo):
+        return self._valor(self._indices[passo])
+
+    def get(self, passo, padrao=None):
+        indice = self._indices.get(passo)
+        return padrao if indice is None else self._valor(indice)
+
+    def __contains__(self, passo):
+        return passo in self._indices
+
+    def __iter__(self):
+        return iter(self._numeros)
+
+    def __len__(self):
+        return len(self._numeros)
+
+    def items(self):
+        return zip(self._numeros, map(self._valor, range(len(self._numeros))))
+
+
+class _PassosCompactos(_VisaoCompacta):
+    __slots__ = ("_conteudos",)
+
+    def __init__(self, deducao):
+        super().__init__(deducao)
+        self._conteudos = deducao.conteudos
+
+    def _valor(self, indice):
+        return self._conteudos[indice]
+
+    def items(self):
+        return zip(self._numeros, self._conteudos)
+
+
+class _FormulasCompactas(_VisaoCompacta):
+    __slots__ = ("_ids", "_nos")
+
+    def __init__(self, deducao):
+        super().__init__(deducao)
+        self._ids = deducao.ids_formulas
+        self._nos = deducao.tabela.nos
+
+    def _valor(self, indice):
+        id_formula = self._ids[indice]
+        return self._nos[id_formula] if id_formula >= 0 else None
+
+    def get(self, passo, padrao=None):
+        # Consultada por todas as regras: sem chamadas intermediárias
+        indice = self._indices.get(passo)
+        if indice is None:
+            return padrao
+        id_formula = self._ids[indice]
+        return self._nos[id_formula] if id_formula >= 0 else None
+
+
+class _JustificativasCompactas(_VisaoCompacta):
+    __slots__ = ("_codigos", "_inicio_citados", "_citados", "_ausentes")
+
+    def __init__(self, deducao):
+        super().__init__(deducao)
+        self._codigos = deducao.codigos
+        self._inicio_citados = deducao.inicio_citados
+        self._citados = deducao.citados
+        self._ausentes = deducao.ausentes
+
+    def _valor(self, indice):
+        codigo = self._codigos[indice]
+        if codigo == _SEM_JUSTIFICATIVA:
+            return None
+        inicio = self._inicio_citados[indice]
+        quantidade = self._inicio_citados[indice + 1] - inicio
+        numeros, posicoes = self._numeros, self._citados
+        if self._ausentes:
+            citados = tuple([
+                numeros[i] if i >= 0 else self._ausentes[~i] for i in posicoes[inicio:inicio + quantidade]
+            ])
+        elif quantidade == 2:
+            # Os casos comuns (uma ou duas referências) sem criar fatias do array
+            citados = (numeros[posicoes[inicio]], numeros[posicoes[inicio + 1]])
+        elif quantidade == 1:
+            citados = (numeros[posicoes[inicio]],)
+        else:
+            citados = tuple(map(numeros.__getitem__, posicoes[inicio:inicio + quantidade]))
+        if codigo & _BIT_INTERVALO:
+            return _nova_tupla(Justificativa, (CODIGOS_REGRAS[codigo & ~_BIT_INTERVALO], (), citados))
+        return _nova_tupla(Justificativa, (CODIGOS_REGRAS[codigo], citados, None))
+
+
+class _ResultadosCompactos(_VisaoCompacta):
+    """Resultado da regra de cada passo já verificado (-1 no array enquanto não foi verificado)."""
+    __slots__ = ("_valores",)
+
+    def __init__(self, deducao):
+        super().__init__(deducao)
+        self._valores = deducao.valores_resultados
 
+    def _valor(self, indice):
+        valor = self._valores[indice]
+        if valor < 0:
+            raise KeyError(self._numeros[indice])
+        return valor == 1
 
-    return conteudo
+    def get(self, passo, padrao=None):
+        indice = self._indices.get(passo)
+        if indice is None or self._valores[indice] < 0:
+            return padrao
+        return self._valores[indice] == 1
 
+    def __setitem__(self, passo, valido):
+        self._valores[self._indices[passo]] = 1 if valido else 0
 
-def coletar_relacoes(passos_dict, feedback):
+    def __contains__(self, passo):
+        return self.get(passo) is not None
+
+    def __iter__(self):
+        return (passo for passo, valor in zip(self._numeros, self._valores) if valor >= 0)
+
+    def __len__(self):
+        return len(self._valores) - self._valores.count(-1)
+
+    def items(self):
+        return ((passo, valor == 1) for passo, valor in zip(self._numeros, self._valores) if valor >= 0)
+
+
+class DeducaoCompacta:
+    """
+    Dedução analisada guardada em arrays, para deduções muito longas: cada
+    passo é identificado pelo seu índice (a posição no texto), a fórmula é o id
+    do nó na tabela de fórmulas, a regra é um código de um byte
+    (CODIGOS_REGRAS) e os passos citados por todos os passos ficam em um único
+    array de índices, delimitado por um array de deslocamentos; referências a
+    passos inexistentes ficam em `ausentes`, com índice negativo. Os textos
+    dos números e dos passos são os mesmos objetos da entrada.
+
+    `passos`, `justificativas`, `formulas` e `resultados` são visões com a
+    interface dos dicionários de Deducao, então as regras, os escopos, o
+    relatório e o grafo funcionam sobre ela sem conversão (as justificativas
+    são remontadas a cada consulta). Os passos são dados na criação e
+    analisados em ordem com `acrescentar`; para alterar passos depois, como na
+    validação incremental, use Deducao.
+
+    Guardar em arrays troca memória por tempo: a dedução ocupa cerca de metade
+    da memória dos dicionários (25 MiB contra 50 MiB em 100 mil passos), mas
+    cada consulta às visões é uma chamada em Python que monta o valor, o que
+    deixa a verificação das regras cerca de 1 µs mais lenta por passo (uns 15%
+    do tempo de `validar`).
+    """
+
+    def __init__(self, tabela, passos):
+        """`passos` é um dicionário (número do passo -> texto) na ordem da dedução."""
+        self.tabela = tabela
+        self.numeros = list(passos)
+        self.conteudos = list(passos.values())
+        self.indices = {passo: indice for indice, passo in enumerate(self.numeros)}
+        quantidade = len(self.numeros)
+        self.ids_formulas = array("i", [-1]) * quantidade
+        self.codigos = bytearray([_SEM_JUSTIFICATIVA]) * quantidade
+        self.inicio_citados = array("I", [0])
+        self.citados = array("i")
+        self.ausentes = []
+        self.valores_resultados = array("b", [-1]) * quantidade
+
+        self.passos = _PassosCompactos(self)
+        self.justificativas = _JustificativasCompactas(self)
+        self.formulas = _FormulasCompactas(self)
+        self.resultados = _ResultadosCompactos(self)
+        self.escopos = Escopos(self.indices)
+
+    def __len__(self):
+        return len(self.numeros)
+
+    def acrescentar(self, passo, conteudo, justificativa, formula):
+        """
+        Guarda a justificativa e a fórmula (da `tabela` da dedução) do próximo
+        passo e devolve a justificativa guardada, que usa os textos dos números
+        já guardados em vez dos lidos da justificativa.
+        """
+        indice = len(self.inicio_citados) - 1
+        if formula is not None:
+            self.ids_formulas[indice] = formula.id
+        self.escopos.adicionar(passo, justificativa)
+        if justificativa is None:
+            self.inicio_citados.append(len(self.citados))
+            return None
+
+        regra, referencias, intervalo = justificativa
+        citados = referencias if intervalo is None else intervalo
+        if citados:
+            indices, numeros, posicoes = self.indices, self.numeros, self.citados
+            textos = []
+            for citado in citados:
+                posicao = indices.get(citado)
+                if posicao is None:
+                    posicao = ~len(self.ausentes)
+                    self.ausentes.append(citado)
+                else:
+                    citado = numeros[posicao]
+                posicoes.append(posicao)
+                textos.append(citado)
+            citados = tuple(textos)
+        self.inicio_citados.append(len(self.citados))
+
+        codigo = _CODIGO_DA_REGRA[regra]
+        if intervalo is not None:
+            self.codigos[indice] = codigo | _BIT_INTERVALO
+            return _nova_tupla(Justificativa, (CODIGOS_REGRAS[codigo], (), citados))
+        self.codigos[indice] = codigo
+        return _nova_tupla(Justificativa, (CODIGOS_REGRAS[codigo], citados, None))
+
+    def justificativa(self, indice):
+        """Justificativa do passo de índice `indice` (None se não houver)."""
+        return self.justificativas._valor(indice)
+
+    def regra(self, passo):
+        indice = self.indices.get(passo)
+        if indice is None or self.codigos[indice] == _SEM_JUSTIFICATIVA:
+            return None
+        return CODIGOS_REGRAS[self.codigos[indice] & ~_BIT_INTERVALO]
+
+    def _ocorrencias(self, formula):
+        indice = -1
+        while True:
+            try:
+                indice = self.ids_formulas.index(formula.id, indice + 1)
+            except ValueError:
+                return
+            yield self.numeros[indice]
+
+    def passos_com(self, formula):
+        """Passos cuja fórmula é `formula`, na ordem da dedução (vazio se ela não foi deduzida)."""
+        return list(self._ocorrencias(formula))
+
+    def deduzida(self, formula):
+        """Se `formula` foi deduzida fora de qualquer subprova (sem hipóteses adicionais ativas)."""
+        return any(passo not in self.escopos.subprovas for passo in self._ocorrencias(formula))
+
+
+def coletar_relacoes(deducao):
     """
-    Analisa cada passo da dedução, identifica a regra aplicada (MP, SP, CJ) e constrói uma
-    lista de tuplas contendo as informações sobre as relações entre os passos.
+    Constrói a lista de relações entre os passos a partir das justificativas já
+    lidas, com o resultado real da verificação de cada regra.
     """
     relacoes = []
-    
-    for passo, conteudo in passos_dict.items():
-        # Verificar Modus Ponens
-        justificativas_mp = re.findall(r'MP\((\d+),\s*(\d+)\)', conteudo)
-        if justificativas_mp:
-            passo_condicional, passo_antecedente = justificativas_mp[0]
-            relacoes.append(([passo_condicional, passo_antecedente], passo, "MP", True))
-        
-        # Verificar Simplificação
-        justificativa_sp = re.findall(r'SP\((\d+)\)', conteudo)
-        if justificativa_sp:
-            passo_justificado = justificativa_sp[0]
-            relacoes.append(([passo_justificado], passo, "SP", True))
-        
-        # Verificar Conjunção
-        justificativas_cj = re.findall(r'CJ\((\d+),\s*(\d+)\)', conteudo)
-        if justificativas_cj:
-            passo_1, passo_2 = justificativas_cj[0]
-            relacoes.append(([passo_1, passo_2], passo, "CJ", True))
-
-        # Verificar Modus Tollens
-        justificativas_mt = re.findall(r'MT\((\d+),\s*(\d+)\)', conteudo)
-        if justificativas_mt:
-            passo_condicional, passo_negacao = justificativas_mt[0]
-            relacoes.append(([passo_condicional, passo_negacao], passo, "MT", True))
-
-        # Verificar Silogismo Disjuntivo
-        justificativas_sd = re.findall(r'SD\((\d+),\s*(\d+)\)', conteudo)
-        if justificativas_sd:
-            passo_disjuncao, passo_negacao = justificativas_sd[0]                   
-            relacoes.append(([passo_disjuncao, passo_negacao], passo, "SD", True))
-
-        # Verificar Silogismo Hipotético
-        justificativas_sh = re.findall(r'SH\((\d+),\s*(\d+)\)', conteudo)
-        if justificativas_sh:
-            passo_1, passo_2 = justificativas_sh[0]                   
-            relacoes.append(([passo_1, passo_2], passo, "SH", True))
-
-
-        # Verificar Dupla Negação
-        justificativas_dn = re.findall(r'DN\((\d+)\)', conteudo)
-        if justificativas_dn:
-            passo_justificado2 = justificativas_dn[0]                   
-            relacoes.append(([passo_justificado2], passo, "DN", True))
-
-
-        # Verificar Adição
-        justificativa_ad = re.findall(r'AD\((\d+)\)', conteudo)
-        if justificativa_ad:
-            passo_justificado3 = justificativa_ad[0]
-            relacoes.append(([passo_justificado3], passo, "AD", True))
+    for passo, justificativa in deducao.justificativas.items():
+        if justificativa is None or justificativa.regra in MARCADORES:
+            continue
+        valido = deducao.resultados.get(passo, False)
+        relacoes.append((list(justificativa.passos_citados), passo, justificativa.regra, valido))
+    return relacoes
         
+def ler_sequente(premissas_e_conclusao):
+    """
+    Separa um sequente "premissas ⊢ conclusões" (em texto ou LaTeX) nas listas
+    de premissas e de conclusões.
+    """
+    premissas_e_conclusao = converter_latex_para_legivel(premissas_e_conclusao)
+    if "⊢" not in premissas_e_conclusao:
+        raise ValueError("A entrada deve conter o símbolo '⊢' para separar premissas e conclusão.")
 
-        # Verificar Eliminação da Disjunção
-        justificativas_ve = re.findall(r'vE\((\d+),\s*(\d+),\s*(\d+)\)', conteudo)
-        if justificativas_ve:
-            passo_disjuncao, passo_implicacao1, passo_implicacao2 = justificativas_ve[0]
-            relacoes.append(([passo_disjuncao, passo_implicacao1, passo_implicacao2], passo, "vE",True))
-
-        # Verificar Introdução da Equivalência
-        justificativas_ie = re.findall(r'↔I\((\d+),\s*(\d+)\)', conteudo)
-        if justificativas_ie:
-            passo_implicacao1, passo_implicacao2 = justificativas_ie[0]
-            relacoes.append(([passo_implicacao1, passo_implicacao2], passo, "↔I",True))
-
-        # Verificar Prova Condicional
-        justificativas_pc = re.findall(r'PC\((\d+)-(\d+)\)', conteudo)
-        if justificativas_pc:
-            passo_inicio, passo_fim = justificativas_pc[0]
-            relacoes.append(([passo_inicio,passo_fim], passo, "PC",True))
-
-         # Verificar Redução ao Absurdo
-        justificativas_raa = re.findall(r'RAA\((\d+)-(\d+)\)', conteudo)
-        if justificativas_raa:
-            passo_inicio, passo_fim = justificativas_raa[0]
-            relacoes.append(([passo_inicio, passo_fim], passo, "RAA", True))
-        
-         # Verificar Comutatividade
-        justificativa_com = re.findall(r'COM\((\d+)\)', conteudo)
-        if justificativa_com:
-            passo_origem = justificativa_com[0]
-            relacoes.append(([passo_origem], passo, "COM", True))
-
-        # Verificar De Morgan
-        justificativa_dmor = re.findall(r'DMOR\((\d+)\)', conteudo)
-        if justificativa_dmor:
-            passo_origem = justificativa_dmor[0]
-            relacoes.append(([passo_origem], passo, "COM", True))
-
-         # Verificar Condicional
-        justificativa_cond = re.findall(r'COND\((\d+)\)', conteudo)
-        if justificativa_cond:
-            passo_origem = justificativa_cond[0]
-            relacoes.append(([passo_origem], passo, "COND", True))
-
-    return relacoes, feedback
-        
-def validar(premissas_e_conclusao, passos):
-    feedback = "Processando a dedução...\n"
+    premissas, conclusao = premissas_e_conclusao.split("⊢")
+    # Teoremas ("⊢ P v ¬P") não têm premissas
+    premissas = [p.strip() for p in premissas.split(",") if p.strip()]
+    conclusao = [c.strip() for c in conclusao.split(",")]
+    return premissas, conclusao
+
+
+def ler_passo(linha):
+    """Separa o número do passo do seu conteúdo ("3. Q MP(1,2)" -> ("3", "Q MP(1,2)"))."""
+    if "." not in linha:
+        raise ValueError("Cada linha de passos deve conter um ponto (.) para separar o número do passo do conteúdo.")
+
+    numero, conteudo = linha.split(".", 1)
+    if not numero.strip().isdigit():
+        raise ValueError(f"O número do passo '{numero}' não é válido.")
+    return numero.strip(), conteudo.strip()
+
+
+MODOS_RENDERIZACAO = {False: "off", "off": "off", "lazy": "lazy", True: "eager", "eager": "eager"}
+
+# Cache persistente de resultados (cache_validacoes.py), ligado com VALIDAR_CACHE=<arquivo SQLite>;
+# criado no primeiro uso, então o sqlite3 só é importado quando o cache está ligado
+cache_validacoes = None
+
+
+def _cache_do_processo():
+    global cache_validacoes
+    if cache_validacoes is None and os.environ.get("VALIDAR_CACHE"):
+        import atexit
+        from cache_validacoes import CacheValidacoes
+        cache_validacoes = CacheValidacoes.do_ambiente()
+        # Grava os acessos ainda acumulados em memória
+        atexit.register(cache_validacoes.fechar)
+    return cache_validacoes
+
+
+def validar(premissas_e_conclusao, passos, renderizar="eager", verificar_sequente=True, medir=None, cache=None):
+    """
+    Valida uma dedução e devolve (valido, relatorio, caminho_grafo), em que
+    relatorio é um Relatorio (str(relatorio) gera o texto em português).
+    Com `verificar_sequente`, o sequente é conferido antes pela tabela-verdade e,
+    se não for válido, a dedução é rejeitada na hora com um contraexemplo.
+    O parâmetro `renderizar` controla o grafo: "off" (ou False) não gera grafo e
+    devolve None como caminho; "lazy" devolve um GrafoSVG renderizado só quando o
+    caminho for usado; "eager" (ou True) renderiza na hora e devolve o caminho do SVG.
+
+    Com `medir` (por padrão, quando metricas.VALIDACAO.ativo), o número de
+    chamadas e o tempo de cada fase e de cada regra ficam em relatorio.medicao
+    e são somados às métricas do processo (metricas.VALIDACAO).
+
+    `cache` é um CacheValidacoes consultado antes de validar (por padrão, o do
+    processo, se VALIDAR_CACHE estiver definida; False desliga). Um acerto
+    devolve o resultado guardado sem analisar a dedução; o relatório traz
+    então só o tempo "cache".
+    """
+    medir = VALIDACAO.ativo if medir is None else medir
+    if cache is None:
+        cache = _cache_do_processo()
+    if cache is False or renderizar not in MODOS_RENDERIZACAO:
+        cache = None
+    if not medir and cache is None:
+        return _validar(premissas_e_conclusao, passos, renderizar, verificar_sequente, None)
+
+    medicao = Medicao() if medir else None
+    comeco = time.perf_counter()
+    resultado = None
+    if cache is not None:
+        chave = cache.chave(premissas_e_conclusao, passos, MODOS_RENDERIZACAO[renderizar], verificar_sequente)
+        resultado = cache.obter(chave)
+        if resultado is not None:
+            segundos = resultado[1].tempos["cache"] = time.perf_counter() - comeco
+            if medicao is not None:
+                medicao.fase("cache", segundos)
+    if resultado is None:
+        resultado = _validar(premissas_e_conclusao, passos, renderizar, verificar_sequente, medicao)
+        if cache is not None:
+            cache.guardar(chave, *resultado)
+    valido, relatorio, caminho_grafo = resultado
+    if medicao is None:
+        return resultado
+
+    medicao.total = time.perf_counter() - comeco
+    relatorio.medicao = medicao
+    VALIDACAO.acumular(medicao, valido)
+    return valido, relatorio, caminho_grafo
+
+
+def _validar(premissas_e_conclusao, passos, renderizar, verificar_sequente, medicao):
+    relatorio = Relatorio()
     valido = True
     caminho_grafo = None
+    if renderizar not in MODOS_RENDERIZACAO:
+        raise ValueError(f"Modo de renderização inválido: {renderizar!r}")
+    renderizar = MODOS_RENDERIZACAO[renderizar]
 
     try:
+        inicio = time.perf_counter()
+        cronometro = Cronometro(medicao)
+
         # Conversão e processamento das premissas e passos
-        premissas_e_conclusao = converter_latex_para_legivel(premissas_e_conclusao)
+        premissas, conclusao = ler_sequente(premissas_e_conclusao)
         passos = converter_latex_para_legivel(passos)
+        cronometro.marcar("latex")
 
-        # Separar premissas e conclusão
-        if "⊢" not in premissas_e_conclusao:
-            raise ValueError("A entrada deve conter o símbolo '⊢' para separar premissas e conclusão.")
-        
-        premissas, conclusao = premissas_e_conclusao.split("⊢")
-        premissas = [p.strip() for p in premissas.split(",")]
-        conclusao = [c.strip() for c in conclusao.split(",")]
+        # Cada fórmula é analisada uma única vez e internada na tabela
+        tabela = TabelaFormulas()
+        formulas_premissas = [tabela.parse(p) for p in premissas]
+        formulas_conclusao = [tabela.parse(c) for c in conclusao]
 
-        feedback += f"Premissas: {premissas}\n"
-        feedback += f"Conclusão: {conclusao}\n"
+        relatorio.iniciar(premissas, conclusao)
 
         # Processar passos da dedução
         passos_dict = {}
         for linha in passos.splitlines():
             if linha.strip():
-                if "." not in linha:
-                    raise ValueError("Cada linha de passos deve conter um ponto (.) para separar o número do passo do conteúdo.")
-                
-                numero, conteudo = linha.split(".", 1)
-                if not numero.strip().isdigit():
-                    raise ValueError(f"O número do passo '{numero}' não é válido.")
-                passos_dict[numero.strip()] = conteudo.strip()
-
-        feedback += "Passos detectados:\n"
-        for passo, conteudo in passos_dict.items():
-            feedback += f"{passo}: {conteudo}\n"
+                numero, conteudo = ler_passo(linha)
+                passos_dict[numero] = conteudo
+        cronometro.marcar("leitura")
+
+        # Um sequente inválido é rejeitado sem percorrer os passos
+        if verificar_sequente:
+            comeco = time.perf_counter()
+            resultado = verificar_semantica(formulas_premissas, formulas_conclusao)
+            relatorio.tempos["semantica"] = time.perf_counter() - comeco
+            cronometro.marcar("semantica")
+            if resultado is not None and not resultado.valido:
+                relatorio.registrar(
+                    "sequente_invalido",
+                    conclusao=resultado.conclusao,
+                    valoracao=formatar_valoracao(resultado.contraexemplo),
+                )
+                for passo, conteudo in passos_dict.items():
+                    relatorio.adicionar_passo(passo, conteudo)
+                return False, relatorio, None
+
+        # Ler justificativas e fórmulas de cada passo; daqui em diante os textos ficam só na dedução
+        deducao, valido_passos = analisar_deducao(passos_dict, tabela, relatorio)
+        del passos_dict
+        valido = valido and valido_passos
+        relatorio.tempos["analise"] = time.perf_counter() - inicio
+        cronometro.marcar("analise")
 
         # Validar hipóteses
-        valido_hipoteses, feedback = validar_hipoteses(premissas, passos_dict, feedback)
+        inicio = time.perf_counter()
+        valido_hipoteses = validar_hipoteses(frozenset(formulas_premissas), deducao, relatorio)
         valido = valido and valido_hipoteses
+        relatorio.tempos["hipoteses"] = time.perf_counter() - inicio
+        cronometro.marcar("hipoteses")
 
         # Validar as regras de dedução
-        try:
-            valido_regras, feedback = validar_regras(premissas, passos_dict, conclusao, feedback)
-            valido = valido and valido_regras
-        except DeducaoInvalidaError as e:
-            valido = False
-            feedback += str(e) + "\n"
+        inicio = time.perf_counter()
+        valido_regras = validar_regras(deducao, relatorio, medicao)
+        valido = valido and valido_regras
+        relatorio.tempos["regras"] = time.perf_counter() - inicio
+        cronometro.marcar("regras")
 
         # Verificar a conclusão
-        conclusoes_deduzidas = [extrair_conclusao(valor) for valor in passos_dict.values()]
-        for c in conclusao:
-            if not any(proposicoes_iguais(c, deduzida) for deduzida in conclusoes_deduzidas):
-                feedback += (f"Erro: A conclusão '{c}' não foi encontrada entre os passos deduzidos.\n"
-                            "Verifique se ela foi construída corretamente com as premissas e as regras aplicadas.\n"
-                )
+        inicio = time.perf_counter()
+        for c, formula_c in zip(conclusao, formulas_conclusao):
+            if not verificar_conclusao(relatorio, c, formula_c, deducao):
                 valido = False
-            else:
-                feedback += f"Conclusão '{c}' foi deduzida corretamente.\n"
+        relatorio.tempos["conclusao"] = time.perf_counter() - inicio
+        cronometro.marcar("conclusao")
+
+        relatorio.valido = valido
+        if renderizar == "off":
+            return valido, relatorio, caminho_grafo
 
         # Coletar as relações entre os passos
-        relacoes, feedback = coletar_relacoes(passos_dict, feedback)
+        relacoes = coletar_relacoes(deducao)
 
         # Gerar o grafo da dedução
+        inicio = time.perf_counter()
         try:
-            caminho_grafo = gerar_grafo(passos_dict, relacoes, premissas)
-            feedback += "Grafo gerado com sucesso.\n"
+            from grafo import gerar_grafo
+            caminho_grafo = gerar_grafo(deducao.passos, relacoes, premissas, renderizar)
+            relatorio.registrar("grafo_montado" if renderizar == "lazy" else "grafo_gerado")
     
-        except FileNotFoundError:
-            feedback += "Erro: Graphviz não está instalado. O grafo não foi gerado.\n"
+        except (FileNotFoundError, ImportError):
+            # Sem o programa dot ou sem o pacote graphviz
+            relatorio.registrar("graphviz_ausente")
         
         except Exception as e:
-            return False, f"Erro durante a validação: {e}", None
+            relatorio = Relatorio()
+            relatorio.registrar("erro_validacao", erro=str(e))
+            return False, relatorio, None
+        relatorio.tempos["grafo"] = time.perf_counter() - inicio
+        cronometro.marcar("grafo")
         
     except Exception as e:
-        return False, f"Erro durante o processamento: {e}", None
+        relatorio = Relatorio()
+        relatorio.registrar("erro_processamento", erro=str(e))
+        return False, relatorio, None
 
-    return valido, feedback, caminho_grafo
+    return valido, relatorio, caminho_grafo
 
 
-def validar_hipoteses(premissas, passos_dict, feedback):
+def verificar_conclusao(relatorio, texto, formula, deducao):
     """
-    Verifica se os passos marcados como hipóteses estão corretos (i.e., presentes nas premissas).
+    Registra se a conclusão foi deduzida. Ela precisa aparecer fora das
+    subprovas: dentro de uma, depende de uma hipótese que ainda não foi descartada.
     """
-    valido = True
-    for passo, conteudo in passos_dict.items():
-        if "(Hipótese)" in conteudo:
-            proposicao = extrair_conclusao(conteudo.replace("(Hipótese)", "").strip())
-            if not any(proposicoes_iguais(proposicao, premissa) for premissa in premissas):
-                feedback += f"Erro no passo {passo}: A hipótese '{proposicao}' não corresponde a nenhuma premissa.\n"
-                valido = False
-    return valido, feedback
+    if deducao.deduzida(formula):
+        relatorio.registrar("conclusao_deduzida", conclusao=texto)
+        return True
+    passos = deducao.passos_com(formula)
+    if passos:
+        # O primeiro passo no texto (na validação ao vivo, `passos_com` segue a ordem de chegada)
+        primeiro = min(passos, key=deducao.escopos.posicoes.__getitem__)
+        hipotese = deducao.escopos.hipoteses_ativas(primeiro)[0]
+        relatorio.registrar("conclusao_em_subprova", conclusao=texto, hipotese=hipotese)
+    else:
+        relatorio.registrar("conclusao_nao_encontrada", conclusao=texto)
+    return False
 
 
-def validar_regras(premissas, passos_dict, conclusao, feedback):
+def verificar_semantica(premissas, conclusoes):
     """
-    Valida a aplicação das regras de dedução (MP, SP, CJ, etc.).
+    Confere o sequente pela tabela-verdade. Devolve None quando há átomos demais
+    para a verificação ser barata; nesse caso só a dedução é avaliada.
     """
-    valido = True
-
-    for passo, conteudo in passos_dict.items():
-        if "(Hipótese)" in conteudo:
-            continue
+    try:
+        avaliador = Avaliador(atomos(premissas + conclusoes))
+    except MuitosAtomosError:
+        return None
+    return avaliador.verificar(premissas, conclusoes)
 
-        if "MP(" in conteudo:
-            valido_mp, feedback = validar_modus_ponens(passo, conteudo, passos_dict, feedback)
-            valido = valido and valido_mp
 
-        if "SP(" in conteudo:
-            valido_sp, feedback = validar_simplificacao(passo, conteudo, passos_dict, feedback)
-            valido = valido and valido_sp
+def analisar_deducao(passos_dict, tabela, relatorio, compacta=True):
+    """
+    Lê a justificativa e converte a proposição de cada passo em uma fórmula
+    internada. Passos cuja proposição não pode ser analisada ficam associados a None.
+    Devolve uma DeducaoCompacta ou, com compacta=False, uma Deducao (dicionários
+    indexados pelo número do passo).
+    """
+    valido = True
+    deducao = DeducaoCompacta(tabela, passos_dict) if compacta else Deducao(tabela)
+    for passo, conteudo in passos_dict.items():
+        proposicao, justificativa = ler_justificativa(conteudo)
+        try:
+            formula, erro = tabela.parse(proposicao), None
+        except FormulaInvalidaError as e:
+            formula, erro = None, e
+        justificativa = deducao.acrescentar(passo, conteudo, justificativa, formula)
+        if justificativa is None:
+            relatorio.adicionar_passo(passo, conteudo)
+            relatorio.registrar("justificativa_ausente", passo)
+            valido = False
+        else:
+            relatorio.adicionar_passo(passo, conteudo, justificativa.regra, justificativa.passos_citados)
+        if erro is not None:
+            relatorio.registrar("formula_invalida", passo, erro=str(erro))
+            valido = False
+    return deducao, valido
 
-        if "CJ(" in conteudo:
-            valido_cj, feedback = validar_conjuncao(passo, conteudo, passos_dict, feedback)
-            valido = valido and valido_cj
-        
-        if "MT(" in conteudo:
-            valido_mt, feedback = validar_modus_tollens(passo, conteudo, passos_dict, feedback)
-            valido = valido and valido_mt
 
-        if "SD(" in conteudo:
-            valido_sd, feedback = validar_silogismo_disjuntivo(passo, conteudo, passos_dict, feedback)
-            valido = valido and valido_sd
+def validar_hipoteses(premissas, deducao, relatorio):
+    """
+    Verifica se os passos marcados como hipóteses estão corretos (i.e., presentes nas premissas).
+    `premissas` deve ser um conjunto (ou dicionário) de fórmulas, consultado em O(1).
+    """
+    valido = True
+    for passo in deducao.passos:
+        if deducao.regra(passo) == "Hipótese":
+            proposicao = deducao.formulas[passo]
+            if proposicao is not None and proposicao not in premissas:
+                relatorio.registrar("hipotese_nao_premissa", passo, proposicao=proposicao)
+                valido = False
+    return valido
+
+
+# Nome, número de referências (None para um intervalo de subprova) e exemplo de cada regra
+DESCRICAO_REGRAS = {
+    "MP": ("Modus Ponens", 2, "MP(1,2)"),
+    "SP": ("Simplificação", 1, "SP(1)"),
+    "CJ": ("Conjunção", 2, "CJ(1,2)"),
+    "MT": ("Modus Tollens", 2, "MT(1,2)"),
+    "SD": ("Silogismo Disjuntivo", 2, "SD(1,2)"),
+    "SH": ("Silogismo Hipotético", 2, "SH(1,2)"),
+    "DN": ("Dupla Negação", 1, "DN(1)"),
+    "AD": ("Adição", 1, "AD(1)"),
+    "vE": ("Eliminação da Disjunção", 3, "vE(1,2,3)"),
+    "↔I": ("Introdução da Equivalência", 2, "↔I(1,2)"),
+    "↔E": ("Eliminação da Equivalência", 1, "↔E(1)"),
+    "PC": ("Prova Condicional", None, "PC(3-5)"),
+    "RAA": ("Redução ao Absurdo", None, "RAA(3-5)"),
+    "COM": ("Comutatividade", 1, "COM(1)"),
+    "DMOR": ("De Morgan", 1, "DMOR(1)"),
+    "COND": ("Condicional", 1, "COND(1)"),
+}
+
+
+# Argumentos do evento passo_valido de cada regra, compartilhados (e por isso somente de leitura)
+# por todos os eventos: um dicionário novo por passo custaria cerca de 180 bytes
+_ARGS_PASSO_VALIDO = {regra: MappingProxyType({"nome": nome}) for regra, (nome, _, _) in DESCRICAO_REGRAS.items()}
+
+
+def verificar_referencias(passo, justificativa, deducao):
+    """
+    Confere se a justificativa tem a quantidade de referências (ou o intervalo)
+    exigida pela regra e se todos os passos citados existem.
+    """
+    nome, quantidade, exemplo = DESCRICAO_REGRAS[justificativa.regra]
+    if quantidade is None:
+        formato_ok = justificativa.intervalo is not None
+        formato = "um intervalo de passos"
+    else:
+        formato_ok = justificativa.intervalo is None and len(justificativa.referencias) == quantidade
+        formato = "uma justificativa" if quantidade == 1 else f"{quantidade} justificativas"
+    if not formato_ok:
+        raise DeducaoInvalidaError(passo, justificativa.regra, "formato_invalido", nome=nome, formato=formato, exemplo=exemplo)
 
-        if "SH(" in conteudo:
-            valido_sh, feedback = validar_silogismo_hipotetico(passo, conteudo, passos_dict, feedback)
-            valido = valido and valido_sh
+    for referencia in justificativa.passos_citados:
+        if referencia not in deducao.formulas:
+            raise DeducaoInvalidaError(passo, justificativa.regra, "referencia_ausente", referencia=referencia)
 
-        if "DN(" in conteudo:
-            valido_dn, feedback = validar_dupla_negacao(passo, conteudo, passos_dict, feedback)
-            valido = valido and valido_dn
 
-        if "AD(" in conteudo:
-            valido_ad, feedback = validar_adicao(passo, conteudo, passos_dict, feedback)
-            valido = valido and valido_ad
+def verificar_escopo(passo, justificativa, deducao):
+    """
+    Confere se os passos citados estão acessíveis: um passo dentro de uma
+    subprova só pode ser citado enquanto ela está aberta. O intervalo de PC ou
+    RAA que começa em uma hipótese adicional deve fechar exatamente a subprova
+    dela, terminando em um passo do mesmo nível.
+    """
+    escopos = deducao.escopos
+    referencias = justificativa.referencias
+    if justificativa.intervalo is not None:
+        inicio, fim = justificativa.intervalo
+        subprova = escopos.subprova_da_hipotese(inicio)
+        if subprova is None:
+            # Intervalo que não começa em Hip-PC/Hip-RAA: os extremos são referências comuns
+            referencias = justificativa.intervalo
+        elif subprova.fechamento != passo:
+            fechamento = subprova.fechamento
+            if fechamento is not None and escopos.posicoes[fechamento] < escopos.posicoes[passo]:
+                raise DeducaoInvalidaError(passo, justificativa.regra, "subprova_ja_fechada", hipotese=inicio, fechamento=fechamento)
+            raise DeducaoInvalidaError(passo, justificativa.regra, "subprova_nao_aberta", hipotese=inicio)
+        elif escopos.subprovas.get(fim) is not subprova:
+            raise DeducaoInvalidaError(passo, justificativa.regra, "fim_fora_da_subprova", fim=fim, hipotese=inicio)
+
+    for referencia in referencias:
+        if not escopos.acessivel(referencia, passo):
+            hipotese = escopos.subprovas[referencia].hipotese
+            raise DeducaoInvalidaError(passo, justificativa.regra, "referencia_inacessivel", referencia=referencia, hipotese=hipotese)
+
+
+def verificar_passo(passo, justificativa, deducao):
+    """
+    Verifica a aplicação da regra de um passo, levantando DeducaoInvalidaError
+    se ela foi mal aplicada.
+    """
+    verificar_referencias(passo, justificativa, deducao)
+    verificar_escopo(passo, justificativa, deducao)
+    if cache_regras.capacidade:
+        cache_regras.verificar(passo, justificativa, deducao)
+    else:
+        VALIDADORES_REGRAS[justificativa.regra](passo, justificativa, deducao)
 
-        if "vE(" in conteudo:
-            valido_ve, feedback = validar_eliminacao_disjuncao(passo, conteudo, passos_dict, feedback)
-            valido = valido and valido_ve
 
-        if "↔I(" in conteudo:
-            valido_ie, feedback = validar_introducao_equivalencia(passo, conteudo, passos_dict, feedback)
-            valido = valido and valido_ie
+def validar_regras(deducao, relatorio, medicao=None):
+    """
+    Valida a aplicação das regras de dedução (MP, SP, CJ, etc.), despachando
+    cada passo para o validador da sua regra. Os validadores levantam
+    DeducaoInvalidaError quando a regra foi mal aplicada. Com uma Medicao,
+    cada verificação é cronometrada pela regra do passo.
+    """
+    valido = True
+    verificar = verificar_passo if medicao is None else medicao.medir_regras(verificar_passo)
 
-        if "↔E(" in conteudo:
-            valido_ee, feedback = validar_eliminacao_equivalencia(passo, conteudo, passos_dict, feedback)
-            valido = valido and valido_ee
+    for passo, justificativa in deducao.justificativas.items():
+        if justificativa is None or justificativa.regra in MARCADORES:
+            continue
 
-        if "PC(" in conteudo:
-            valido_pc, feedback = validar_prova_condicional(passo, conteudo, passos_dict, feedback)
-            valido = valido and valido_pc
+        try:
+            verificar(passo, justificativa, deducao)
+            relatorio.acrescentar(Evento("passo_valido", passo, justificativa.regra, _ARGS_PASSO_VALIDO[justificativa.regra]))
+            deducao.resultados[passo] = True
+        except DeducaoInvalidaError as e:
+            relatorio.registrar_erro(e)
+            deducao.resultados[passo] = False
+            valido = False
 
-        if "RAA(" in conteudo:
-            valido_raa, feedback = validar_reducao_ao_absurdo(passo, conteudo, passos_dict, feedback, conclusao)
-            valido = valido and valido_raa
+    return valido
 
-        if "COM(" in conteudo:
-            valido_com, feedback = validar_comutatividade(passo, conteudo, passos_dict, feedback)
-            valido = valido and valido_com
 
-        if "DMOR(" in conteudo:
-            valido_dmor, feedback = validar_de_morgan(passo, conteudo, passos_dict, feedback)
-            valido = valido and valido_dmor
+VeredictoPasso = namedtuple("VeredictoPasso", ["passo", "valido", "eventos", "abortar"])
+VeredictoPasso.__doc__ = """
+Resultado de um passo na validação incremental: `valido` é True, False ou None
+(o passo cita passos que ainda não chegaram), `eventos` são os registros do
+relatório produzidos pelo passo e `abortar` indica um erro irrecuperável.
+"""
 
-        if "COND(" in conteudo:
-            valido_cond, feedback = validar_condicional(passo, conteudo, passos_dict, feedback)
-            valido = valido and valido_cond
 
-    return valido, feedback
+class ValidadorIncremental:
+    """
+    Valida uma dedução à medida que os passos chegam (por exemplo, do fluxo de
+    tokens de um LLM), sem esperar o texto completo. Cada passo é verificado
+    assim que os passos que ele cita estão disponíveis. Como um passo inválido
+    torna toda a dedução inválida, com `parar_no_erro` o primeiro erro é
+    sinalizado com `abortar`, e a geração pode ser interrompida.
+
+        validador = ValidadorIncremental("P → Q, P ⊢ Q")
+        for trecho in tokens:
+            for veredicto in validador.enviar(trecho):
+                ...
+        valido, relatorio = validador.finalizar()
+    """
 
-def validar_modus_ponens(passo, conteudo, passos_dict, feedback):
-    try:
-        match = re.search(r'MP\((\d+),\s*(\d+)\)', conteudo)
-        if not match:
-            raise DeducaoInvalidaError(passo, "MP", "Modus Ponens requer justificativas (ex.: MP(1,2))")
+    def __init__(self, premissas_e_conclusao, parar_no_erro=True, verificar_sequente=True):
+        self.parar_no_erro = parar_no_erro
+        self.relatorio = Relatorio()
+        self.abortado = False
+        self._resto = ""
+        self._aguardando = {}
+
+        premissas, conclusao = ler_sequente(premissas_e_conclusao)
+        self.tabela = TabelaFormulas()
+        self.premissas = [self.tabela.parse(p) for p in premissas]
+        self._premissas = frozenset(self.premissas)
+        self.conclusoes = list(zip(conclusao, (self.tabela.parse(c) for c in conclusao)))
+        self.deducao = Deducao(self.tabela)
+        self.relatorio.iniciar(premissas, conclusao)
+
+        # Um sequente inválido aborta antes do primeiro passo
+        self.vereditos_iniciais = []
+        if verificar_sequente:
+            resultado = verificar_semantica(self.premissas, [formula for _, formula in self.conclusoes])
+            if resultado is not None and not resultado.valido:
+                evento = self.relatorio.registrar(
+                    "sequente_invalido",
+                    conclusao=resultado.conclusao,
+                    valoracao=formatar_valoracao(resultado.contraexemplo),
+                )
+                self.abortado = True
+                self.vereditos_iniciais.append(VeredictoPasso(None, False, [evento], True))
+
+    def enviar(self, trecho):
+        """
+        Recebe um trecho de texto qualquer (um token, uma linha ou várias) e
+        devolve os vereditos dos passos completados por ele.
+        """
+        if self.abortado:
+            return []
+        linhas = (self._resto + trecho).split("\n")
+        self._resto = linhas.pop()
+        vereditos = []
+        for linha in linhas:
+            vereditos.extend(self.enviar_linha(linha))
+            if self.abortado:
+                break
+        return vereditos
+
+    def enviar_linha(self, linha):
+        """Processa uma linha completa e devolve os vereditos produzidos por ela."""
+        linha = converter_latex_para_legivel(linha)
+        if self.abortado or not linha.strip():
+            return []
+
+        inicio = len(self.relatorio.eventos)
+        try:
+            passo, conteudo = ler_passo(linha)
+        except ValueError:
+            self.relatorio.registrar("linha_invalida", linha=linha.strip())
+            return [self._veredicto(None, False, inicio)]
+
+        deducao = self.deducao
+        proposicao, justificativa = ler_justificativa(conteudo)
+        deducao.passos[passo] = conteudo
+        deducao.justificativas[passo] = justificativa
+        deducao.escopos.adicionar(passo, justificativa)
+        if justificativa is None:
+            self.relatorio.adicionar_passo(passo, conteudo)
+        else:
+            self.relatorio.adicionar_passo(passo, conteudo, justificativa.regra, justificativa.passos_citados)
+        try:
+            deducao.definir_formula(passo, self.tabela.parse(proposicao))
+        except FormulaInvalidaError as e:
+            deducao.definir_formula(passo, None)
+            self.relatorio.registrar("formula_invalida", passo, erro=str(e))
+
+        vereditos = [self._verificar(passo, inicio)]
+        # Passos que esperavam por este são verificados de novo (ou voltam a
+        # esperar, se ainda citam algum passo ausente)
+        for pendente in self._aguardando.pop(passo, ()):
+            if self.abortado:
+                break
+            veredicto = self._verificar(pendente, len(self.relatorio.eventos))
+            if veredicto.valido is not None:
+                vereditos.append(veredicto)
+        return vereditos
+
+    def _verificar(self, passo, inicio):
+        deducao = self.deducao
+        justificativa = deducao.justificativas[passo]
+        formula = deducao.formulas[passo]
+        if justificativa is None:
+            self.relatorio.registrar("justificativa_ausente", passo)
+            return self._veredicto(passo, False, inicio)
+        if formula is None:
+            return self._veredicto(passo, False, inicio)
+
+        if justificativa.regra in MARCADORES:
+            if justificativa.regra == "Hipótese" and formula not in self._premissas:
+                self.relatorio.registrar("hipotese_nao_premissa", passo, proposicao=formula)
+                return self._veredicto(passo, False, inicio)
+            return self._veredicto(passo, True, inicio)
+
+        ausentes = [citado for citado in justificativa.passos_citados if citado not in deducao.formulas]
+        if ausentes:
+            self._aguardando.setdefault(ausentes[0], []).append(passo)
+            return self._veredicto(passo, None, inicio)
 
-        passo_condicional, passo_antecedente = match.groups()
-        
-        if passo_condicional not in passos_dict or passo_antecedente not in passos_dict:
-            raise DeducaoInvalidaError(passo, "MP", f"Referências {passo_condicional} ou {passo_antecedente} não encontradas")
+        try:
+            verificar_passo(passo, justificativa, deducao)
+        except DeducaoInvalidaError as e:
+            self.relatorio.registrar_erro(e)
+            deducao.resultados[passo] = False
+            return self._veredicto(passo, False, inicio)
+        self.relatorio.acrescentar(Evento("passo_valido", passo, justificativa.regra, _ARGS_PASSO_VALIDO[justificativa.regra]))
+        deducao.resultados[passo] = True
+        return self._veredicto(passo, True, inicio)
+
+    def _veredicto(self, passo, valido, inicio):
+        abortar = valido is False and self.parar_no_erro
+        if abortar:
+            self.abortado = True
+        return VeredictoPasso(passo, valido, self.relatorio.eventos[inicio:], abortar)
+
+    def descarregar(self):
+        """Processa a última linha, se o texto não terminou com uma quebra de linha."""
+        resto, self._resto = self._resto, ""
+        return self.enviar_linha(resto) if resto else []
+
+    def finalizar(self):
+        """
+        Encerra o fluxo: processa a última linha, acusa os passos que citam
+        passos que nunca chegaram e confere a conclusão. Devolve (valido, relatorio).
+        """
+        self.descarregar()
+
+        for pendentes in self._aguardando.values():
+            for passo in pendentes:
+                justificativa = self.deducao.justificativas[passo]
+                ausente = next(c for c in justificativa.passos_citados if c not in self.deducao.formulas)
+                self.relatorio.registrar("referencia_ausente", passo, justificativa.regra, referencia=ausente)
+        self._aguardando = {}
+
+        if not self.abortado:
+            for texto, formula in self.conclusoes:
+                verificar_conclusao(self.relatorio, texto, formula, self.deducao)
+        return self.relatorio.valido, self.relatorio
+
+
+def validar_em_fluxo(premissas_e_conclusao, trechos, parar_no_erro=True):
+    """
+    Gera um VeredictoPasso para cada passo de `trechos` (qualquer iterável de
+    texto, como os tokens de um LLM), assim que o passo pode ser verificado.
+    Com `parar_no_erro`, para de consumir `trechos` no primeiro erro. O valor
+    de retorno do gerador (ex.: `valido, relatorio = yield from ...`) é o
+    resultado final da validação.
+    """
+    validador = ValidadorIncremental(premissas_e_conclusao, parar_no_erro)
+    yield from validador.vereditos_iniciais
+    if not validador.abortado:
+        for trecho in trechos:
+            yield from validador.enviar(trecho)
+            if validador.abortado:
+                break
+        yield from validador.descarregar()
+    return validador.finalizar()
 
-        condicional = extrair_conclusao(passos_dict[passo_condicional])
-        antecedente = extrair_conclusao(passos_dict[passo_antecedente])
 
-        if "→" not in condicional:
-            raise DeducaoInvalidaError(passo, "MP", f"Referência {passo_condicional} não é uma condicional")
+def _delimita_subprova(justificativa):
+    # Marcadores e intervalos de PC/RAA definem as subprovas (e o nível das premissas)
+    return justificativa is not None and (justificativa.regra in MARCADORES or justificativa.intervalo is not None)
 
-        partes = condicional.split("→")
-        if not proposicoes_iguais(antecedente, partes[0]):
-            raise DeducaoInvalidaError(passo, "MP", f"Antecedente '{antecedente}' não corresponde a '{partes[0]}'")
 
-        conclusao_deduzida = extrair_conclusao(conteudo)
-        if not proposicoes_iguais(conclusao_deduzida, partes[1]):
-            raise DeducaoInvalidaError(passo, "MP", f"Conclusão esperada '{partes[1]}', mas encontrada '{conclusao_deduzida}'")
+def _escopo_do_intervalo(escopos, passo, justificativa):
+    """
+    O que a verificação de um PC/RAA usa das subprovas além dos contextos dos
+    passos: quem fechou a subprova da hipótese, se foi antes do passo e se o
+    fim do intervalo está no nível dela.
+    """
+    inicio, fim = justificativa.intervalo
+    subprova = escopos.subprova_da_hipotese(inicio)
+    if subprova is None:
+        return None
+    fechamento = subprova.fechamento
+    antes = fechamento is not None and escopos.posicoes[fechamento] < escopos.posicoes[passo]
+    return fechamento, antes, escopos.subprovas.get(fim) is subprova
 
-        feedback += f"Passo {passo} validado com sucesso usando Modus Ponens.\n"
-        return True, feedback
 
-    except DeducaoInvalidaError as e:
-        feedback += str(e) + "\n"
-        return False, feedback
+def _citados(justificativa):
+    if justificativa is None or justificativa.regra in MARCADORES:
+        return ()
+    return justificativa.passos_citados
 
-def validar_simplificacao(passo, conteudo, passos_dict, feedback):
-    try:
-        match = re.search(r'SP\((\d+)\)', conteudo)
-        if not match:
-            raise DeducaoInvalidaError(passo, "SP", "Simplificação requer uma justificativa (ex.: SP(1))")
 
-        passo_conjuncao = match.group(1)
-        if passo_conjuncao not in passos_dict:
-            raise DeducaoInvalidaError(passo, "SP", f"Passo {passo_conjuncao} não encontrado")
+class ValidacaoAoVivo:
+    """
+    Valida uma dedução enquanto ela é editada. A leitura e o veredicto de cada
+    passo ficam guardados; a cada nova versão do texto, só as linhas que mudaram
+    são lidas de novo, e só os passos alterados, os que os citam e os afetados
+    por mudanças nas subprovas são verificados de novo (o veredicto de um passo
+    depende apenas das fórmulas e justificativas dos passos citados e das
+    subprovas em que eles estão). O relatório, montado sob demanda, é o
+    mesmo de `validar(..., renderizar="off")`, exceto que linhas mal formadas
+    são acusadas com `linha_invalida` em vez de interromper a validação.
+
+        sessao = ValidacaoAoVivo("P → Q, P ⊢ Q")
+        valido, alterados = sessao.atualizar(texto_dos_passos)
+        relatorio = sessao.relatorio()
+    """
 
-        conjuncao = extrair_conclusao(passos_dict[passo_conjuncao])
-        if "∧" not in conjuncao:
-            raise DeducaoInvalidaError(passo, "SP", f"Referência {passo_conjuncao} não é uma conjunção")
+    def __init__(self, premissas_e_conclusao, verificar_sequente=True):
+        premissas, conclusao = ler_sequente(premissas_e_conclusao)
+        self.tabela = TabelaFormulas()
+        self.premissas_texto = premissas
+        self.conclusao_texto = conclusao
+        self.premissas = [self.tabela.parse(p) for p in premissas]
+        self._premissas = frozenset(self.premissas)
+        self.conclusoes = list(zip(conclusao, (self.tabela.parse(c) for c in conclusao)))
+        self.deducao = Deducao(self.tabela)
+        self.eventos_analise = {}
+        self.eventos_verificacao = {}
+        self.linhas_invalidas = []
+        self.dependentes = {}  # passo -> passos que o citam (inclusive passos ainda ausentes)
+        self.tempos = {}
+        self._linhas = {}  # linha -> (numero, conteudo) ou o evento linha_invalida
+        self._contextos = {}  # passo dentro de subprovas -> subprovas em que está (veja Escopos.contexto)
+        self._intervalos = {}  # passo PC/RAA -> o que verificar_escopo usa (veja _escopo_do_intervalo)
+        self._com_erro = set()
+        self.grafo_alterado = set()  # Passos cujo nó ou cujas arestas mudaram na última atualização
+
+        self.sequente_invalido = None
+        if verificar_sequente:
+            resultado = verificar_semantica(self.premissas, [formula for _, formula in self.conclusoes])
+            if resultado is not None and not resultado.valido:
+                self.sequente_invalido = Evento("sequente_invalido", None, None, {
+                    "conclusao": resultado.conclusao,
+                    "valoracao": formatar_valoracao(resultado.contraexemplo),
+                })
+
+    @property
+    def valido(self):
+        if self.sequente_invalido is not None or self.linhas_invalidas or self._com_erro:
+            return False
+        return all(self.deducao.deduzida(formula) for _, formula in self.conclusoes)
+
+    def _ler_linha(self, linha):
+        try:
+            return ler_passo(converter_latex_para_legivel(linha))
+        except ValueError:
+            return Evento("linha_invalida", None, None, {"linha": linha.strip()})
+
+    def _analisar(self, passo, conteudo):
+        proposicao, justificativa = ler_justificativa(conteudo)
+        eventos = []
+        if justificativa is None:
+            eventos.append(Evento("justificativa_ausente", passo, None, {}))
+        try:
+            formula = self.tabela.parse(proposicao)
+        except FormulaInvalidaError as e:
+            formula = None
+            eventos.append(Evento("formula_invalida", passo, None, {"erro": str(e)}))
+        return justificativa, formula, eventos
+
+    def _verificar(self, passo):
+        """Devolve (resultado da regra ou None, eventos) de um passo."""
+        deducao = self.deducao
+        justificativa = deducao.justificativas[passo]
+        if justificativa is None:
+            return None, []
+        if justificativa.regra in MARCADORES:
+            formula = deducao.formulas[passo]
+            if justificativa.regra == "Hipótese" and formula is not None and formula not in self._premissas:
+                return None, [Evento("hipotese_nao_premissa", passo, None, {"proposicao": formula})]
+            return None, []
+        try:
+            verificar_passo(passo, justificativa, deducao)
+        except DeducaoInvalidaError as e:
+            return False, [Evento(e.codigo, e.passo, e.regra, e.detalhes)]
+        return True, [Evento("passo_valido", passo, justificativa.regra, _ARGS_PASSO_VALIDO[justificativa.regra])]
 
-        partes_conjuncao = conjuncao.split("∧")
-        conclusao_deduzida = extrair_conclusao(conteudo)
-        
-        if any(proposicoes_iguais(conclusao_deduzida, parte) for parte in partes_conjuncao):
-            feedback += f"Passo {passo} validado com sucesso usando Simplificação.\n"
-            return True, feedback
+    def _marcar_erro(self, passo):
+        eventos = self.eventos_analise.get(passo, []) + self.eventos_verificacao.get(passo, [])
+        if any(evento.erro for evento in eventos):
+            self._com_erro.add(passo)
+        else:
+            self._com_erro.discard(passo)
+
+    def atualizar(self, passos):
+        """
+        Recebe o texto completo dos passos e devolve (valido, alterados), em que
+        `alterados` é o conjunto dos passos lidos ou verificados de novo
+        (inclusive os removidos).
+        """
+        inicio = time.perf_counter()
+        novos = {}
+        linhas = {}
+        self.linhas_invalidas = []
+        for linha in passos.splitlines():
+            if not linha.strip():
+                continue
+            lida = self._linhas.get(linha) or self._ler_linha(linha)
+            linhas[linha] = lida
+            if isinstance(lida, Evento):
+                self.linhas_invalidas.append(lida)
+            else:
+                novos[lida[0]] = lida[1]
+        self._linhas = linhas
+
+        deducao = self.deducao
+        if self.sequente_invalido is not None:
+            deducao.passos = novos
+            self.grafo_alterado = set()
+            return False, set()
+
+        mudaram = {passo for passo, conteudo in novos.items() if deducao.passos.get(passo) != conteudo}
+        removidos = deducao.passos.keys() - novos.keys()
+        reverificar = set(mudaram)
+        estrutura_mudou = False
+        for passo in mudaram | removidos:
+            reverificar.update(self.dependentes.get(passo, ()))
+            if passo in deducao.passos:
+                estrutura_mudou = estrutura_mudou or _delimita_subprova(deducao.justificativas[passo])
+                for citado in _citados(deducao.justificativas[passo]):
+                    self.dependentes[citado].discard(passo)
+                deducao.definir_formula(passo, None)
+        for passo in removidos:
+            for dicionario in (deducao.passos, deducao.justificativas, deducao.formulas, deducao.resultados,
+                               self.eventos_analise, self.eventos_verificacao):
+                dicionario.pop(passo, None)
+            self._com_erro.discard(passo)
+
+        for passo in mudaram:
+            conteudo = novos[passo]
+            justificativa, formula, self.eventos_analise[passo] = self._analisar(passo, conteudo)
+            estrutura_mudou = estrutura_mudou or _delimita_subprova(justificativa)
+            for citado in _citados(justificativa):
+                self.dependentes.setdefault(citado, set()).add(passo)
+            deducao.passos[passo] = conteudo
+            deducao.justificativas[passo] = justificativa
+            deducao.definir_formula(passo, formula)
+
+        # O rótulo e as arestas de um passo vêm do seu conteúdo; a cor, do resultado
+        grafo_alterado = mudaram | removidos
+
+        # Os dicionários seguem a ordem do texto, como em `validar`
+        if list(deducao.passos) != list(novos):
+            estrutura_mudou = True
+            grafo_alterado.update(novos)  # A ordem dos nós muda o desenho
+            for dicionario in (deducao.justificativas, deducao.formulas):
+                reordenado = {passo: dicionario[passo] for passo in novos}
+                dicionario.clear()
+                dicionario.update(reordenado)
+            deducao.passos = dict(novos)
+
+        escopos = deducao.escopos
+        if estrutura_mudou:
+            # As subprovas são remontadas; passos que mudaram de subprova (e os
+            # que os citam) são verificados de novo, assim como os PC/RAA cuja
+            # subprova passou a ser fechada em outro passo ou ficou em outra
+            # posição em relação a eles
+            escopos = deducao.escopos = montar_escopos(deducao)
+            contextos = {passo: escopos.contexto(passo) for passo in escopos.subprovas}
+            for passo, _ in contextos.items() ^ self._contextos.items():
+                reverificar.add(passo)
+                reverificar.update(self.dependentes.get(passo, ()))
+            self._contextos = contextos
+            intervalos = {
+                passo: _escopo_do_intervalo(escopos, passo, justificativa)
+                for passo, justificativa in deducao.justificativas.items()
+                if justificativa is not None and justificativa.intervalo is not None
+            }
+            reverificar.update(passo for passo, _ in intervalos.items() ^ self._intervalos.items())
+            self._intervalos = intervalos
         else:
-            raise DeducaoInvalidaError(passo, "SP", f"O conteúdo '{conclusao_deduzida}' não é uma simplificação válida da conjunção '{conjuncao}'")
+            # Nenhuma subprova mudou: os passos novos só podem estar no fim do texto
+            for passo in removidos:
+                escopos.remover(passo)
+                self._contextos.pop(passo, None)
+            acrescentados = [passo for passo in mudaram if passo not in escopos.posicoes]
+            for passo in reversed(list(islice(reversed(deducao.passos), len(acrescentados)))):
+                escopos.adicionar(passo, deducao.justificativas[passo])
+                if passo in escopos.subprovas:
+                    self._contextos[passo] = escopos.contexto(passo)
+        self.tempos["analise"] = time.perf_counter() - inicio
+
+        inicio = time.perf_counter()
+        for passo in reverificar:
+            if passo not in novos:
+                continue
+            anterior = deducao.resultados.get(passo)
+            resultado, self.eventos_verificacao[passo] = self._verificar(passo)
+            if resultado is None:
+                deducao.resultados.pop(passo, None)
+            else:
+                deducao.resultados[passo] = resultado
+            if resultado != anterior:
+                grafo_alterado.add(passo)
+            self._marcar_erro(passo)
+        self.tempos["regras"] = time.perf_counter() - inicio
+        self.grafo_alterado = grafo_alterado
 
-    except DeducaoInvalidaError as e:
-        feedback += str(e) + "\n"
-        return False, feedback
+        return self.valido, (reverificar & novos.keys()) | removidos
 
-def validar_conjuncao(passo, conteudo, passos_dict, feedback):
-    try:
-        match = re.search(r'CJ\((\d+),\s*(\d+)\)', conteudo)
-        if not match:
-            raise DeducaoInvalidaError(passo, "CJ", "Conjunção requer duas justificativas (ex.: CJ(1,2))")
+    def versao(self):
+        """Cópia do estado atual, da qual o relatório e o grafo podem ser montados em outra thread."""
+        return VersaoAoVivo(self)
 
-        passo_1, passo_2 = match.groups()
-        if passo_1 not in passos_dict or passo_2 not in passos_dict:
-            raise DeducaoInvalidaError(passo, "CJ", f"Referências {passo_1} ou {passo_2} não encontradas")
+    def relatorio(self):
+        """Monta o relatório da versão atual a partir dos eventos guardados de cada passo."""
+        return self.versao().relatorio()
 
-        proposicao1 = extrair_conclusao(passos_dict[passo_1])
-        proposicao2 = extrair_conclusao(passos_dict[passo_2])
+    def grafo(self):
+        """GrafoSVG da versão atual (renderizado só quando o caminho for pedido), ou None."""
+        return self.versao().grafo()
 
-        conclusao_deduzida = extrair_conclusao(conteudo)
-        if proposicoes_iguais(conclusao_deduzida, f"{proposicao1}∧{proposicao2}") or proposicoes_iguais(conclusao_deduzida, f"{proposicao2}∧{proposicao1}"):
-            feedback += f"Passo {passo} validado com sucesso usando Conjunção.\n"
-            return True, feedback
-        else:
-            raise DeducaoInvalidaError(passo, "CJ", f"A conjunção '{conclusao_deduzida}' não corresponde à união de '{proposicao1}' e '{proposicao2}'")
-    except DeducaoInvalidaError as e:
-        feedback += str(e) + "\n"
-        return False, feedback  
-
-def extrair_antecedente_consequente(proposicao):
-    """Extrai o antecedente e o consequente de uma proposição condicional,
-    lidando com proposições aninhadas e parênteses."""
-
-    if "→" not in proposicao:
-        return None, None
-
-    # Encontra o índice do operador condicional principal
-    nivel_parenteses = 0
-    indice_condicional = -1
-    for i, char in enumerate(proposicao):
-        if char == "(":
-            nivel_parenteses += 1
-        elif char == ")":
-            nivel_parenteses -= 1
-        elif char == "→" and nivel_parenteses == 0:
-            indice_condicional = i
-            break
-
-    if indice_condicional == -1:  # Não encontrou um condicional válido
-        return None, None
-
-    antecedente = proposicao[:indice_condicional].strip()
-    consequente = proposicao[indice_condicional + 1:].strip()
-    return antecedente, consequente
-
-
-def validar_modus_tollens(passo, conteudo, passos_dict, feedback):
-    try:
-        match = re.search(r'MT\((\d+),\s*(\d+)\)', conteudo)
-        if not match:
-            raise DeducaoInvalidaError(passo, "MT", "Modus Tollens requer justificativas (ex.: MT(1,2))")
-        
-        passo_condicional, passo_negacao = match.groups()
 
-        if passo_condicional not in passos_dict or passo_negacao not in passos_dict:
-            raise DeducaoInvalidaError(passo, "MT", f"Referências {passo_condicional} ou {passo_negacao} não encontradas")
+class VersaoAoVivo:
+    """
+    O estado de uma ValidacaoAoVivo em uma versão do texto. Os dicionários
+    são copiados (os eventos e as justificativas guardados neles nunca são
+    alterados, só substituídos), o que custa poucas centenas de
+    microssegundos a cada 10 mil passos; montar o relatório ou o código DOT
+    custa dezenas de milissegundos e pode ser feito fora da thread que edita.
+    As conclusões são conferidas na cópia, pois dependem das subprovas.
+    """
 
-        condicional = extrair_conclusao(passos_dict[passo_condicional])
-        negacao_consequente_fornecida = extrair_conclusao(passos_dict[passo_negacao])
-        conclusao_deduzida = extrair_conclusao(conteudo)
+    __slots__ = ("premissas_texto", "conclusao_texto", "tempos", "passos", "justificativas", "resultados",
+                 "eventos_analise", "eventos_verificacao", "linhas_invalidas", "sequente_invalido",
+                 "eventos_conclusao")
+
+    def __init__(self, sessao):
+        deducao = sessao.deducao
+        self.premissas_texto = sessao.premissas_texto
+        self.conclusao_texto = sessao.conclusao_texto
+        self.tempos = dict(sessao.tempos)
+        self.passos = dict(deducao.passos)
+        self.justificativas = dict(deducao.justificativas)
+        self.resultados = dict(deducao.resultados)
+        self.eventos_analise = dict(sessao.eventos_analise)
+        self.eventos_verificacao = dict(sessao.eventos_verificacao)
+        self.linhas_invalidas = list(sessao.linhas_invalidas)
+        self.sequente_invalido = sessao.sequente_invalido
+        conclusoes = Relatorio()
+        if self.sequente_invalido is None:
+            for texto, formula in sessao.conclusoes:
+                verificar_conclusao(conclusoes, texto, formula, deducao)
+        self.eventos_conclusao = conclusoes.eventos
+
+    def relatorio(self):
+        relatorio = Relatorio()
+        relatorio.iniciar(self.premissas_texto, self.conclusao_texto)
+        relatorio.tempos.update(self.tempos)
+        for passo, conteudo in self.passos.items():
+            justificativa = self.justificativas.get(passo)
+            if justificativa is None:
+                relatorio.adicionar_passo(passo, conteudo)
+            else:
+                relatorio.adicionar_passo(passo, conteudo, justificativa.regra, justificativa.passos_citados)
+        for evento in self.linhas_invalidas:
+            relatorio.acrescentar(evento)
+        if self.sequente_invalido is not None:
+            relatorio.acrescentar(self.sequente_invalido)
+            return relatorio
+
+        # Mesma ordem de `validar`: leitura, hipóteses, regras e conclusão
+        for passo in self.passos:
+            for evento in self.eventos_analise[passo]:
+                relatorio.acrescentar(evento)
+        regras = []
+        for passo in self.passos:
+            eventos = self.eventos_verificacao.get(passo, ())
+            justificativa = self.justificativas.get(passo)
+            if justificativa is not None and justificativa.regra in MARCADORES:
+                for evento in eventos:
+                    relatorio.acrescentar(evento)
+            else:
+                regras.extend(eventos)
+        for evento in regras:
+            relatorio.acrescentar(evento)
 
-        antecedente, consequente = extrair_antecedente_consequente(condicional)
+        for evento in self.eventos_conclusao:
+            relatorio.acrescentar(evento)
+        return relatorio
 
-        if antecedente is None or consequente is None:
-            raise DeducaoInvalidaError(passo, "MT", f"A proposição no passo {passo_condicional} não é uma condicional válida")
+    def grafo(self):
+        if self.sequente_invalido is not None:
+            return None
+        from grafo import GrafoSVG, construir_grafo
+        return GrafoSVG(construir_grafo(self.passos, coletar_relacoes(self)).source)
 
 
-        # Verifica se a negação corresponde ao consequente ou se a segunda premissa
-        # é equivalente à negação do consequente (ex: t e ¬¬t)
-        negacao_consequente = f"¬{consequente}"
-        if not (proposicoes_iguais(negacao_consequente_fornecida, negacao_consequente) or \
-                proposicoes_iguais(f"¬{negacao_consequente_fornecida}", consequente)):
-            raise DeducaoInvalidaError(passo, "MT", f"A negação '{negacao_consequente_fornecida}' não corresponde ao esperado '¬{consequente}'")
+def formula_do_passo(passo, regra, referencia, deducao):
+    """
+    Devolve a fórmula já analisada de um passo referenciado, ou levanta
+    DeducaoInvalidaError se o passo não contém uma fórmula válida.
+    """
+    formula = deducao.formulas.get(referencia)
+    if formula is None:
+        raise DeducaoInvalidaError(passo, regra, "referencia_sem_formula", referencia=referencia)
+    return formula
 
-        # Verifica se a conclusão é a negação do antecedente
-        if not proposicoes_iguais(conclusao_deduzida, f"¬{antecedente}"):
-            raise DeducaoInvalidaError(passo, "MT", f"Conclusão esperada '¬{antecedente}', mas encontrada '{conclusao_deduzida}'")
 
+def validar_modus_ponens(passo, justificativa, deducao):
+    passo_condicional, passo_antecedente = justificativa.referencias
+    condicional = formula_do_passo(passo, "MP", passo_condicional, deducao)
+    antecedente = formula_do_passo(passo, "MP", passo_antecedente, deducao)
 
-        feedback += f"Passo {passo} validado com sucesso usando Modus Tollens.\n"
-        return True, feedback
+    if condicional.op != IMPLICA:
+        raise DeducaoInvalidaError(passo, "MP", "nao_condicional", referencia=passo_condicional)
 
-    except DeducaoInvalidaError as e:
-        feedback += str(e) + "\n"
-        return False, feedback
+    if antecedente is not condicional.esquerda:
+        raise DeducaoInvalidaError(passo, "MP", "antecedente_diferente", antecedente=antecedente, esperado=condicional.esquerda)
 
+    conclusao_deduzida = formula_do_passo(passo, "MP", passo, deducao)
+    if conclusao_deduzida is not condicional.direita:
+        raise DeducaoInvalidaError(passo, "MP", "conclusao_diferente", esperada=condicional.direita, encontrada=conclusao_deduzida)
 
-def validar_silogismo_disjuntivo(passo, conteudo, passos_dict, feedback):
-    try:
-        # Extrair os passos usados na regra SD
-        match = re.search(r'SD\((\d+),\s*(\d+)\)', conteudo)
-        if not match:
-            raise DeducaoInvalidaError(passo, "SD", "Silogismo Disjuntivo requer duas justificativas (ex.: SD(1,2))")
-        
-        passo_disjuncao, passo_negacao = match.groups()
 
-        # Validar a existência dos passos referenciados
-        if passo_disjuncao not in passos_dict or passo_negacao not in passos_dict:
-            raise DeducaoInvalidaError(passo, "SD", f"Referências {passo_disjuncao} ou {passo_negacao} não encontradas")
+def validar_simplificacao(passo, justificativa, deducao):
+    passo_conjuncao = justificativa.referencias[0]
+    conjuncao = formula_do_passo(passo, "SP", passo_conjuncao, deducao)
+    if conjuncao.op != E:
+        raise DeducaoInvalidaError(passo, "SP", "nao_conjuncao", referencia=passo_conjuncao)
 
-        # Extrair as proposições dos passos referenciados
-        disjuncao = extrair_conclusao(passos_dict[passo_disjuncao])
-        negacao = extrair_conclusao(passos_dict[passo_negacao])
+    conclusao_deduzida = formula_do_passo(passo, "SP", passo, deducao)
+    if conclusao_deduzida not in conjuncao.filhos:
+        raise DeducaoInvalidaError(passo, "SP", "simplificacao_invalida", encontrada=conclusao_deduzida, conjuncao=conjuncao)
 
-        # Validar se o passo referenciado contém uma disjunção
-        if "v" not in disjuncao:
-            raise DeducaoInvalidaError(passo, "SD", f"Referência {passo_disjuncao} não é uma disjunção")
 
-        # Validar se a segunda referência é a negação de uma das proposições
-        partes_disjuncao = [p.strip() for p in disjuncao.split("v")]
-        if not any(proposicoes_iguais(negacao, f"¬{parte}") for parte in partes_disjuncao):
-            raise DeducaoInvalidaError(passo, "SD", f"A negação '{negacao}' não corresponde a nenhuma das proposições na disjunção '{disjuncao}'")
+def validar_conjuncao(passo, justificativa, deducao):
+    passo_1, passo_2 = justificativa.referencias
+    proposicao1 = formula_do_passo(passo, "CJ", passo_1, deducao)
+    proposicao2 = formula_do_passo(passo, "CJ", passo_2, deducao)
 
-        # Validar a conclusão deduzida
-        conclusao_deduzida = extrair_conclusao(conteudo)
-        proposicao_deduzida = next(parte for parte in partes_disjuncao if not proposicoes_iguais(negacao, f"¬{parte}"))
+    tabela = deducao.tabela
+    conclusao_deduzida = formula_do_passo(passo, "CJ", passo, deducao)
+    if conclusao_deduzida is not tabela.e(proposicao1, proposicao2) and conclusao_deduzida is not tabela.e(proposicao2, proposicao1):
+        raise DeducaoInvalidaError(passo, "CJ", "conjuncao_invalida", encontrada=conclusao_deduzida, esquerda=proposicao1, direita=proposicao2)
 
-        if not proposicoes_iguais(conclusao_deduzida, proposicao_deduzida):
-            raise DeducaoInvalidaError(passo, "SD", f"A conclusão '{conclusao_deduzida}' não corresponde à proposição esperada '{proposicao_deduzida}'")
 
-        feedback += f"Passo {passo} validado com sucesso usando Silogismo Disjuntivo.\n"
-        return True, feedback
+def validar_modus_tollens(passo, justificativa, deducao):
+    passo_condicional, passo_negacao = justificativa.referencias
+    condicional = formula_do_passo(passo, "MT", passo_condicional, deducao)
+    negacao_consequente_fornecida = formula_do_passo(passo, "MT", passo_negacao, deducao)
+    conclusao_deduzida = formula_do_passo(passo, "MT", passo, deducao)
 
-    except DeducaoInvalidaError as e:
-        feedback += str(e) + "\n"
-        return False, feedback
-    
-def validar_silogismo_hipotetico(passo, conteudo, passos_dict, feedback):
-    try:
-        match = re.search(r'SH\((\d+),\s*(\d+)\)', conteudo)
-        if not match:
-            raise DeducaoInvalidaError(passo, "SH", "Silogismo Hipotético requer duas justificativas (ex.: SH(1,2))")
+    if condicional.op != IMPLICA:
+        raise DeducaoInvalidaError(passo, "MT", "nao_condicional", referencia=passo_condicional)
 
-        passo_1, passo_2 = match.groups()
-        
-        if passo_1 not in passos_dict or passo_2 not in passos_dict:
-            raise DeducaoInvalidaError(passo, "SH", f"Referências {passo_1} ou {passo_2} não encontradas")
+    tabela = deducao.tabela
+    antecedente, consequente = condicional.filhos
 
-        condicional_1 = extrair_conclusao(passos_dict[passo_1])
-        condicional_2 = extrair_conclusao(passos_dict[passo_2])
+    # Verifica se a negação corresponde ao consequente ou se a segunda premissa
+    # é equivalente à negação do consequente (ex: t e ¬¬t)
+    if not (negacao_consequente_fornecida is tabela.nao(consequente) or
+            tabela.nao(negacao_consequente_fornecida) is consequente):
+        raise DeducaoInvalidaError(passo, "MT", "negacao_diferente", negacao=negacao_consequente_fornecida, esperada=tabela.nao(consequente))
 
-        if "→" not in condicional_1 or "→" not in condicional_2:
-            raise DeducaoInvalidaError(passo, "SH", "Ambas as referências devem ser condicionais")
+    # Verifica se a conclusão é a negação do antecedente
+    if conclusao_deduzida is not tabela.nao(antecedente):
+        raise DeducaoInvalidaError(passo, "MT", "conclusao_diferente", esperada=tabela.nao(antecedente), encontrada=conclusao_deduzida)
 
-        antecedente_1, consequente_1 = [p.strip() for p in condicional_1.split("→")]
-        antecedente_2, consequente_2 = [p.strip() for p in condicional_2.split("→")]
 
-        if not proposicoes_iguais(consequente_1, antecedente_2):
-            raise DeducaoInvalidaError(passo, "SH", f"O consequente de '{condicional_1}' não corresponde ao antecedente de '{condicional_2}'")
+def validar_silogismo_disjuntivo(passo, justificativa, deducao):
+    passo_disjuncao, passo_negacao = justificativa.referencias
+    disjuncao = formula_do_passo(passo, "SD", passo_disjuncao, deducao)
+    negacao = formula_do_passo(passo, "SD", passo_negacao, deducao)
 
-        conclusao_esperada = f"{antecedente_1} → {consequente_2}"
-        conclusao_deduzida = extrair_conclusao(conteudo)
+    # Validar se o passo referenciado contém uma disjunção
+    if disjuncao.op != OU:
+        raise DeducaoInvalidaError(passo, "SD", "nao_disjuncao", referencia=passo_disjuncao)
 
-        if not proposicoes_iguais(conclusao_deduzida, conclusao_esperada):
-            raise DeducaoInvalidaError(passo, "SH", f"A conclusão esperada era '{conclusao_esperada}', mas foi encontrada '{conclusao_deduzida}'")
+    # Validar se a segunda referência é a negação de uma das proposições
+    tabela = deducao.tabela
+    esquerda, direita = disjuncao.filhos
+    if negacao is tabela.nao(esquerda):
+        proposicao_deduzida = direita
+    elif negacao is tabela.nao(direita):
+        proposicao_deduzida = esquerda
+    else:
+        raise DeducaoInvalidaError(passo, "SD", "negacao_fora_da_disjuncao", negacao=negacao, disjuncao=disjuncao)
 
-        feedback += f"Passo {passo} validado com sucesso usando Silogismo Hipotético.\n"
-        return True, feedback
+    # Validar a conclusão deduzida
+    conclusao_deduzida = formula_do_passo(passo, "SD", passo, deducao)
+    if conclusao_deduzida is not proposicao_deduzida:
+        raise DeducaoInvalidaError(passo, "SD", "conclusao_diferente", esperada=proposicao_deduzida, encontrada=conclusao_deduzida)
 
-    except DeducaoInvalidaError as e:
-        feedback += str(e) + "\n"
-        return False, feedback
 
+def validar_silogismo_hipotetico(passo, justificativa, deducao):
+    passo_1, passo_2 = justificativa.referencias
+    condicional_1 = formula_do_passo(passo, "SH", passo_1, deducao)
+    condicional_2 = formula_do_passo(passo, "SH", passo_2, deducao)
 
+    if condicional_1.op != IMPLICA or condicional_2.op != IMPLICA:
+        raise DeducaoInvalidaError(passo, "SH", "condicionais_exigidas", referencias=f"{passo_1} e {passo_2}")
 
-def validar_dupla_negacao(passo, conteudo, passos_dict, feedback):
-    try:
-        match = re.search(r'DN\((\d+)\)', conteudo)
-        if not match:
-            raise DeducaoInvalidaError(passo, "DN", "Dupla Negação requer uma justificativa (ex.: DN(1))")
+    antecedente_1, consequente_1 = condicional_1.filhos
+    antecedente_2, consequente_2 = condicional_2.filhos
 
-        passo_justificado2 = match.group(1)
-        if passo_justificado2 not in passos_dict:
-            raise DeducaoInvalidaError(passo, "DN", f"Passo {passo_justificado2} não encontrado")
+    if consequente_1 is not antecedente_2:
+        raise DeducaoInvalidaError(passo, "SH", "cadeia_interrompida", primeira=condicional_1, segunda=condicional_2)
 
-        proposicao = extrair_conclusao(passos_dict[passo_justificado2])
-        conclusao_deduzida = extrair_conclusao(conteudo)
+    conclusao_esperada = deducao.tabela.implica(antecedente_1, consequente_2)
+    conclusao_deduzida = formula_do_passo(passo, "SH", passo, deducao)
+    if conclusao_deduzida is not conclusao_esperada:
+        raise DeducaoInvalidaError(passo, "SH", "conclusao_diferente", esperada=conclusao_esperada, encontrada=conclusao_deduzida)
 
-        if proposicoes_iguais(proposicao, f"¬¬{conclusao_deduzida}") or proposicoes_iguais(f"¬¬{proposicao}", conclusao_deduzida):
-            feedback += f"Passo {passo} validado com sucesso usando Dupla Negação.\n"
-            return True, feedback
-        else:
-            raise DeducaoInvalidaError(passo, "DN", f"A conclusão '{conclusao_deduzida}' não corresponde à dupla negação de '{proposicao}'")
 
-    except DeducaoInvalidaError as e:
-        feedback += str(e) + "\n"
-        return False, feedback
-    
+def validar_dupla_negacao(passo, justificativa, deducao):
+    passo_referencia = justificativa.referencias[0]
+    proposicao = formula_do_passo(passo, "DN", passo_referencia, deducao)
+    conclusao_deduzida = formula_do_passo(passo, "DN", passo, deducao)
 
-def validar_adicao(passo, conteudo, passos_dict, feedback):
-    try:
-        match = re.search(r'AD\((\d+)\)', conteudo)
-        if not match:
-            raise DeducaoInvalidaError(passo, "AD", "Adição requer uma justificativa (ex.: AD(1))")
-        
-        passo_justificado3 = match.group(1)  # Corrigido para usar group(1)
-        if passo_justificado3 not in passos_dict:
-            raise DeducaoInvalidaError(passo, "AD", f"Passo {passo_justificado3} não encontrado")
-        
-        proposicao = extrair_conclusao(passos_dict[passo_justificado3])
-        conclusao_deduzida = extrair_conclusao(conteudo)
-        
-        if proposicao not in conclusao_deduzida or "v" not in conclusao_deduzida:
-            raise DeducaoInvalidaError(passo, "AD", f"A conclusão '{conclusao_deduzida}' não é uma adição válida de '{proposicao}'")
-    
-        feedback += f"Passo {passo} validado com sucesso usando Adição.\n"
-        return True, feedback
-    
-    except DeducaoInvalidaError as e:
-        feedback += str(e) + "\n"
-        return False, feedback
-
-def validar_eliminacao_disjuncao(passo, conteudo, passos_dict, feedback):
-    try:
-        match = re.search(r'vE\((\d+),\s*(\d+),\s*(\d+)\)', conteudo)
-        if not match:
-            raise DeducaoInvalidaError(passo, "vE", "Eliminação da Disjunção requer três justificativas (ex.: vE(1,2,3))")
-
-        passo_disjuncao, passo_implicacao1, passo_implicacao2 = match.groups()
-        
-        if passo_disjuncao not in passos_dict or passo_implicacao1 not in passos_dict or passo_implicacao2 not in passos_dict:
-            raise DeducaoInvalidaError(passo, "vE", f"Referências {passo_disjuncao}, {passo_implicacao1} ou {passo_implicacao2} não encontradas")
-
-        disjuncao = extrair_conclusao(passos_dict[passo_disjuncao])
-        implicacao1 = extrair_conclusao(passos_dict[passo_implicacao1])
-        implicacao2 = extrair_conclusao(passos_dict[passo_implicacao2])
-
-        # Verifique se a disjunção contém exatamente duas partes
-        partes_disjuncao = [p.strip() for p in disjuncao.split("v")]
-        if len(partes_disjuncao) != 2:
-            raise DeducaoInvalidaError(passo, "vE", "A disjunção deve conter exatamente duas proposições")
-
-        # Lógica para dividir implicações
-        def encontrar_divisao(implicacao):
-            contador_parenteses = 0
-            for i, char in enumerate(implicacao):
-                if char == '(':
-                    contador_parenteses += 1
-                elif char == ')':
-                    contador_parenteses -= 1
-                elif char == '→' and contador_parenteses == 0:
-                    return i
-            return -1
-
-        # Divida as implicações
-        indice_divisao1 = encontrar_divisao(implicacao1)
-        antecedente1 = implicacao1[:indice_divisao1].strip()
-        consequente1 = implicacao1[indice_divisao1 + 1:].strip()
-
-        indice_divisao2 = encontrar_divisao(implicacao2)
-        antecedente2 = implicacao2[:indice_divisao2].strip()
-        consequente2 = implicacao2[indice_divisao2 + 1:].strip()
-
-        # Verifique se cada parte da disjunção implica no mesmo consequente
-        if not ((proposicoes_iguais(partes_disjuncao[0], antecedente1) and proposicoes_iguais(consequente1, consequente2)) or
-                (proposicoes_iguais(partes_disjuncao[1], antecedente2) and proposicoes_iguais(consequente1, consequente2))):
-            raise DeducaoInvalidaError(passo, "vE", "As partes da disjunção não implicam no mesmo consequente")
-
-        # Verifique se a conclusão deduzida é o consequente comum
-        conclusao_deduzida = extrair_conclusao(conteudo)
-        if not proposicoes_iguais(conclusao_deduzida, consequente1):
-            raise DeducaoInvalidaError(passo, "vE", f"A conclusão esperada era '{consequente1}', mas foi encontrada '{conclusao_deduzida}'")
-
-        feedback += f"Passo {passo} validado com sucesso usando Eliminação da Disjunção.\n"
-        return True, feedback
-
-    except DeducaoInvalidaError as e:
-        feedback += str(e) + "\n"
-        return False, feedback
-    
-def validar_introducao_equivalencia(passo, conteudo, passos_dict, feedback):
-    try:
-        match = re.search(r'↔I\((\d+),\s*(\d+)\)', conteudo)
-        if not match:
-            raise DeducaoInvalidaError(passo, "↔I", "Introdução da Equivalência requer duas justificativas (ex.: ↔I(1,2))")
+    tabela = deducao.tabela
+    if proposicao is not tabela.nao(tabela.nao(conclusao_deduzida)) and conclusao_deduzida is not tabela.nao(tabela.nao(proposicao)):
+        raise DeducaoInvalidaError(passo, "DN", "dupla_negacao_invalida", encontrada=conclusao_deduzida, proposicao=proposicao)
 
-        passo_implicacao1, passo_implicacao2 = match.groups()
-        
-        if passo_implicacao1 not in passos_dict or passo_implicacao2 not in passos_dict:
-            raise DeducaoInvalidaError(passo, "↔I", f"Referências {passo_implicacao1} ou {passo_implicacao2} não encontradas")
 
-        implicacao1 = extrair_conclusao(passos_dict[passo_implicacao1])
-        implicacao2 = extrair_conclusao(passos_dict[passo_implicacao2])
+def validar_adicao(passo, justificativa, deducao):
+    passo_referencia = justificativa.referencias[0]
+    proposicao = formula_do_passo(passo, "AD", passo_referencia, deducao)
+    conclusao_deduzida = formula_do_passo(passo, "AD", passo, deducao)
 
-        # Divida as implicações
-        indice_divisao1 = implicacao1.find("→")
-        antecedente1 = implicacao1[:indice_divisao1].strip()
-        consequente1 = implicacao1[indice_divisao1 + 1:].strip()
+    if conclusao_deduzida.op != OU or proposicao not in conclusao_deduzida.filhos:
+        raise DeducaoInvalidaError(passo, "AD", "adicao_invalida", encontrada=conclusao_deduzida, proposicao=proposicao)
 
-        indice_divisao2 = implicacao2.find("→")
-        antecedente2 = implicacao2[:indice_divisao2].strip()
-        consequente2 = implicacao2[indice_divisao2 + 1:].strip()
 
-        # Verifique se as implicações são inversas
-        if not (proposicoes_iguais(antecedente1, consequente2) and proposicoes_iguais(consequente1, antecedente2)):
-            raise DeducaoInvalidaError(passo, "↔I", "As implicações não são inversas")
+def validar_eliminacao_disjuncao(passo, justificativa, deducao):
+    passo_disjuncao, passo_implicacao1, passo_implicacao2 = justificativa.referencias
+    disjuncao = formula_do_passo(passo, "vE", passo_disjuncao, deducao)
+    implicacao1 = formula_do_passo(passo, "vE", passo_implicacao1, deducao)
+    implicacao2 = formula_do_passo(passo, "vE", passo_implicacao2, deducao)
 
-        # Verifique se a conclusão deduzida é a equivalência
-        conclusao_deduzida = extrair_conclusao(conteudo)
-        equivalencia_esperada = f"{antecedente1} ↔ {consequente1}"
-        if not proposicoes_iguais(conclusao_deduzida, equivalencia_esperada):
-            raise DeducaoInvalidaError(passo, "↔I", f"A conclusão esperada era '{equivalencia_esperada}', mas foi encontrada '{conclusao_deduzida}'")
+    if disjuncao.op != OU:
+        raise DeducaoInvalidaError(passo, "vE", "nao_disjuncao", referencia=passo_disjuncao)
 
-        feedback += f"Passo {passo} validado com sucesso usando Introdução da Equivalência.\n"
-        return True, feedback
+    if implicacao1.op != IMPLICA or implicacao2.op != IMPLICA:
+        raise DeducaoInvalidaError(passo, "vE", "condicionais_exigidas", referencias=f"{passo_implicacao1} e {passo_implicacao2}")
 
-    except DeducaoInvalidaError as e:
-        feedback += str(e) + "\n"
-        return False, feedback
+    # Verifique se cada parte da disjunção implica no mesmo consequente
+    antecedentes = {implicacao1.esquerda, implicacao2.esquerda}
+    if antecedentes != set(disjuncao.filhos) or implicacao1.direita is not implicacao2.direita:
+        raise DeducaoInvalidaError(passo, "vE", "consequentes_diferentes")
 
-    
-def validar_eliminacao_equivalencia(passo, conteudo, passos_dict, feedback):
-    try:
-        match = re.search(r'↔E\((\d+)\)', conteudo)
-        if not match:
-            raise DeducaoInvalidaError(passo, "↔E", "Eliminação da Equivalência requer uma justificativa (ex.: ↔E(1))")
+    # Verifique se a conclusão deduzida é o consequente comum
+    consequente = implicacao1.direita
+    conclusao_deduzida = formula_do_passo(passo, "vE", passo, deducao)
+    if conclusao_deduzida is not consequente:
+        raise DeducaoInvalidaError(passo, "vE", "conclusao_diferente", esperada=consequente, encontrada=conclusao_deduzida)
 
-        passo_equivalencia = match.group(1)
-        
-        if passo_equivalencia not in passos_dict:
-            raise DeducaoInvalidaError(passo, "↔E", f"Referência {passo_equivalencia} não encontrada")
 
-        equivalencia = extrair_conclusao(passos_dict[passo_equivalencia])
+def validar_introducao_equivalencia(passo, justificativa, deducao):
+    passo_implicacao1, passo_implicacao2 = justificativa.referencias
+    implicacao1 = formula_do_passo(passo, "↔I", passo_implicacao1, deducao)
+    implicacao2 = formula_do_passo(passo, "↔I", passo_implicacao2, deducao)
 
-        # Divida a equivalência
-        partes_equivalencia = [p.strip() for p in equivalencia.split("↔")]
-        if len(partes_equivalencia) != 2:
-            raise DeducaoInvalidaError(passo, "↔E", "A equivalência deve conter exatamente duas proposições")
+    if implicacao1.op != IMPLICA or implicacao2.op != IMPLICA:
+        raise DeducaoInvalidaError(passo, "↔I", "condicionais_exigidas", referencias=f"{passo_implicacao1} e {passo_implicacao2}")
 
-        antecedente, consequente = partes_equivalencia
+    # Verifique se as implicações são inversas
+    tabela = deducao.tabela
+    antecedente1, consequente1 = implicacao1.filhos
+    if implicacao2 is not tabela.implica(consequente1, antecedente1):
+        raise DeducaoInvalidaError(passo, "↔I", "implicacoes_nao_inversas")
 
-        # Verifique se a conclusão deduzida é uma das implicações
-        conclusao_deduzida = extrair_conclusao(conteudo)
-        implicacao1 = f"{antecedente} → {consequente}"
-        implicacao2 = f"{consequente} → {antecedente}"
+    # Verifique se a conclusão deduzida é a equivalência
+    conclusao_deduzida = formula_do_passo(passo, "↔I", passo, deducao)
+    equivalencia_esperada = tabela.equivale(antecedente1, consequente1)
+    if conclusao_deduzida is not equivalencia_esperada:
+        raise DeducaoInvalidaError(passo, "↔I", "conclusao_diferente", esperada=equivalencia_esperada, encontrada=conclusao_deduzida)
 
-        if not (proposicoes_iguais(conclusao_deduzida, implicacao1) or proposicoes_iguais(conclusao_deduzida, implicacao2)):
-            raise DeducaoInvalidaError(passo, "↔E", f"A conclusão esperada era '{implicacao1}' ou '{implicacao2}', mas foi encontrada '{conclusao_deduzida}'")
 
-        feedback += f"Passo {passo} validado com sucesso usando Eliminação da Equivalência.\n"
-        return True, feedback
+def validar_eliminacao_equivalencia(passo, justificativa, deducao):
+    passo_equivalencia = justificativa.referencias[0]
+    equivalencia = formula_do_passo(passo, "↔E", passo_equivalencia, deducao)
 
-    except DeducaoInvalidaError as e:
-        feedback += str(e) + "\n"
-        return False, feedback
+    if equivalencia.op != EQUIVALE:
+        raise DeducaoInvalidaError(passo, "↔E", "nao_equivalencia", referencia=passo_equivalencia)
 
+    # Verifique se a conclusão deduzida é uma das implicações
+    tabela = deducao.tabela
+    antecedente, consequente = equivalencia.filhos
+    conclusao_deduzida = formula_do_passo(passo, "↔E", passo, deducao)
+    implicacao1 = tabela.implica(antecedente, consequente)
+    implicacao2 = tabela.implica(consequente, antecedente)
 
-def validar_prova_condicional(passo, conteudo, passos_dict, feedback):
-    try:
-        match = re.search(r'PC\((\d+)-(\d+)\)', conteudo)
-        if not match:
-            raise DeducaoInvalidaError(passo, "PC", "Prova Condicional requer um intervalo de passos (ex.: PC(3-5))")
+    if conclusao_deduzida is not implicacao1 and conclusao_deduzida is not implicacao2:
+        raise DeducaoInvalidaError(passo, "↔E", "conclusao_diferente_alternativas", primeira=implicacao1, segunda=implicacao2, encontrada=conclusao_deduzida)
 
-        passo_inicio, passo_fim = match.groups()
-        if passo_inicio not in passos_dict or passo_fim not in passos_dict:
-            raise DeducaoInvalidaError(passo, "PC", f"Referências {passo_inicio} ou {passo_fim} não encontradas")
 
-        # Extrair proposições relevantes
-        antecedente = extrair_conclusao(passos_dict[passo_inicio])
-        consequente = extrair_conclusao(passos_dict[passo_fim])
-        conclusao_deduzida = extrair_conclusao(conteudo)
+def validar_prova_condicional(passo, justificativa, deducao):
+    passo_inicio, passo_fim = justificativa.intervalo
 
-        # Verificar se o passo inicial é uma hipótese adicional marcada como Hip-PC
-        if "(Hip-PC)" not in passos_dict[passo_inicio]:
-            raise DeducaoInvalidaError(
-                passo, "PC", f"O passo inicial '{passo_inicio}' não é uma hipótese adicional marcada como Hip-PC."
-            )
+    # Obter proposições relevantes
+    antecedente = formula_do_passo(passo, "PC", passo_inicio, deducao)
+    consequente = formula_do_passo(passo, "PC", passo_fim, deducao)
+    conclusao_deduzida = formula_do_passo(passo, "PC", passo, deducao)
 
-        # Verificar se a conclusão deduzida é do tipo antecedente → consequente
-        if not proposicoes_iguais(conclusao_deduzida, f"{antecedente}→{consequente}"):
-            raise DeducaoInvalidaError(
-                passo, "PC", f"A conclusão '{conclusao_deduzida}' não corresponde a '{antecedente}→{consequente}'"
-            )
+    # Verificar se o passo inicial é uma hipótese adicional marcada como Hip-PC
+    if deducao.regra(passo_inicio) != "Hip-PC":
+        raise DeducaoInvalidaError(passo, "PC", "hipotese_pc_ausente", referencia=passo_inicio)
 
-        feedback += f"Passo {passo} validado com sucesso usando Prova Condicional (PC).\n"
-        return True, feedback
+    # Verificar se a conclusão deduzida é do tipo antecedente → consequente
+    condicional_esperada = deducao.tabela.implica(antecedente, consequente)
+    if conclusao_deduzida is not condicional_esperada:
+        raise DeducaoInvalidaError(passo, "PC", "conclusao_diferente", esperada=condicional_esperada, encontrada=conclusao_deduzida)
 
-    except DeducaoInvalidaError as e:
-        feedback += str(e) + "\n"
-        return False, feedback
 
-def eh_contradicao(proposicao):
+def eh_contradicao(proposicao, tabela):
     """
     Verifica se a proposição é uma contradição lógica do tipo A ∧ ¬A.
     """
-    # Remover espaços desnecessários
-    proposicao = proposicao.replace(" ", "")
-
-    # Dividir a proposição em partes usando o operador ∧
-    partes = proposicao.split("∧")
-    if len(partes) != 2:
+    if proposicao.op != E:
         return False
 
     # Verificar se uma parte é a negação da outra
-    parte1, parte2 = partes
-    if proposicoes_iguais(parte1, f"¬{parte2}") or proposicoes_iguais(parte2, f"¬{parte1}"):
-        return True
+    parte1, parte2 = proposicao.filhos
+    return parte1 is tabela.nao(parte2) or parte2 is tabela.nao(parte1)
 
-    return False
 
-def validar_reducao_ao_absurdo(passo, conteudo, passos_dict, feedback, conclusao):
-    try:
-        match = re.search(r'RAA\((\d+)-(\d+)\)', conteudo)
-        if not match:
-            raise DeducaoInvalidaError(passo, "RAA", "Redução ao Absurdo requer um intervalo de passos (ex.: RAA(3-5))")
+def validar_reducao_ao_absurdo(passo, justificativa, deducao):
+    passo_inicio, passo_fim = justificativa.intervalo
+    suposicao = formula_do_passo(passo, "RAA", passo_inicio, deducao)
+    conclusao_contradicao = formula_do_passo(passo, "RAA", passo_fim, deducao)
+    conclusao_deduzida = formula_do_passo(passo, "RAA", passo, deducao)
 
-        passo_inicio, passo_fim = match.groups()
-        
-        if passo_inicio not in passos_dict or passo_fim not in passos_dict:
-            raise DeducaoInvalidaError(passo, "RAA", f"Referências {passo_inicio} ou {passo_fim} não encontradas")
+    # Verifique se a conclusão deduzida é uma contradição válida
+    tabela = deducao.tabela
+    if not eh_contradicao(conclusao_contradicao, tabela):
+        raise DeducaoInvalidaError(passo, "RAA", "contradicao_invalida", proposicao=conclusao_contradicao)
 
-        suposicao = extrair_conclusao(passos_dict[passo_inicio])
-        conclusao_contradicao = extrair_conclusao(passos_dict[passo_fim])
+    # O passo deve afirmar a negação da suposição (ou a suposição deve negar o passo)
+    if conclusao_deduzida is not tabela.nao(suposicao) and suposicao is not tabela.nao(conclusao_deduzida):
+        raise DeducaoInvalidaError(passo, "RAA", "suposicao_invalida", suposicao=suposicao, encontrada=conclusao_deduzida)
 
-        # Verifique se a conclusão deduzida é uma contradição válida
-        if not eh_contradicao(conclusao_contradicao):
-            raise DeducaoInvalidaError(passo, "RAA", f"A conclusão '{conclusao_contradicao}' não é uma contradição válida")
 
-    
-        if not (proposicoes_iguais(suposicao, f"¬{conclusao[0]}") or proposicoes_iguais(f"¬{suposicao}", conclusao[0])):
-            raise DeducaoInvalidaError(passo, "RAA", f"A suposição '{suposicao}' não é a negação da conclusão '{conclusao[0]}'")
+def validar_comutatividade(passo, justificativa, deducao):
+    passo_origem = justificativa.referencias[0]
+    origem = formula_do_passo(passo, "COM", passo_origem, deducao)
+    resultado = formula_do_passo(passo, "COM", passo, deducao)
 
-        feedback += f"Passo {passo} validado com sucesso usando Redução ao Absurdo.\n"
-        return True, feedback
+    # A comutatividade troca os operandos de uma conjunção ou disjunção
+    if origem.op not in (E, OU) or resultado is not deducao.tabela.no(origem.op, origem.direita, origem.esquerda):
+        raise DeducaoInvalidaError(passo, "COM", "comutatividade_invalida", origem=origem, encontrada=resultado)
 
-    except DeducaoInvalidaError as e:
-        feedback += str(e) + "\n"
-        return False, feedback
 
-def validar_comutatividade(passo, conteudo, passos_dict, feedback):
-    try:
-        # Procurar pela justificativa de comutatividade no formato COM(n)
-        match = re.search(r'COM\((\d+)\)', conteudo)
-        if not match:
-            raise DeducaoInvalidaError(passo, "COM", "Comutatividade requer justificativa no formato COM(número do passo)")
-        
-        passo_origem = match.group(1)
-        if passo_origem not in passos_dict:
-            raise DeducaoInvalidaError(passo, "COM", f"Referência ao passo {passo_origem} não encontrada")
-        
-        origem = extrair_conclusao(passos_dict[passo_origem])
-        resultado = extrair_conclusao(conteudo)
-
-        # Dividir as proposições em partes usando operadores lógicos
-        partes_origem = re.split(r'([∧∨])', origem)
-        partes_resultado = re.split(r'([∧∨])', resultado)
-
-        # Verificar se as partes são equivalentes, considerando a comutatividade
-        if len(partes_origem) != len(partes_resultado):
-            raise DeducaoInvalidaError(passo, "COM", f"'{origem}' não é equivalente a '{resultado}' por comutatividade")
-
-        # Comparar cada parte, permitindo troca de ordem
-        for i in range(0, len(partes_origem), 2):
-            if i+1 < len(partes_resultado) and not (
-                proposicoes_iguais(partes_origem[i], partes_resultado[i]) or
-                proposicoes_iguais(partes_origem[i], partes_resultado[i+1])
-            ):
-                raise DeducaoInvalidaError(passo, "COM", f"'{origem}' não é equivalente a '{resultado}' por comutatividade")
-        
-        feedback += f"Passo {passo} validado com sucesso usando Comutatividade.\n"
-        return True, feedback
-    except DeducaoInvalidaError as e:
-        feedback += str(e) + "\n"
-        return False, feedback
+def aplicar_de_morgan(proposicao, tabela):
+    """
+    Aplica De Morgan a uma conjunção ou disjunção negada: ¬(A v B) vira ¬A ∧ ¬B
+    e ¬(A ∧ B) vira ¬A v ¬B. Devolve None se a regra não se aplica.
+    """
+    if proposicao.op != NAO or proposicao.filhos[0].op not in (E, OU):
+        return None
+    interna = proposicao.filhos[0]
+    op_dual = OU if interna.op == E else E
+    return tabela.no(op_dual, tabela.nao(interna.esquerda), tabela.nao(interna.direita))
 
-def simplificar(proposicao):
-    """Simplifica negações duplas em uma proposição."""
-    while "¬¬" in proposicao:
-        proposicao = proposicao.replace("¬¬", "")
-    return proposicao
 
-def validar_de_morgan(passo, conteudo, passos_dict, feedback):
+def validar_de_morgan(passo, justificativa, deducao):
     """
     Valida a aplicação da regra De Morgan (DMOR).
     """
-    try:
-        match = re.search(r'DMOR\((\d+)\)', conteudo)
-        if not match:
-            raise DeducaoInvalidaError(passo, "DMOR", "De Morgan requer uma justificativa (ex.: DMOR(1))")
-
-        passo_referencia = match.group(1)
-        if passo_referencia not in passos_dict:
-            raise DeducaoInvalidaError(passo, "DMOR", f"Passo {passo_referencia} não encontrado")
-
-        proposicao_original = extrair_conclusao(passos_dict[passo_referencia])
-        conclusao_deduzida = extrair_conclusao(conteudo)
-
-        if "¬(" in proposicao_original:
-            proposicao_interna = proposicao_original[2:-1]  # Remove ¬( e )
-
-            if "v" in proposicao_interna:
-                partes = proposicao_interna.split("v")
-                proposicao_esperada = f"¬{partes[0]}∧¬{partes[1]}"
-            elif "∧" in proposicao_interna:
-                partes = proposicao_interna.split("∧")
-                proposicao_esperada = f"¬{partes[0]}∨¬{partes[1]}"
-            else:
-                raise DeducaoInvalidaError(passo, "DMOR", f"A proposição no passo {passo_referencia} não é uma conjunção ou disjunção negada válida para De Morgan.")
+    passo_referencia = justificativa.referencias[0]
+    proposicao_original = formula_do_passo(passo, "DMOR", passo_referencia, deducao)
+    conclusao_deduzida = formula_do_passo(passo, "DMOR", passo, deducao)
 
-            proposicao_esperada = simplificar(proposicao_esperada)
-            conclusao_deduzida = simplificar(conclusao_deduzida)
+    # A regra vale nos dois sentidos; negações duplas são simplificadas
+    tabela = deducao.tabela
+    proposicao_esperada = aplicar_de_morgan(proposicao_original, tabela)
+    inversa = aplicar_de_morgan(conclusao_deduzida, tabela)
+    if proposicao_esperada is None and inversa is None:
+        raise DeducaoInvalidaError(passo, "DMOR", "de_morgan_sem_negacao")
 
-            if proposicoes_iguais(conclusao_deduzida, proposicao_esperada):
-                feedback += f"Passo {passo} validado com sucesso usando De Morgan.\n"
-                return True, feedback
-            else:
-                raise DeducaoInvalidaError(passo, "DMOR", f"A proposição '{conclusao_deduzida}' não corresponde à transformação esperada '{proposicao_esperada}'")
-        else:  #  Caso em que não há negação principal, De Morgan não se aplica
-            raise DeducaoInvalidaError(passo, "DMOR", "De Morgan requer uma negação antes da conjunção/disjunção.")
+    deduzida_simplificada = tabela.sem_dupla_negacao(conclusao_deduzida)
+    original_simplificada = tabela.sem_dupla_negacao(proposicao_original)
+    if not ((proposicao_esperada is not None and tabela.sem_dupla_negacao(proposicao_esperada) is deduzida_simplificada) or
+            (inversa is not None and tabela.sem_dupla_negacao(inversa) is original_simplificada)):
+        raise DeducaoInvalidaError(passo, "DMOR", "transformacao_invalida", encontrada=conclusao_deduzida, esperada=proposicao_esperada or proposicao_original)
 
-    except DeducaoInvalidaError as e:
-        feedback += str(e) + "\n"
-        return False, feedback
 
+def aplicar_condicional(proposicao, tabela):
+    """
+    Transforma A → B em ¬A v B e A v B em ¬A → B, preservando negações externas.
+    Devolve None se a regra não se aplica.
+    """
+    negacoes = 0
+    while proposicao.op == NAO:
+        negacoes += 1
+        proposicao = proposicao.filhos[0]
+
+    if proposicao.op == IMPLICA:
+        resultado = tabela.ou(tabela.nao(proposicao.esquerda), proposicao.direita)
+    elif proposicao.op == OU:  # Inverso: disjunção -> condicional
+        resultado = tabela.implica(tabela.nao(proposicao.esquerda), proposicao.direita)
+    else:
+        return None
+
+    for _ in range(negacoes):
+        resultado = tabela.nao(resultado)
+    return resultado
 
-def validar_condicional(passo, conteudo, passos_dict, feedback):
+
+def validar_condicional(passo, justificativa, deducao):
     """
     Valida a aplicação da regra Condicional (COND).
     """
+    passo_referencia = justificativa.referencias[0]
+    proposicao_original = formula_do_passo(passo, "COND", passo_referencia, deducao)
+    conclusao_deduzida = formula_do_passo(passo, "COND", passo, deducao)
+
+    # Aplica a transformação condicional <-> disjunção
+    tabela = deducao.tabela
+    proposicao_esperada = aplicar_condicional(proposicao_original, tabela)
+    if proposicao_esperada is None:
+        raise DeducaoInvalidaError(passo, "COND", "condicional_nao_aplicavel", referencia=passo_referencia)
+
+    if tabela.sem_dupla_negacao(conclusao_deduzida) is not tabela.sem_dupla_negacao(proposicao_esperada):
+        raise DeducaoInvalidaError(passo, "COND", "transformacao_invalida", encontrada=conclusao_deduzida, esperada=proposicao_esperada)
+
+
+# Tabela de despacho: regra -> função que valida a sua aplicação
+VALIDADORES_REGRAS = {
+    "MP": validar_modus_ponens,
+    "SP": validar_simplificacao,
+    "CJ": validar_conjuncao,
+    "MT": validar_modus_tollens,
+    "SD": validar_silogismo_disjuntivo,
+    "SH": validar_silogismo_hipotetico,
+    "DN": validar_dupla_negacao,
+    "AD": validar_adicao,
+    "vE": validar_eliminacao_disjuncao,
+    "↔I": validar_introducao_equivalencia,
+    "↔E": validar_eliminacao_equivalencia,
+    "PC": validar_prova_condicional,
+    "RAA": validar_reducao_ao_absurdo,
+    "COM": validar_comutatividade,
+    "DMOR": validar_de_morgan,
+    "COND": validar_condicional,
+}
+
+
+class CacheRegras:
+    """
+    Cache LRU, compartilhado por todas as chamadas de `validar` do processo,
+    das aplicações de regra já aceitas. A chave é a regra, o texto canônico das
+    fórmulas citadas e da fórmula deduzida e, nos intervalos de PC e RAA, o
+    marcador do passo inicial; uma inferência repetida em outra dedução passa a
+    custar uma consulta a um dicionário. Aplicações rejeitadas não são
+    guardadas: a regra é verificada de novo para montar o erro com os números
+    de passo da dedução atual.
+
+    Com capacidade 0 (o padrão, ou VALIDAR_CACHE_REGRAS não definida) o cache
+    fica desligado e não custa nada.
+    """
+
+    def __init__(self, capacidade=0):
+        self.capacidade = capacidade
+        self._itens = OrderedDict()
+        self._trava = threading.Lock()
+        self.acertos = 0
+        self.faltas = 0
+
+    def __len__(self):
+        return len(self._itens)
+
+    def configurar(self, capacidade):
+        """Muda a capacidade (0 desliga o cache), descartando os itens usados há mais tempo."""
+        with self._trava:
+            self.capacidade = capacidade
+            while len(self._itens) > capacidade:
+                self._itens.popitem(last=False)
+
+    def limpar(self):
+        """Esvazia o cache e zera as estatísticas."""
+        with self._trava:
+            self._itens.clear()
+            self.acertos = 0
+            self.faltas = 0
+
+    def estatisticas(self):
+        consultas = self.acertos + self.faltas
+        return {
+            "itens": len(self._itens),
+            "capacidade": self.capacidade,
+            "acertos": self.acertos,
+            "faltas": self.faltas,
+            "taxa_acertos": self.acertos / consultas if consultas else 0.0,
+        }
+
+    @staticmethod
+    def chave(passo, justificativa, deducao):
+        """Chave da aplicação da regra, ou None se algum passo envolvido não tem fórmula."""
+        formulas = deducao.formulas
+        citados = [formulas.get(citado) for citado in justificativa.passos_citados]
+        citados.append(formulas.get(passo))
+        if None in citados:
+            return None
+        # str() guarda o texto canônico no nó, então só a primeira chamada monta o texto
+        textos = tuple(map(str, citados))
+        if justificativa.intervalo is not None:
+            return justificativa.regra, deducao.regra(justificativa.intervalo[0]), textos
+        return justificativa.regra, textos
+
+    def verificar(self, passo, justificativa, deducao):
+        """Como VALIDADORES_REGRAS[regra](...), consultando o cache antes."""
+        chave = self.chave(passo, justificativa, deducao)
+        if chave is not None:
+            with self._trava:
+                try:
+                    self._itens.move_to_end(chave)
+                except KeyError:
+                    self.faltas += 1
+                else:
+                    self.acertos += 1
+                    return
+        VALIDADORES_REGRAS[justificativa.regra](passo, justificativa, deducao)
+        if chave is not None:
+            with self._trava:
+                self._itens[chave] = None
+                while len(self._itens) > self.capacidade:
+                    self._itens.popitem(last=False)
+
+
+# Veredictos de regras do processo; ligado com VALIDAR_CACHE_REGRAS=<número de itens>
+cache_regras = CacheRegras(int(os.environ.get("VALIDAR_CACHE_REGRAS", 0) or 0))
+
+
+ResultadoLote = namedtuple("ResultadoLote", ["indice", "valido", "relatorio", "caminho_grafo", "tempo"])
+
+
+def _validar_bloco(inicio, bloco, renderizar, medir=None):
+    """
+    Valida um bloco de problemas em um processo do pool, medindo o tempo de
+    cada um. Os grafos do bloco são renderizados juntos, em uma única execução
+    do dot. Uma falha em um problema (na validação ou no grafo) fica registrada
+    no relatório dele como erro_processamento e não interrompe o lote.
+    """
+    resultados = []
+    for deslocamento, (premissas_e_conclusao, passos) in enumerate(bloco):
+        comeco = time.perf_counter()
+        try:
+            valido, relatorio, grafo = validar(premissas_e_conclusao, passos, renderizar="lazy" if renderizar else "off", medir=medir)
+        except Exception as e:
+            relatorio = Relatorio()
+            relatorio.registrar("erro_processamento", erro=str(e))
+            valido, grafo = False, None
+        resultados.append(ResultadoLote(inicio + deslocamento, valido, relatorio, grafo, time.perf_counter() - comeco))
+
+    grafos = [resultado.caminho_grafo for resultado in resultados if resultado.caminho_grafo is not None]
+    if grafos:
+        comeco = time.perf_counter()
+        caminhos, erros = _renderizar_bloco(grafos)
+        # O tempo da renderização conjunta é dividido entre os problemas do bloco
+        tempo_extra = (time.perf_counter() - comeco) / len(grafos)
+        for i, resultado in enumerate(resultados):
+            grafo = resultado.caminho_grafo
+            if grafo is None:
+                continue
+            if id(grafo) in erros:
+                resultado.relatorio.registrar("erro_processamento", erro=str(erros[id(grafo)]))
+                resultado.relatorio.valido = False
+                resultado = resultado._replace(valido=False)
+            resultados[i] = resultado._replace(caminho_grafo=caminhos.get(id(grafo)), tempo=resultado.tempo + tempo_extra)
+    return resultados
+
+
+def _renderizar_bloco(grafos):
+    """
+    Renderiza os grafos de um bloco e devolve ({id(grafo): caminho}, {id(grafo): erro}).
+    Se a execução conjunta do dot falhar, cada grafo é renderizado sozinho, para
+    que só os grafos com problema fiquem sem SVG; sem o Graphviz, nenhum tem.
+    """
+    from grafo import renderizar_grafos
+
     try:
-        match = re.search(r'COND\((\d+)\)', conteudo)
-        if not match:
-            raise DeducaoInvalidaError(passo, "COND", "Condicional requer uma justificativa (ex.: COND(1))")
-
-        passo_referencia = match.group(1)
-        if passo_referencia not in passos_dict:
-            raise DeducaoInvalidaError(passo, "COND", f"Passo {passo_referencia} não encontrado")
-
-        proposicao_original = extrair_conclusao(passos_dict[passo_referencia])
-        conclusao_deduzida = extrair_conclusao(conteudo)
-
-        # Aplica a transformação condicional -> disjunção
-        if "→" in proposicao_original:
-            partes = proposicao_original.split("→")
-            proposicao_esperada = f"¬{partes[0]}v{partes[1]}"
-        elif "v" in proposicao_original:  # Inverso: disjunção -> condicional
-            partes = proposicao_original.split("v")
-            proposicao_esperada = f"¬{partes[0]}→{partes[1]}"
-        else:
-            raise DeducaoInvalidaError(passo, "COND", f"A proposição no passo {passo_referencia} não é uma condicional ou disjunção válida para a regra COND.")
+        renderizar_grafos(grafos)
+        return {id(grafo): grafo.caminho for grafo in grafos}, {}
+    except FileNotFoundError:
+        return {}, {}
+    except Exception:
+        pass
+
+    caminhos, erros = {}, {}
+    for grafo in grafos:
+        try:
+            caminhos[id(grafo)] = grafo.caminho
+        except FileNotFoundError:
+            return {}, {}
+        except Exception as e:
+            erros[id(grafo)] = e
+    return caminhos, erros
 
 
-        if proposicoes_iguais(conclusao_deduzida, proposicao_esperada):
-            feedback += f"Passo {passo} validado com sucesso usando Condicional.\n"
-            return True, feedback
-        else:
-            raise DeducaoInvalidaError(passo, "COND", f"A proposição '{conclusao_deduzida}' não corresponde à transformação esperada '{proposicao_esperada}'")
-
-    except DeducaoInvalidaError as e:
-        feedback += str(e) + "\n"
-        return False, feedback
-
-
-def gerar_grafo(passos_dict, relacoes, premissas):
-    """Gera um grafo com os passos da dedução e as relações entre eles."""
-    if not os.path.exists("grafos"):
-        os.makedirs("grafos")
-
-    dot = Digraph(format="svg")
-    dot.attr(rankdir="LR")
-    dot.attr("node", shape="box", style="rounded,filled", fillcolor="lightgrey")
-    dot.attr("edge", arrowsize="0.8", fontsize="10")
-
-    # Adicionar nós
-    for numero, conteudo in passos_dict.items():
-        if "(Hipótese)" in conteudo or conteudo.endswith("(Hip-RAA)") or conteudo.endswith("(Hip-PC)"):
-            cor_no = "lightgreen"  # Hipóteses, Hip-RAA e Hip-PC sempre verdes
-        elif "RAA" in conteudo or "PC" in conteudo:
-            valido_passo = any(passo == numero and valido for referencias, passo, regra, valido in relacoes if regra in ("RAA", "PC"))
-            cor_no = "lightgreen" if valido_passo else "lightcoral"
-        else:
-            valido_passo = any(passo == numero and valido for referencias, passo, regra, valido in relacoes)
-            cor_no = "lightgreen" if valido_passo else "lightcoral"
+def _blocos(problemas, tamanho_lote):
+    iterador = iter(problemas)
+    inicio = 0
+    while True:
+        bloco = list(islice(iterador, tamanho_lote))
+        if not bloco:
+            return
+        yield inicio, bloco
+        inicio += len(bloco)
+
+
+def validar_lote(problemas, processos=None, tamanho_lote=32, ordenado=True, renderizar=False, medir=None):
+    """
+    Valida vários pares (premissas_e_conclusao, passos) em um pool de processos.
+
+    Os problemas são consumidos aos poucos, em blocos de `tamanho_lote`, com no
+    máximo dois blocos por processo em andamento, então a memória usada não
+    depende do tamanho da entrada. Os resultados (ResultadoLote, com o tempo de
+    cada validação) são produzidos na ordem da entrada ou, com ordenado=False,
+    à medida que ficam prontos. Com processos=1 tudo roda no processo atual.
+    Grafos só são gerados com renderizar=True; `medir` é repassado a `validar`.
+    """
+    if processos == 1:
+        for inicio, bloco in _blocos(problemas, tamanho_lote):
+            yield from _validar_bloco(inicio, bloco, renderizar, medir)
+        return
+
+    from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+    processos = processos or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=processos) as executor:
+        limite = 2 * processos
+        blocos = _blocos(problemas, tamanho_lote)
+        pendentes = deque()
+
+        def enviar():
+            for inicio, bloco in islice(blocos, limite - len(pendentes)):
+                pendentes.append(executor.submit(_validar_bloco, inicio, bloco, renderizar, medir))
+
+        enviar()
+        while pendentes:
+            if ordenado:
+                yield from pendentes.popleft().result()
+            else:
+                prontos, _ = wait(pendentes, return_when=FIRST_COMPLETED)
+                for futuro in prontos:
+                    pendentes.remove(futuro)
+                    yield from futuro.result()
+            enviar()
 
-        dot.node(numero, f"{numero}: {conteudo}", fillcolor=cor_no)
 
-    # Adicionar arestas
-    for referencias, passo, regra, valido in relacoes:
-        cor_aresta = "green" if valido else "red"
-        for ref in referencias:
-            dot.edge(ref, passo, label=f"{regra} {'(OK)' if valido else '(Erro)'}", color=cor_aresta, fontcolor=cor_aresta)
+def _ler_problemas(arquivo):
+    import json
 
-    caminho_grafo = os.path.join("grafos", "grafo_deducao")
-    dot.render(caminho_grafo, format="svg", cleanup=True)
-    return f"{caminho_grafo}.svg"
+    for linha in arquivo:
+        if linha.strip():
+            problema = json.loads(linha)
+            yield problema["premissas_e_conclusao"], problema["passos"]
+
+
+def main(argv=None):
+    import json
+    import argparse
+
+    parser = argparse.ArgumentParser(prog="python -m motor_inferencia", description="Validador de deduções naturais.")
+    subcomandos = parser.add_subparsers(dest="comando", required=True)
+
+    lote = subcomandos.add_parser("batch", help="Valida um arquivo JSONL de deduções.")
+    lote.add_argument("entrada", help="JSONL com os campos 'premissas_e_conclusao' e 'passos' ('-' para stdin)")
+    lote.add_argument("saida", help="JSONL de resultados ('-' para stdout)")
+    lote.add_argument("--processos", type=int, default=None, help="Número de processos (padrão: número de CPUs)")
+    lote.add_argument("--tamanho-lote", type=int, default=32, help="Problemas enviados a cada processo por vez")
+    lote.add_argument("--fora-de-ordem", action="store_true", help="Escreve os resultados à medida que ficam prontos")
+    lote.add_argument("--renderizar", action="store_true", help="Gera o grafo SVG de cada dedução")
+    lote.add_argument("--medir", action="store_true", help="Inclui no relatório o tempo de cada fase e de cada regra")
+
+    args = parser.parse_args(argv)
+
+    entrada = sys.stdin if args.entrada == "-" else open(args.entrada, encoding="utf-8")
+    saida = sys.stdout if args.saida == "-" else open(args.saida, "w", encoding="utf-8")
+    try:
+        resultados = validar_lote(
+            _ler_problemas(entrada),
+            processos=args.processos,
+            tamanho_lote=args.tamanho_lote,
+            ordenado=not args.fora_de_ordem,
+            renderizar=args.renderizar,
+            medir=args.medir or None,
+        )
+        for resultado in resultados:
+            dados = resultado._asdict()
+            dados["relatorio"] = resultado.relatorio.para_dict()
+            saida.write(json.dumps(dados, ensure_ascii=False, separators=(",", ":")) + "\n")
+    finally:
+        if entrada is not sys.stdin:
+            entrada.close()
+        if saida is not sys.stdout:
+            saida.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+import re
+import time
+import asyncio
+from collections import namedtuple
+
+from motor_inferencia import validar, DESCRICAO_REGRAS
+from provador import provar
+
+# Parâmetros de geração usados quando o modelo deve devolver só a continuação
+PARAMETROS_PADRAO = {"return_full_text": False, "max_new_tokens": 1024}
+
+_LINHA_PASSO = re.compile(r"^\s*(\d+)\s*[.)]\s*(.+?)\s*$")
+_MARKDOWN = re.compile(r"[*`]+")
+
+Tentativa = namedtuple("Tentativa", ["tentativa", "candidato", "passos", "valido", "relatorio"])
+Tentativa.__doc__ = "Uma resposta do modelo já extraída e validada."
+
+ResultadoProva = namedtuple("ResultadoProva", ["valido", "passos", "origem", "relatorio", "tentativas"])
+ResultadoProva.__doc__ = """
+Resultado de provar_com_llm. `origem` é "llm" ou "local" quando uma prova
+válida foi encontrada e None caso contrário; `relatorio` é o da última
+validação e `tentativas` lista todas as respostas avaliadas.
+"""
+
+
+def montar_prompt(sequente, anterior=None):
+    """
+    Monta o pedido ao modelo. Com `anterior` (uma Tentativa rejeitada), o modelo
+    recebe a própria resposta e os erros apontados pelo validador para corrigi-la.
+    """
+    regras = "\n".join(
+        f"- {sigla}: {nome} (ex.: {exemplo})" for sigla, (nome, _, exemplo) in DESCRICAO_REGRAS.items()
+    )
+    linhas = [
+        "Construa uma dedução natural em lógica proposicional para o sequente:",
+        sequente,
+        "",
+        "Responda apenas com os passos numerados, um por linha, no formato:",
+        "1. P → Q (Hipótese)",
+        "2. P (Hipótese)",
+        "3. Q MP(1,2)",
+        "",
+        "Cada premissa é um passo marcado com (Hipótese). Subprovas começam com (Hip-PC) ou",
+        "(Hip-RAA) e são fechadas por PC ou RAA citando o intervalo. Use v para disjunção.",
+        "Regras disponíveis:",
+        regras,
+    ]
+    if anterior is not None:
+        erros = [str(evento) for evento in anterior.relatorio.erros] if anterior.passos else [
+            "Nenhum passo numerado foi encontrado na resposta."
+        ]
+        linhas += [
+            "",
+            "Sua tentativa anterior foi:",
+            anterior.passos or "(vazia)",
+            "",
+            "O validador a rejeitou com os erros:",
+            *(f"- {erro}" for erro in erros),
+            "",
+            "Corrija a dedução e responda novamente apenas com os passos.",
+        ]
+    return "\n".join(linhas)
+
+
+def extrair_passos(texto):
+    """
+    Extrai os passos numerados da resposta do modelo, ignorando explicações e
+    marcação Markdown. Se a numeração recomeça, vale o último bloco.
+    """
+    texto = texto.split("Explicação:")[0]
+    passos = []
+    for linha in texto.splitlines():
+        match = _LINHA_PASSO.match(_MARKDOWN.sub("", linha))
+        if not match:
+            continue
+        numero, conteudo = match.groups()
+        if numero == "1":
+            passos = []
+        passos.append(f"{numero}. {conteudo}")
+    return "\n".join(passos)
+
+
+async def _avaliar(sequente, gerar, prompt, parametros, tentativa, candidato):
+    resposta = await gerar(prompt, parametros)
+    passos = extrair_passos(resposta)
+    if not passos:
+        valido, relatorio = False, None
+    else:
+        valido, relatorio, _ = await asyncio.to_thread(validar, sequente, passos, renderizar="off")
+    return Tentativa(tentativa, candidato, passos, valido, relatorio)
+
+
+async def _rodada(sequente, gerar, prompt, parametros, tentativa, candidatos, limite=None):
+    """
+    Gera e valida `candidatos` respostas em paralelo. Devolve as tentativas
+    avaliadas, parando na primeira válida ou quando chega o `limite` (em
+    time.monotonic()); as demais são canceladas, mas as já avaliadas são mantidas.
+    """
+    tarefas = []
+    for candidato in range(candidatos):
+        parametros_candidato = dict(parametros)
+        if candidatos > 1:
+            # Amostras diferentes para cada candidato (e chaves de cache diferentes)
+            parametros_candidato.setdefault("do_sample", True)
+            parametros_candidato.setdefault("temperature", 0.7)
+            parametros_candidato["seed"] = tentativa * candidatos + candidato
+        tarefas.append(asyncio.ensure_future(
+            _avaliar(sequente, gerar, prompt, parametros_candidato, tentativa, candidato)
+        ))
+
+    avaliadas = []
+    erro = None
+    pendentes = set(tarefas)
+    try:
+        while pendentes:
+            restante = limite - time.monotonic() if limite is not None else None
+            if restante is not None and restante <= 0:
+                break
+            prontas, pendentes = await asyncio.wait(pendentes, timeout=restante, return_when=asyncio.FIRST_COMPLETED)
+            # Na ordem dos candidatos, para que o resultado não dependa do escalonamento
+            for tarefa in (tarefa for tarefa in tarefas if tarefa in prontas):
+                if tarefa.exception() is not None:
+                    erro = tarefa.exception()
+                    continue
+                avaliadas.append(tarefa.result())
+            if any(avaliada.valido for avaliada in avaliadas):
+                break
+    finally:
+        for tarefa in tarefas:
+            tarefa.cancel()
+    if not avaliadas and not pendentes and erro is not None:
+        raise erro
+    return avaliadas
+
+
+async def provar_com_llm(sequente, gerar, tentativas=3, candidatos=1, prazo=None, parametros=None, provador_local=False):
+    """
+    Pede ao modelo uma dedução para o sequente, valida a resposta e, se ela for
+    rejeitada, pede uma correção informando os erros, até `tentativas` vezes ou
+    até esgotar o `prazo` (em segundos). `gerar(prompt, parametros)` é a função
+    assíncrona que consulta o modelo. Com `provador_local`, o provador automático
+    é tentado antes do modelo.
+    """
+    limite = time.monotonic() + prazo if prazo else None
+    parametros = {**PARAMETROS_PADRAO, **(parametros or {})}
+
+    # Um sequente inválido (ou mal escrito) não tem prova: o validador devolve
+    # o contraexemplo ou o erro de leitura sem consultar o modelo
+    _, relatorio, _ = await asyncio.to_thread(validar, sequente, "", renderizar="off")
+    if any(evento.codigo in ("sequente_invalido", "erro_processamento") for evento in relatorio.eventos):
+        return ResultadoProva(False, None, None, relatorio, [])
+
+    if provador_local:
+        passos = await asyncio.to_thread(provar, sequente)
+        if passos is not None:
+            valido, relatorio_local, _ = await asyncio.to_thread(validar, sequente, passos, renderizar="off")
+            if valido:
+                return ResultadoProva(True, passos, "local", relatorio_local, [])
+
+    historico = []
+    anterior = None
+    for tentativa in range(1, tentativas + 1):
+        restante = limite - time.monotonic() if limite is not None else None
+        if restante is not None and restante <= 0:
+            break
+        prompt = montar_prompt(sequente, anterior)
+        avaliadas = await _rodada(sequente, gerar, prompt, parametros, tentativa, candidatos, limite)
+        if not avaliadas:
+            # O prazo acabou antes de qualquer resposta
+            break
+        historico.extend(avaliadas)
+
+        validas = [avaliada for avaliada in avaliadas if avaliada.valido]
+        if validas:
+            return ResultadoProva(True, validas[0].passos, "llm", validas[0].relatorio, historico)
+        # A próxima tentativa corrige o candidato com menos erros
+        anterior = min(avaliadas, key=lambda avaliada: len(avaliada.relatorio.erros) if avaliada.relatorio else float("inf"))
+        relatorio = anterior.relatorio or relatorio
+
+    return ResultadoProva(False, None, None, relatorio, historico)
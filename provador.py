@@ -0,0 +1,349 @@
+import sys
+import time
+
+from formulas import TabelaFormulas, NAO, E, OU, IMPLICA, EQUIVALE
+from motor_inferencia import ler_sequente
+from semantica import MuitosAtomosError, verificar_sequente
+
+
+class TempoEsgotadoError(Exception):
+    pass
+
+
+def contem(formula, subformula):
+    """Indica se `subformula` aparece em `formula` (inclusive como a própria fórmula)."""
+    pilha = [formula]
+    while pilha:
+        atual = pilha.pop()
+        if atual is subformula:
+            return True
+        pilha.extend(atual.filhos)
+    return False
+
+
+def subformulas(formulas):
+    """Todas as subfórmulas das fórmulas dadas, sem repetição."""
+    vistas = {}
+    pilha = list(formulas)
+    while pilha:
+        atual = pilha.pop()
+        if atual not in vistas:
+            vistas[atual] = None
+            pilha.extend(atual.filhos)
+    return list(vistas)
+
+
+class Provador:
+    """
+    Busca automática de deduções usando as regras do motor de inferência.
+
+    A busca combina uma saturação para frente com as regras de eliminação (SP,
+    MP, MT, SD, ↔E, DN, DMOR e COND) e uma busca para trás, guiada pelo formato
+    do objetivo (CJ, PC, ↔I, AD, vE e, em último caso, RAA). A profundidade é
+    aprofundada iterativamente, então as provas encontradas tendem a ser curtas.
+    Objetivos que já falharam num mesmo conjunto de fórmulas disponíveis são
+    memorizados e não são tentados de novo.
+    """
+
+    def __init__(self, tabela=None, profundidade=6, tempo_limite=2.0):
+        self.tabela = tabela or TabelaFormulas()
+        self.profundidade = profundidade
+        self.tempo_limite = tempo_limite
+        self.linhas = []
+        self.disponiveis = {}
+        self._falhas = {}
+        self._prazo = None
+
+    # Montagem da prova
+
+    def _adicionar(self, formula, justificativa):
+        self.linhas.append((formula, justificativa))
+        numero = len(self.linhas)
+        self.disponiveis[formula] = numero
+        return numero
+
+    def _marcar(self):
+        return len(self.linhas), dict(self.disponiveis)
+
+    def _restaurar(self, marca):
+        tamanho, disponiveis = marca
+        del self.linhas[tamanho:]
+        self.disponiveis = dict(disponiveis)
+
+    def _fechar_subprova(self, marca, formula, regra, inicio):
+        # As fórmulas da subprova deixam de estar disponíveis depois de fechada
+        fim = len(self.linhas)
+        self.disponiveis = dict(marca[1])
+        return self._adicionar(formula, f"{regra}({inicio}-{fim})")
+
+    def _reiterar(self, formula, hipotese):
+        """Repete `formula` como última linha da subprova (via CJ e SP)."""
+        tabela = self.tabela
+        conjuncao = self._adicionar(tabela.e(formula, hipotese), f"CJ({self.disponiveis[formula]},{self.disponiveis[hipotese]})")
+        self._adicionar(formula, f"SP({conjuncao})")
+
+    def texto(self):
+        """Os passos da prova no formato aceito por motor_inferencia.validar."""
+        return "\n".join(f"{numero}. {formula} {justificativa}" for numero, (formula, justificativa) in enumerate(self.linhas, 1))
+
+    # Saturação para frente
+
+    def _saturar(self, novas):
+        tabela = self.tabela
+        pendentes = list(novas)
+        while pendentes:
+            formula = pendentes.pop()
+            linha = self.disponiveis.get(formula)
+            if linha is None:
+                continue
+            derivadas = []
+            op = formula.op
+
+            if op == E:
+                derivadas.append((formula.esquerda, f"SP({linha})"))
+                derivadas.append((formula.direita, f"SP({linha})"))
+            elif op == EQUIVALE:
+                esquerda, direita = formula.filhos
+                derivadas.append((tabela.implica(esquerda, direita), f"↔E({linha})"))
+                derivadas.append((tabela.implica(direita, esquerda), f"↔E({linha})"))
+            elif op == NAO:
+                interna = formula.filhos[0]
+                if interna.op == NAO:
+                    derivadas.append((interna.filhos[0], f"DN({linha})"))
+                elif interna.op in (E, OU):
+                    dual = OU if interna.op == E else E
+                    derivadas.append((tabela.no(dual, tabela.nao(interna.esquerda), tabela.nao(interna.direita)), f"DMOR({linha})"))
+                elif interna.op == IMPLICA:
+                    derivadas.append((tabela.nao(tabela.ou(tabela.nao(interna.esquerda), interna.direita)), f"COND({linha})"))
+
+            # Combinações com as fórmulas já disponíveis, com `formula` em qualquer papel
+            for outra, outra_linha in list(self.disponiveis.items()):
+                for maior, maior_linha, menor, menor_linha in ((outra, outra_linha, formula, linha), (formula, linha, outra, outra_linha)):
+                    if maior.op == IMPLICA:
+                        antecedente, consequente = maior.filhos
+                        if menor is antecedente:
+                            derivadas.append((consequente, f"MP({maior_linha},{menor_linha})"))
+                        elif menor is tabela.nao(consequente) or tabela.nao(menor) is consequente:
+                            derivadas.append((tabela.nao(antecedente), f"MT({maior_linha},{menor_linha})"))
+                    elif maior.op == OU:
+                        if menor is tabela.nao(maior.esquerda):
+                            derivadas.append((maior.direita, f"SD({maior_linha},{menor_linha})"))
+                        elif menor is tabela.nao(maior.direita):
+                            derivadas.append((maior.esquerda, f"SD({maior_linha},{menor_linha})"))
+
+            for derivada, justificativa in derivadas:
+                if derivada not in self.disponiveis:
+                    self._adicionar(derivada, justificativa)
+                    pendentes.append(derivada)
+
+    def _supor(self, hipotese, marcador):
+        inicio = self._adicionar(hipotese, f"({marcador})")
+        self._saturar([hipotese])
+        return inicio
+
+    # Busca para trás
+
+    def _verificar_prazo(self):
+        if self._prazo is not None and time.perf_counter() > self._prazo:
+            raise TempoEsgotadoError()
+
+    def _provar(self, objetivo, profundidade):
+        if objetivo in self.disponiveis:
+            return True
+        if profundidade <= 0:
+            return False
+        self._verificar_prazo()
+
+        chave = (objetivo, frozenset(self.disponiveis))
+        if self._falhas.get(chave, 0) >= profundidade:
+            return False
+
+        marca = self._marcar()
+        for estrategia in (self._introduzir, self._eliminar, self._por_casos, self._por_absurdo):
+            if estrategia(objetivo, profundidade):
+                self._saturar([objetivo])
+                return True
+            self._restaurar(marca)
+
+        self._falhas[chave] = profundidade
+        return False
+
+    def _introduzir(self, objetivo, profundidade):
+        tabela = self.tabela
+        op = objetivo.op
+        if op == E:
+            esquerda, direita = objetivo.filhos
+            if self._provar(esquerda, profundidade - 1) and self._provar(direita, profundidade - 1):
+                self._adicionar(objetivo, f"CJ({self.disponiveis[esquerda]},{self.disponiveis[direita]})")
+                return True
+            return False
+
+        if op == IMPLICA:
+            return self._provar_condicional(objetivo.esquerda, objetivo.direita, profundidade)
+
+        if op == EQUIVALE:
+            esquerda, direita = objetivo.filhos
+            ida, volta = tabela.implica(esquerda, direita), tabela.implica(direita, esquerda)
+            if self._provar(ida, profundidade - 1) and self._provar(volta, profundidade - 1):
+                self._adicionar(objetivo, f"↔I({self.disponiveis[ida]},{self.disponiveis[volta]})")
+                return True
+            return False
+
+        if op == OU:
+            for lado in objetivo.filhos:
+                marca = self._marcar()
+                if self._provar(lado, profundidade - 1):
+                    self._adicionar(objetivo, f"AD({self.disponiveis[lado]})")
+                    return True
+                self._restaurar(marca)
+            # ¬A → B vale A v B pela regra COND (negações duplas são simplificadas)
+            condicional = tabela.implica(tabela.nao(objetivo.esquerda), objetivo.direita)
+            if self._provar(condicional, profundidade - 1):
+                self._adicionar(objetivo, f"COND({self.disponiveis[condicional]})")
+                return True
+        return False
+
+    def _provar_condicional(self, antecedente, consequente, profundidade):
+        marca = self._marcar()
+        inicio = self._supor(antecedente, "Hip-PC")
+        if not self._provar(consequente, profundidade - 1):
+            return False
+        if self.disponiveis[consequente] != len(self.linhas):
+            self._reiterar(consequente, antecedente)
+        self._fechar_subprova(marca, self.tabela.implica(antecedente, consequente), "PC", inicio)
+        return True
+
+    def _eliminar(self, objetivo, profundidade):
+        """
+        Usa condicionais e disjunções disponíveis que levam ao objetivo. Uma
+        condicional cujo consequente apenas contém o objetivo também serve: o
+        consequente é obtido por MP e depois decomposto pela saturação.
+        """
+        tabela = self.tabela
+        for formula, linha in list(self.disponiveis.items()):
+            if formula.op == IMPLICA and formula.esquerda not in self.disponiveis and contem(formula.direita, objetivo):
+                marca = self._marcar()
+                if self._provar(formula.esquerda, profundidade - 1):
+                    consequente = formula.direita
+                    if consequente not in self.disponiveis:
+                        self._adicionar(consequente, f"MP({linha},{self.disponiveis[formula.esquerda]})")
+                        self._saturar([consequente])
+                    if self._provar(objetivo, profundidade - 1):
+                        return True
+                self._restaurar(marca)
+            elif formula.op == OU and objetivo in formula.filhos:
+                outro = formula.direita if formula.esquerda is objetivo else formula.esquerda
+                negacao = tabela.nao(outro)
+                marca = self._marcar()
+                if self._provar(negacao, profundidade - 1):
+                    self._adicionar(objetivo, f"SD({linha},{self.disponiveis[negacao]})")
+                    return True
+                self._restaurar(marca)
+        return False
+
+    def _por_casos(self, objetivo, profundidade):
+        tabela = self.tabela
+        for formula, linha in list(self.disponiveis.items()):
+            if formula.op != OU:
+                continue
+            marca = self._marcar()
+            primeira = tabela.implica(formula.esquerda, objetivo)
+            segunda = tabela.implica(formula.direita, objetivo)
+            if self._provar(primeira, profundidade - 1) and self._provar(segunda, profundidade - 1):
+                self._adicionar(objetivo, f"vE({linha},{self.disponiveis[primeira]},{self.disponiveis[segunda]})")
+                return True
+            self._restaurar(marca)
+        return False
+
+    def _por_absurdo(self, objetivo, profundidade):
+        marca = self._marcar()
+        suposicao = objetivo.filhos[0] if objetivo.op == NAO else self.tabela.nao(objetivo)
+        inicio = self._supor(suposicao, "Hip-RAA")
+        if not self._contradicao(profundidade - 1):
+            return False
+        self._fechar_subprova(marca, objetivo, "RAA", inicio)
+        return True
+
+    def _contradicao(self, profundidade):
+        """Deriva uma contradição A ∧ ¬A como última linha."""
+        tabela = self.tabela
+        negacoes = [formula for formula in self.disponiveis if formula.op == NAO]
+        for negacao in negacoes:
+            if negacao.filhos[0] in self.disponiveis:
+                return self._conjuntar_contradicao(negacao.filhos[0], negacao)
+
+        for negacao in negacoes:
+            marca = self._marcar()
+            if self._provar(negacao.filhos[0], profundidade):
+                return self._conjuntar_contradicao(negacao.filhos[0], negacao)
+            self._restaurar(marca)
+
+        # Em seguida, pares A e ¬A que aparecem dentro das fórmulas disponíveis
+        for negacao in subformulas(self.disponiveis):
+            if negacao.op != NAO or negacao in self.disponiveis:
+                continue
+            marca = self._marcar()
+            if self._provar(negacao.filhos[0], profundidade) and self._provar(negacao, profundidade):
+                return self._conjuntar_contradicao(negacao.filhos[0], negacao)
+            self._restaurar(marca)
+        return False
+
+    def _conjuntar_contradicao(self, afirmacao, negacao):
+        self._adicionar(self.tabela.e(afirmacao, negacao), f"CJ({self.disponiveis[afirmacao]},{self.disponiveis[negacao]})")
+        return True
+
+    # Interface
+
+    def provar(self, premissas, conclusoes):
+        """
+        Procura uma dedução das conclusões a partir das premissas (fórmulas da
+        tabela). Devolve True e deixa a prova em `linhas`, ou False se nenhuma
+        foi encontrada dentro da profundidade e do tempo disponíveis.
+        """
+        self._prazo = time.perf_counter() + self.tempo_limite if self.tempo_limite else None
+        try:
+            for profundidade in range(1, self.profundidade + 1):
+                self.linhas = []
+                self.disponiveis = {}
+                for premissa in premissas:
+                    if premissa not in self.disponiveis:
+                        self._adicionar(premissa, "(Hipótese)")
+                self._saturar(list(self.disponiveis))
+                if all(self._provar(conclusao, profundidade) for conclusao in conclusoes):
+                    return True
+        except TempoEsgotadoError:
+            pass
+        self.linhas = []
+        self.disponiveis = {}
+        return False
+
+
+def provar(premissas_e_conclusao, profundidade=6, tempo_limite=2.0):
+    """
+    Gera os passos de uma dedução para o sequente, no mesmo formato aceito por
+    validar (ex.: "1. P → Q (Hipótese)"). Devolve None se o sequente não é válido
+    ou se nenhuma prova foi encontrada dentro da profundidade e do tempo limite.
+    """
+    premissas, conclusoes = ler_sequente(premissas_e_conclusao)
+    tabela = TabelaFormulas()
+    premissas = [tabela.parse(p) for p in premissas]
+    conclusoes = [tabela.parse(c) for c in conclusoes]
+
+    # Sequentes inválidos não têm prova: a tabela-verdade responde na hora
+    try:
+        if not verificar_sequente(premissas, conclusoes, tabela).valido:
+            return None
+    except MuitosAtomosError:
+        pass
+
+    provador = Provador(tabela, profundidade, tempo_limite)
+    if not provador.provar(premissas, conclusoes):
+        return None
+    return provador.texto()
+
+
+if __name__ == "__main__":
+    for sequente in sys.argv[1:]:
+        passos = provar(sequente)
+        print(sequente)
+        print(passos if passos is not None else "Nenhuma prova encontrada.")
@@ -1,38 +1,232 @@
-from fastapi import FastAPI, HTTPException
+import os
+import asyncio
+from typing import List, Optional
+from collections import Counter
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, HTTPException, Response
+from fastapi.responses import PlainTextResponse
 from pydantic import BaseModel
-import requests
 
-# Substitua pelo seu token de acesso da Hugging Face
-HUGGING_FACE_API_TOKEN = "SEUTOKENAQUI"
+from cliente_llm import ClienteLLM, Coalescedor, ErroUpstream
+from cache_respostas import CacheRespostas, MEMORIA, DISCO, chave_resposta
+from prova_llm import provar_com_llm
+import metricas
+
+# Substitua pelo seu token de acesso da Hugging Face (ou defina HUGGING_FACE_API_TOKEN)
+HUGGING_FACE_API_TOKEN = os.environ.get("HUGGING_FACE_API_TOKEN", "SEUTOKENAQUI")
+
+# Cliente compartilhado por todos os pedidos; a URL pode apontar para um
+# servidor local (QWEN_URL) que imite a API de inferência
+cliente = ClienteLLM.do_ambiente(token=HUGGING_FACE_API_TOKEN)
+
+# Respostas já geradas, em memória e em disco (QWEN_CACHE="" desativa o disco)
+cache = CacheRespostas.do_ambiente()
+
+# Prompts idênticos simultâneos compartilham uma única chamada ao modelo
+coalescedor = Coalescedor()
+
+# Limite de prompts por pedido em /generate/batch
+LOTE_MAXIMO = int(os.environ.get("QWEN_LOTE_MAXIMO", 256))
+
+# Limites de /prove
+PROVA_TENTATIVAS_MAX = int(os.environ.get("QWEN_PROVA_TENTATIVAS", 5))
+PROVA_CANDIDATOS_MAX = int(os.environ.get("QWEN_PROVA_CANDIDATOS", 4))
+
+# Origem de uma resposta que aguardou a chamada de outro pedido idêntico
+COMPARTILHADA = "compartilhada"
+
+# Respostas servidas, por origem (memoria, disco, compartilhada ou modelo), para /metrics
+respostas_por_origem = Counter()
+
+# As validações de /prove entram em /metrics (QWEN_METRICAS_VALIDACAO=0 desativa a medição)
+if os.environ.get("QWEN_METRICAS_VALIDACAO", "1") != "0":
+    metricas.ativar()
+
+
+@asynccontextmanager
+async def ciclo_de_vida(app):
+    await cliente.abrir()
+    try:
+        yield
+    finally:
+        await cliente.fechar()
+        cache.fechar()
+
 
 # Inicializa o app FastAPI
-app = FastAPI()
+app = FastAPI(lifespan=ciclo_de_vida)
 
 class PromptRequest(BaseModel):
     prompt: str
+    parameters: Optional[dict] = None
+    cache: bool = True
 
 class PromptResponse(BaseModel):
     answer: str
 
+class BatchRequest(BaseModel):
+    prompts: List[str]
+    parameters: Optional[dict] = None
+    cache: bool = True
+    concurrency: Optional[int] = None
+
+class BatchItem(BaseModel):
+    answer: Optional[str] = None
+    error: Optional[str] = None
+    cache: str
+
+class BatchResponse(BaseModel):
+    answers: List[BatchItem]
+
+class ProveRequest(BaseModel):
+    sequent: str
+    attempts: int = 3
+    candidates: int = 1
+    timeout: Optional[float] = None
+    parameters: Optional[dict] = None
+    use_local_prover: bool = False
+
+class ProveAttempt(BaseModel):
+    attempt: int
+    candidate: int
+    steps: str
+    valid: bool
+    errors: List[str]
+
+class ProveResponse(BaseModel):
+    valid: bool
+    steps: Optional[str] = None
+    source: Optional[str] = None
+    report: dict
+    attempts: List[ProveAttempt]
+
+async def gerar_com_cache(prompt, parametros=None, usar_cache=True):
+    """
+    Devolve (resposta, origem), em que origem é "memoria" ou "disco" quando a
+    resposta veio do cache, "compartilhada" quando aguardou a chamada de um
+    pedido idêntico em andamento e None quando o modelo foi consultado.
+    """
+    chave = chave_resposta(cliente.url, prompt, parametros)
+    if usar_cache:
+        resposta, nivel = await cache.obter(chave)
+        if resposta is not None:
+            respostas_por_origem[nivel] += 1
+            return resposta, nivel
+
+    async def consultar():
+        resposta = await cliente.gerar(prompt, **(parametros or {}))
+        await cache.guardar(chave, resposta)
+        return resposta
+
+    if not usar_cache:
+        resposta, origem = await consultar(), None
+    else:
+        resposta, compartilhada = await coalescedor.executar(chave, consultar)
+        origem = COMPARTILHADA if compartilhada else None
+    respostas_por_origem[origem or "modelo"] += 1
+    return resposta, origem
+
+def erro_http(erro):
+    # Sem resposta do upstream (timeout/conexão) é 504; resposta de erro é 502
+    if isinstance(erro, ErroUpstream):
+        return HTTPException(status_code=502 if erro.status else 504, detail=f"Erro ao consultar o modelo: {erro}")
+    return HTTPException(status_code=500, detail=f"Erro ao processar: {erro}")
+
+def estado_cache(origem):
+    return "HIT" if origem in (MEMORIA, DISCO) else "MISS"
+
 @app.post("/generate", response_model=PromptResponse)
-async def generate_answer(request: PromptRequest):
+async def generate_answer(request: PromptRequest, response: Response):
     try:
-        headers = {
-            "Authorization": f"Bearer {HUGGING_FACE_API_TOKEN}"
-        }
-        # Substitua 'modelo' pelo nome do modelo que você deseja usar
-        response = requests.post(
-            "https://api-inference.huggingface.co/models/Qwen/Qwen2.5-72B-Instruct",
-            headers=headers,
-            json={"inputs": request.prompt}
+        answer, origem = await gerar_com_cache(request.prompt, request.parameters, request.cache)
+    except Exception as e:
+        raise erro_http(e)
+    response.headers["X-Cache"] = estado_cache(origem)
+    if origem in (MEMORIA, DISCO):
+        response.headers["X-Cache-Nivel"] = origem
+    elif origem == COMPARTILHADA:
+        response.headers["X-Coalescido"] = "1"
+    return PromptResponse(answer=answer)
+
+@app.post("/generate/batch", response_model=BatchResponse)
+async def generate_batch(request: BatchRequest):
+    """
+    Gera as respostas de vários prompts, na ordem recebida, com no máximo
+    `concurrency` chamadas simultâneas. Uma falha afeta só o item correspondente.
+    """
+    if len(request.prompts) > LOTE_MAXIMO:
+        raise HTTPException(status_code=413, detail=f"O lote tem {len(request.prompts)} prompts; o máximo é {LOTE_MAXIMO}.")
+    concorrencia = min(request.concurrency or cliente.concorrencia, cliente.concorrencia)
+    semaforo = asyncio.Semaphore(max(1, concorrencia))
+
+    async def gerar_item(prompt):
+        async with semaforo:
+            try:
+                answer, origem = await gerar_com_cache(prompt, request.parameters, request.cache)
+            except Exception as e:
+                return BatchItem(error=erro_http(e).detail, cache="MISS")
+        return BatchItem(answer=answer, cache=estado_cache(origem))
+
+    itens = await asyncio.gather(*(gerar_item(prompt) for prompt in request.prompts))
+    return BatchResponse(answers=list(itens))
+
+@app.post("/prove", response_model=ProveResponse)
+async def prove(request: ProveRequest):
+    """
+    Pede ao modelo uma dedução para o sequente, valida e, se houver erros,
+    pede uma correção com os erros encontrados, até `attempts` rodadas de
+    `candidates` respostas em paralelo ou até o `timeout` (segundos).
+    """
+    async def gerar(prompt, parametros):
+        resposta, _ = await gerar_com_cache(prompt, parametros)
+        return resposta
+
+    try:
+        resultado = await provar_com_llm(
+            request.sequent, gerar,
+            tentativas=max(1, min(request.attempts, PROVA_TENTATIVAS_MAX)),
+            candidatos=max(1, min(request.candidates, PROVA_CANDIDATOS_MAX)),
+            prazo=request.timeout,
+            parametros=request.parameters,
+            provador_local=request.use_local_prover,
         )
-        response.raise_for_status()
-        data = response.json()
-        # Extrair a resposta do modelo
-        answer = data[0]['generated_text']
-        return PromptResponse(answer=answer)
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Erro ao processar: {e}")
+        raise erro_http(e)
+
+    tentativas = [
+        ProveAttempt(
+            attempt=tentativa.tentativa, candidate=tentativa.candidato, steps=tentativa.passos, valid=tentativa.valido,
+            errors=[str(evento) for evento in tentativa.relatorio.erros] if tentativa.relatorio else [],
+        )
+        for tentativa in resultado.tentativas
+    ]
+    return ProveResponse(
+        valid=resultado.valido, steps=resultado.passos, source=resultado.origem,
+        report=resultado.relatorio.para_dict(), attempts=tentativas,
+    )
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """
+    Métricas no formato de texto do Prometheus: latência das chamadas ao
+    modelo, estatísticas do cache e tempos de `validar` por fase e por regra.
+    """
+    linhas = cliente.latencias.prometheus()
+    linhas += metricas.formatar_metrica(
+        "qwen_respostas_total", "counter", "Respostas servidas, por origem.",
+        {(origem,): quantidade for origem, quantidade in respostas_por_origem.items()}, ("origem",),
+    )
+    linhas += metricas.formatar_metrica(
+        "qwen_cache_eventos_total", "counter", "Acertos, faltas e gravações do cache de respostas.",
+        {(evento,): quantidade for evento, quantidade in cache.estatisticas.items()}, ("evento",),
+    )
+    linhas += metricas.formatar_metrica("qwen_cache_itens_memoria", "gauge", "Respostas no cache em memória.", {(): len(cache.memoria)})
+    linhas += metricas.formatar_metrica(
+        "qwen_chamadas_em_andamento", "gauge", "Chamadas distintas ao modelo em andamento.", {(): len(coalescedor)}
+    )
+    linhas += metricas.VALIDACAO.prometheus()
+    return PlainTextResponse("\n".join(linhas) + "\n", media_type="text/plain; version=0.0.4; charset=utf-8")
 
 @app.get("/")
 async def root():
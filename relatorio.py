@@ -0,0 +1,266 @@
+from collections import namedtuple
+
+# Textos das mensagens, indexados pelo código do evento. Os argumentos de cada
+# evento só são convertidos em texto quando o relatório é exibido.
+MENSAGENS = {
+    # Sucessos
+    "passo_valido": "Passo {passo} validado com sucesso usando {nome}.",
+    "conclusao_deduzida": "Conclusão '{conclusao}' foi deduzida corretamente.",
+    "grafo_gerado": "Grafo gerado com sucesso.",
+    "grafo_montado": "Grafo montado; o SVG será gerado quando for usado.",
+
+    # Erros de processamento
+    "erro_processamento": "Erro durante o processamento: {erro}",
+    "erro_validacao": "Erro durante a validação: {erro}",
+    "graphviz_ausente": "Erro: Graphviz não está instalado. O grafo não foi gerado.",
+    "sequente_invalido": (
+        "Erro: O sequente não é válido. Com {valoracao}, todas as premissas são verdadeiras "
+        "e a conclusão '{conclusao}' é falsa."
+    ),
+    "conclusao_nao_encontrada": (
+        "Erro: A conclusão '{conclusao}' não foi encontrada entre os passos deduzidos.\n"
+        "Verifique se ela foi construída corretamente com as premissas e as regras aplicadas."
+    ),
+    "conclusao_em_subprova": (
+        "Erro: A conclusão '{conclusao}' só foi deduzida dentro da subprova da hipótese do passo {hipotese}.\n"
+        "Ela depende de uma hipótese que não foi descartada com PC ou RAA."
+    ),
+
+    # Erros de um passo
+    "linha_invalida": "A linha '{linha}' não segue o formato 'N. proposição justificativa'.",
+    "justificativa_ausente": "Justificativa ausente ou não reconhecida.",
+    "formula_invalida": "{erro}",
+    "hipotese_nao_premissa": "A hipótese '{proposicao}' não corresponde a nenhuma premissa.",
+
+    # Erros na aplicação de uma regra
+    "formato_invalido": "{nome} requer {formato} (ex.: {exemplo})",
+    "referencia_ausente": "Passo {referencia} não encontrado",
+    "referencia_sem_formula": "O passo {referencia} não contém uma fórmula válida",
+    "referencia_inacessivel": "O passo {referencia} está na subprova da hipótese {hipotese}, que não está aberta neste passo",
+    "subprova_ja_fechada": "A subprova da hipótese {hipotese} já foi fechada no passo {fechamento}",
+    "subprova_nao_aberta": "A subprova da hipótese {hipotese} não está aberta neste passo",
+    "fim_fora_da_subprova": "O passo {fim} não está no nível da subprova da hipótese {hipotese}",
+    "nao_condicional": "Referência {referencia} não é uma condicional",
+    "nao_conjuncao": "Referência {referencia} não é uma conjunção",
+    "nao_disjuncao": "Referência {referencia} não é uma disjunção",
+    "nao_equivalencia": "Referência {referencia} não é uma equivalência",
+    "condicionais_exigidas": "As referências {referencias} devem ser condicionais",
+    "conclusao_diferente": "Conclusão esperada '{esperada}', mas encontrada '{encontrada}'",
+    "conclusao_diferente_alternativas": "A conclusão esperada era '{primeira}' ou '{segunda}', mas foi encontrada '{encontrada}'",
+    "antecedente_diferente": "Antecedente '{antecedente}' não corresponde a '{esperado}'",
+    "negacao_diferente": "A negação '{negacao}' não corresponde ao esperado '{esperada}'",
+    "negacao_fora_da_disjuncao": "A negação '{negacao}' não corresponde a nenhuma das proposições na disjunção '{disjuncao}'",
+    "simplificacao_invalida": "O conteúdo '{encontrada}' não é uma simplificação válida da conjunção '{conjuncao}'",
+    "conjuncao_invalida": "A conjunção '{encontrada}' não corresponde à união de '{esquerda}' e '{direita}'",
+    "cadeia_interrompida": "O consequente de '{primeira}' não corresponde ao antecedente de '{segunda}'",
+    "dupla_negacao_invalida": "A conclusão '{encontrada}' não corresponde à dupla negação de '{proposicao}'",
+    "adicao_invalida": "A conclusão '{encontrada}' não é uma adição válida de '{proposicao}'",
+    "consequentes_diferentes": "As partes da disjunção não implicam no mesmo consequente",
+    "implicacoes_nao_inversas": "As implicações não são inversas",
+    "hipotese_pc_ausente": "O passo inicial '{referencia}' não é uma hipótese adicional marcada como Hip-PC.",
+    "contradicao_invalida": "A conclusão '{proposicao}' não é uma contradição válida",
+    "suposicao_invalida": "A suposição '{suposicao}' não é a negação de '{encontrada}'",
+    "comutatividade_invalida": "'{origem}' não é equivalente a '{encontrada}' por comutatividade",
+    "de_morgan_sem_negacao": "De Morgan requer uma negação antes da conjunção/disjunção.",
+    "condicional_nao_aplicavel": "A proposição no passo {referencia} não é uma condicional ou disjunção válida para a regra COND.",
+    "transformacao_invalida": "A proposição '{encontrada}' não corresponde à transformação esperada '{esperada}'",
+}
+
+SUCESSOS = {"passo_valido", "conclusao_deduzida", "grafo_gerado", "grafo_montado"}
+
+# Problemas que não invalidam a dedução
+AVISOS = {"graphviz_ausente"}
+
+
+def formatar_mensagem(codigo, passo, regra, args):
+    return MENSAGENS[codigo].format(passo=passo, regra=regra, **args)
+
+
+class Evento(namedtuple("Evento", ["codigo", "passo", "regra", "args"])):
+    """
+    Um registro do relatório: o código da mensagem, o passo e a regra a que se
+    refere (quando houver) e os argumentos usados para montar o texto.
+    """
+    __slots__ = ()
+
+    @property
+    def erro(self):
+        return self.codigo not in SUCESSOS and self.codigo not in AVISOS
+
+    @property
+    def mensagem(self):
+        return formatar_mensagem(self.codigo, self.passo, self.regra, self.args)
+
+    def __str__(self):
+        mensagem = self.mensagem
+        if not self.erro or self.passo is None:
+            return mensagem
+        if self.regra is None:
+            return f"Erro no passo {self.passo}: {mensagem}"
+        return f"Erro no passo {self.passo} ({self.regra}): {mensagem}"
+
+    def para_dict(self):
+        dados = {"codigo": self.codigo}
+        if self.passo is not None:
+            dados["passo"] = self.passo
+        if self.regra is not None:
+            dados["regra"] = self.regra
+        if self.args:
+            dados["args"] = {chave: _serializar(valor) for chave, valor in self.args.items()}
+        return dados
+
+
+def _serializar(valor):
+    if isinstance(valor, (str, int, float, bool)) or valor is None:
+        return valor
+    if isinstance(valor, (list, tuple)):
+        return [_serializar(v) for v in valor]
+    return str(valor)
+
+
+class PassoRelatorio:
+    """Situação de um passo: a regra usada, os passos citados e se foi aceito."""
+    __slots__ = ("passo", "conteudo", "regra", "referencias", "valido")
+
+    def __init__(self, passo, conteudo, regra=None, referencias=()):
+        self.passo = passo
+        self.conteudo = conteudo
+        self.regra = regra
+        self.referencias = referencias
+        self.valido = True
+
+    @property
+    def status(self):
+        return "ok" if self.valido else "erro"
+
+    def para_dict(self):
+        dados = {"passo": self.passo, "status": self.status}
+        if self.regra is not None:
+            dados["regra"] = self.regra
+        if self.referencias:
+            dados["referencias"] = list(self.referencias)
+        return dados
+
+
+class Relatorio:
+    """
+    Resultado estruturado de uma validação. Os eventos são apenas acrescentados
+    a uma lista; o texto em português só é montado quando o relatório é
+    convertido com str(), e para_json() gera uma versão compacta para pipelines.
+    """
+
+    def __init__(self):
+        self.valido = True
+        self.premissas = None
+        self.conclusao = None
+        self.passos = {}
+        self.eventos = []
+        self.tempos = {}
+        self.medicao = None
+
+    def __len__(self):
+        return len(self.eventos)
+
+    def iniciar(self, premissas, conclusao):
+        self.premissas = premissas
+        self.conclusao = conclusao
+
+    def adicionar_passo(self, passo, conteudo, regra=None, referencias=()):
+        self.passos[passo] = PassoRelatorio(passo, conteudo, regra, referencias)
+
+    def registrar(self, codigo, passo=None, regra=None, **args):
+        return self.acrescentar(Evento(codigo, passo, regra, args))
+
+    def acrescentar(self, evento):
+        """Acrescenta um evento já criado (por exemplo, guardado de uma validação anterior)."""
+        self.eventos.append(evento)
+        if evento.erro:
+            if evento.passo in self.passos:
+                self.passos[evento.passo].valido = False
+            self.valido = False
+        return evento
+
+    def registrar_erro(self, erro):
+        """Registra uma DeducaoInvalidaError."""
+        return self.registrar(erro.codigo, erro.passo, erro.regra, **erro.detalhes)
+
+    @property
+    def erros(self):
+        return [evento for evento in self.eventos if evento.erro]
+
+    def linhas(self):
+        """Gera o texto do relatório linha a linha."""
+        if self.premissas is not None:
+            yield "Processando a dedução..."
+            yield f"Premissas: {self.premissas}"
+            yield f"Conclusão: {self.conclusao}"
+            yield "Passos detectados:"
+            for item in self.passos.values():
+                yield f"{item.passo}: {item.conteudo}"
+        for evento in self.eventos:
+            yield str(evento)
+
+    def __str__(self):
+        return "".join(linha + "\n" for linha in self.linhas())
+
+    def para_dict(self):
+        dados = {"valido": self.valido}
+        if self.premissas is not None:
+            dados["premissas"] = self.premissas
+            dados["conclusao"] = self.conclusao
+            dados["passos"] = [item.para_dict() for item in self.passos.values()]
+        dados["eventos"] = [evento.para_dict() for evento in self.eventos]
+        if self.tempos:
+            dados["tempos"] = self.tempos
+        if self.medicao is not None:
+            dados["medicao"] = self.medicao.para_dict()
+        return dados
+
+    def para_json(self):
+        import json
+
+        return json.dumps(self.para_dict(), ensure_ascii=False, separators=(",", ":"))
+
+    def para_estado(self):
+        """
+        Estado completo do relatório em tipos do JSON (diferente de para_dict,
+        inclui o texto dos passos); Relatorio.de_estado remonta o relatório.
+        """
+        return {
+            "valido": self.valido,
+            "premissas": self.premissas,
+            "conclusao": self.conclusao,
+            "passos": [
+                [item.passo, item.conteudo, item.regra, list(item.referencias), item.valido]
+                for item in self.passos.values()
+            ],
+            "eventos": [
+                [evento.codigo, evento.passo, evento.regra,
+                 {chave: _serializar(valor) for chave, valor in evento.args.items()}]
+                for evento in self.eventos
+            ],
+        }
+
+    @classmethod
+    def de_estado(cls, estado):
+        relatorio = cls()
+        relatorio.valido = estado["valido"]
+        relatorio.premissas = estado["premissas"]
+        relatorio.conclusao = estado["conclusao"]
+        for passo, conteudo, regra, referencias, valido in estado["passos"]:
+            item = relatorio.passos[passo] = PassoRelatorio(passo, conteudo, regra, tuple(referencias))
+            item.valido = valido
+        relatorio.eventos = [Evento(codigo, passo, regra, args) for codigo, passo, regra, args in estado["eventos"]]
+        return relatorio
+
+    def __getstate__(self):
+        # Fórmulas nos argumentos viram texto ao atravessar processos
+        estado = self.__dict__.copy()
+        estado["eventos"] = [
+            evento._replace(args={chave: _serializar(valor) for chave, valor in evento.args.items()})
+            for evento in self.eventos
+        ]
+        return estado
+
+    def __setstate__(self, estado):
+        self.__dict__.update(estado)
@@ -0,0 +1,175 @@
+from collections import namedtuple
+
+from formulas import TabelaFormulas, ATOMO, NAO, E, OU, IMPLICA, EQUIVALE
+
+# Acima deste número de átomos a tabela-verdade (2^n valorações) fica grande demais
+LIMITE_ATOMOS = 22
+
+ResultadoSemantico = namedtuple("ResultadoSemantico", ["valido", "contraexemplo", "conclusao"])
+ResultadoSemantico.__doc__ = """
+Resultado da verificação de um sequente. Quando ele não é válido, `contraexemplo`
+é um dicionário átomo -> valor em que todas as premissas são verdadeiras e
+`conclusao` (a primeira conclusão falsa) é falsa; caso contrário ambos são None.
+"""
+
+
+class MuitosAtomosError(ValueError):
+    def __init__(self, quantidade):
+        self.quantidade = quantidade
+
+    def __str__(self):
+        return f"O sequente tem {self.quantidade} átomos; o limite da tabela-verdade é {LIMITE_ATOMOS}."
+
+
+def atomos(formulas):
+    """Devolve os nomes dos átomos das fórmulas, em ordem alfabética."""
+    nomes = set()
+    vistos = set()
+    pilha = list(formulas)
+    while pilha:
+        formula = pilha.pop()
+        if formula in vistos:
+            continue
+        vistos.add(formula)
+        if formula.op == ATOMO:
+            nomes.add(formula.nome)
+        else:
+            pilha.extend(formula.filhos)
+    return tuple(sorted(nomes))
+
+
+def padrao_atomo(indice, quantidade):
+    """
+    Coluna da tabela-verdade do átomo `indice` com `quantidade` átomos, como um
+    inteiro de 2^quantidade bits: o bit k vale 1 se o átomo é verdadeiro na valoração k
+    (isto é, se o bit `indice` de k é 1).
+    """
+    meio = 1 << indice
+    padrao = ((1 << meio) - 1) << meio
+    largura = meio << 1
+    total = 1 << quantidade
+    while largura < total:
+        padrao |= padrao << largura
+        largura <<= 1
+    return padrao
+
+
+class Avaliador:
+    """
+    Avalia fórmulas sobre todas as valorações de um conjunto fixo de átomos de
+    uma só vez. Cada fórmula vira um inteiro usado como vetor de bits (um bit por
+    valoração), de modo que ∧, ∨ e ¬ custam uma única operação sobre o vetor.
+    Subfórmulas já avaliadas são reaproveitadas.
+    """
+
+    def __init__(self, nomes):
+        if len(nomes) > LIMITE_ATOMOS:
+            raise MuitosAtomosError(len(nomes))
+        self.nomes = tuple(nomes)
+        self.mascara = (1 << (1 << len(self.nomes))) - 1
+        self._indices = {nome: i for i, nome in enumerate(self.nomes)}
+        self._valores = {}
+
+    def valor(self, formula):
+        """Devolve o vetor de bits da fórmula (bit k = valor na valoração k)."""
+        valores = self._valores
+        if formula in valores:
+            return valores[formula]
+
+        # Os nós da tabela são criados depois dos seus filhos, então ordenar as
+        # subfórmulas pendentes pelo id dá uma ordem de avaliação válida.
+        pendentes = []
+        pilha = [formula]
+        while pilha:
+            atual = pilha.pop()
+            if atual in valores:
+                continue
+            valores[atual] = None
+            pendentes.append(atual)
+            pilha.extend(atual.filhos)
+        pendentes.sort(key=lambda f: f.id)
+
+        mascara = self.mascara
+        for atual in pendentes:
+            op = atual.op
+            if op == ATOMO:
+                if atual.nome not in self._indices:
+                    raise ValueError(f"Átomo '{atual.nome}' fora do conjunto avaliado")
+                valor = padrao_atomo(self._indices[atual.nome], len(self.nomes))
+            elif op == NAO:
+                valor = mascara ^ valores[atual.filhos[0]]
+            else:
+                esquerda, direita = valores[atual.filhos[0]], valores[atual.filhos[1]]
+                if op == E:
+                    valor = esquerda & direita
+                elif op == OU:
+                    valor = esquerda | direita
+                elif op == IMPLICA:
+                    valor = (mascara ^ esquerda) | direita
+                elif op == EQUIVALE:
+                    valor = mascara ^ (esquerda ^ direita)
+                else:
+                    raise ValueError(f"Operador desconhecido: {op}")
+            valores[atual] = valor
+        return valores[formula]
+
+    def valoracao(self, indice):
+        """Converte o número de uma valoração em um dicionário átomo -> bool."""
+        return {nome: bool(indice >> i & 1) for i, nome in enumerate(self.nomes)}
+
+    def verificar(self, premissas, conclusoes):
+        """Verifica se as premissas acarretam cada uma das conclusões."""
+        modelos = self.mascara
+        for premissa in premissas:
+            modelos &= self.valor(premissa)
+            if not modelos:
+                break
+
+        for conclusao in conclusoes:
+            falhas = modelos & ~self.valor(conclusao)
+            if falhas:
+                # A valoração de menor número em que a conclusão falha
+                indice = (falhas & -falhas).bit_length() - 1
+                return ResultadoSemantico(False, self.valoracao(indice), conclusao)
+        return ResultadoSemantico(True, None, None)
+
+
+def _formulas(itens, tabela):
+    return [tabela.parse(item) if isinstance(item, str) else item for item in itens]
+
+
+def verificar_sequente(premissas, conclusoes, tabela=None):
+    """
+    Verifica pela tabela-verdade se premissas ⊢ conclusões é válido. Aceita
+    textos ou fórmulas já internadas em `tabela`.
+    """
+    tabela = tabela or TabelaFormulas()
+    premissas = _formulas(premissas, tabela)
+    conclusoes = _formulas(conclusoes, tabela)
+    return Avaliador(atomos(premissas + conclusoes)).verificar(premissas, conclusoes)
+
+
+def verificar_lote(sequentes, tabela=None):
+    """
+    Verifica vários sequentes (pares premissas, conclusões) de uma vez. As
+    fórmulas são internadas em uma única tabela e sequentes com os mesmos átomos
+    compartilham o avaliador, então subfórmulas repetidas no lote são avaliadas
+    uma só vez. Devolve um ResultadoSemantico por sequente, na ordem de entrada.
+    """
+    tabela = tabela or TabelaFormulas()
+    avaliadores = {}
+    resultados = []
+    for premissas, conclusoes in sequentes:
+        premissas = _formulas(premissas, tabela)
+        conclusoes = _formulas(conclusoes, tabela)
+        nomes = atomos(premissas + conclusoes)
+        avaliador = avaliadores.get(nomes)
+        if avaliador is None:
+            avaliador = avaliadores[nomes] = Avaliador(nomes)
+        resultados.append(avaliador.verificar(premissas, conclusoes))
+    return resultados
+
+
+def formatar_valoracao(valoracao):
+    """Texto de uma valoração, ex.: "P=V, Q=F"."""
+    return ", ".join(f"{nome}={'V' if valor else 'F'}" for nome, valor in valoracao.items())
@@ -0,0 +1,368 @@
+import os
+import re
+import sys
+import time
+import asyncio
+import multiprocessing
+from typing import List, Optional
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, HTTPException, Response
+from fastapi.responses import FileResponse
+from pydantic import BaseModel
+
+from motor_inferencia import validar
+from grafo import cache_grafos
+
+# Processos de validação (por padrão, um por núcleo)
+TRABALHADORES = int(os.environ.get("VALIDACAO_TRABALHADORES", os.cpu_count() or 1))
+
+# Um processo é substituído depois de tantas tarefas ou se passar da memória máxima
+TAREFAS_POR_TRABALHADOR = int(os.environ.get("VALIDACAO_TAREFAS", 1000))
+MEMORIA_MAXIMA_MB = float(os.environ.get("VALIDACAO_MEMORIA_MB", 512))
+
+# Tempo máximo (segundos) de uma validação; o pedido pode pedir menos, nunca mais
+TIMEOUT = float(os.environ.get("VALIDACAO_TIMEOUT", 30))
+
+# Limite de deduções por pedido em /validate/batch
+LOTE_MAXIMO = int(os.environ.get("VALIDACAO_LOTE_MAXIMO", 256))
+
+# Formas de devolver o SVG do grafo
+SVG_FORMAS = ("none", "inline", "ref")
+
+_CHAVE_GRAFO = re.compile(r"[0-9a-f]{64}")
+
+
+def memoria_residente():
+    """Memória residente do processo, em bytes (o pico, se o sistema não informar o valor atual)."""
+    try:
+        with open("/proc/self/statm") as arquivo:
+            return int(arquivo.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import resource
+    except ImportError:
+        return 0
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return pico if sys.platform == "darwin" else pico * 1024
+
+
+def executar_tarefa(premissas_e_conclusao, passos, svg="none"):
+    """Valida uma dedução no processo trabalhador e devolve o resultado já serializável."""
+    comeco = time.perf_counter()
+    valido, relatorio, grafo = validar(premissas_e_conclusao, passos, renderizar="off" if svg == "none" else "lazy")
+    resultado = {"valid": valido, "report": relatorio.para_dict()}
+    if grafo is not None:
+        try:
+            caminho = grafo.caminho
+        except FileNotFoundError:
+            resultado["svg_error"] = "Graphviz não está instalado."
+        else:
+            if svg == "inline":
+                with open(caminho, encoding="utf-8") as arquivo:
+                    resultado["svg"] = arquivo.read()
+            else:
+                resultado["svg_url"] = f"/graphs/{grafo.chave}"
+    resultado["time"] = time.perf_counter() - comeco
+    return resultado
+
+
+def _trabalhador(conexao):
+    """Laço de um processo trabalhador: recebe tarefas pela conexão até receber None."""
+    while True:
+        try:
+            tarefa = conexao.recv()
+        except (EOFError, KeyboardInterrupt):
+            return
+        if tarefa is None:
+            return
+        try:
+            resposta = ("ok", executar_tarefa(*tarefa))
+        except Exception as e:
+            resposta = ("erro", f"{type(e).__name__}: {e}")
+        conexao.send(resposta + (memoria_residente(),))
+
+
+class TrabalhadorMorto(Exception):
+    """O processo trabalhador terminou (ou foi encerrado) no meio de uma tarefa."""
+
+
+class Trabalhador:
+    """Um processo de validação e a conexão usada para lhe enviar tarefas."""
+
+    def __init__(self, contexto):
+        self.conexao, conexao_filho = contexto.Pipe()
+        self.processo = contexto.Process(target=_trabalhador, args=(conexao_filho,), daemon=True)
+        self.processo.start()
+        conexao_filho.close()
+        self.tarefas = 0
+
+    def executar(self, tarefa, timeout):
+        """Envia a tarefa e espera a resposta (bloqueante; roda em uma thread)."""
+        try:
+            self.conexao.send(tarefa)
+            if not self.conexao.poll(timeout):
+                raise TimeoutError(f"A validação passou de {timeout:g} s.")
+            return self.conexao.recv()
+        except TimeoutError:
+            raise
+        except (EOFError, OSError) as e:
+            raise TrabalhadorMorto("O processo de validação terminou inesperadamente.") from e
+
+    def encerrar(self, forcar=False):
+        if not forcar:
+            try:
+                self.conexao.send(None)
+            except OSError:
+                pass
+            self.processo.join(1)
+        if self.processo.is_alive():
+            self.processo.kill()
+            self.processo.join()
+        self.conexao.close()
+
+
+class PoolValidacao:
+    """
+    Pool de processos de validação criados de antemão. Cada pedido usa um
+    processo livre; um processo é substituído depois de `tarefas_maximas`
+    tarefas ou quando sua memória residente passa de `memoria_maxima` bytes, e
+    um processo que estoura o `timeout` é encerrado e substituído na hora.
+
+    Os processos nascem de um servidor de fork que já importou o validador
+    (quando o sistema permite), então substituir um processo é barato e não
+    copia as threads do serviço. A substituição roda em segundo plano; se o
+    novo processo não puder ser criado (por exemplo, o fork falha por falta de
+    memória), ela tenta de novo, com esperas crescentes, até conseguir.
+    `vivos` conta os processos em funcionamento, e um pedido espera por um
+    processo livre no máximo o seu `timeout`.
+    """
+
+    # Espera (segundos) antes de tentar de novo criar um processo; dobra a cada falha
+    ESPERA_MINIMA = 0.5
+    ESPERA_MAXIMA = 30.0
+
+    def __init__(self, trabalhadores=TRABALHADORES, tarefas_maximas=TAREFAS_POR_TRABALHADOR,
+                 memoria_maxima=MEMORIA_MAXIMA_MB * 1024 * 1024, timeout=TIMEOUT):
+        self.quantidade = max(1, trabalhadores)
+        self.tarefas_maximas = tarefas_maximas
+        self.memoria_maxima = memoria_maxima
+        self.timeout = timeout
+        self.reciclados = 0
+        self.encerrados = 0
+        self.falhas_reposicao = 0
+        self._todos = set()
+        self._livres = None
+        self._em_substituicao = set()  # Tarefas que substituem processos encerrados
+        if "forkserver" in multiprocessing.get_all_start_methods():
+            self._contexto = multiprocessing.get_context("forkserver")
+            # Módulos que faltarem (por exemplo, o graphviz) são ignorados no preload
+            preload = ["motor_inferencia", "grafo", "graphviz"]
+            self._contexto.set_forkserver_preload(preload + ([__name__] if __name__ != "__main__" else []))
+        else:
+            self._contexto = multiprocessing.get_context("spawn")
+
+    def _novo(self):
+        trabalhador = Trabalhador(self._contexto)
+        self._todos.add(trabalhador)
+        return trabalhador
+
+    def _encerrar(self, trabalhador, forcar):
+        self._todos.discard(trabalhador)
+        try:
+            trabalhador.encerrar(forcar)
+        except Exception:
+            # O processo já não está no pool; a falha não impede a reposição
+            self.falhas_reposicao += 1
+
+    def _repor(self, trabalhador, forcar):
+        """Encerra o processo e cria outro em segundo plano, fora do event loop; o pedido não espera."""
+        tarefa = asyncio.create_task(self._substituir_em_segundo_plano(trabalhador, forcar))
+        self._em_substituicao.add(tarefa)
+
+    async def _substituir_em_segundo_plano(self, trabalhador, forcar):
+        try:
+            await asyncio.to_thread(self._encerrar, trabalhador, forcar)
+            espera = self.ESPERA_MINIMA
+            while True:
+                try:
+                    novo = await asyncio.to_thread(self._novo)
+                except Exception:
+                    self.falhas_reposicao += 1
+                    await asyncio.sleep(espera)
+                    espera = min(espera * 2, self.ESPERA_MAXIMA)
+                else:
+                    break
+            self._livres.put_nowait(novo)
+        finally:
+            self._em_substituicao.discard(asyncio.current_task())
+
+    async def abrir(self):
+        self._livres = asyncio.Queue()
+        trabalhadores = await asyncio.to_thread(lambda: [self._novo() for _ in range(self.quantidade)])
+        for trabalhador in trabalhadores:
+            self._livres.put_nowait(trabalhador)
+
+    def fechar(self):
+        for tarefa in list(self._em_substituicao):
+            tarefa.cancel()
+        for trabalhador in list(self._todos):
+            trabalhador.encerrar()
+        self._todos.clear()
+
+    @property
+    def livres(self):
+        return self._livres.qsize() if self._livres is not None else 0
+
+    @property
+    def vivos(self):
+        return sum(trabalhador.processo.is_alive() for trabalhador in self._todos)
+
+    @property
+    def em_reposicao(self):
+        return len(self._em_substituicao)
+
+    async def executar(self, tarefa, timeout=None):
+        """
+        Executa `executar_tarefa(*tarefa)` em um processo livre. Levanta
+        TimeoutError se nenhum processo ficar livre ou se a validação passar
+        do prazo (cada espera tem o prazo inteiro) e TrabalhadorMorto se o processo cair.
+        """
+        timeout = min(timeout or self.timeout, self.timeout)
+        laco = asyncio.get_running_loop()
+        limite = laco.time() + timeout
+        while True:
+            try:
+                trabalhador = await asyncio.wait_for(self._livres.get(), max(0, limite - laco.time()))
+            except asyncio.TimeoutError:
+                raise TimeoutError(f"Nenhum processo de validação ficou livre em {timeout:g} s.") from None
+            if trabalhador.processo.is_alive():
+                break
+            # Processo que morreu enquanto estava livre (por exemplo, morto pelo sistema)
+            self.encerrados += 1
+            self._repor(trabalhador, True)
+        try:
+            status, resultado, memoria = await asyncio.to_thread(trabalhador.executar, tarefa, timeout)
+        except BaseException:
+            # Timeout, processo morto ou pedido cancelado: o processo pode estar ocupado
+            # e é encerrado (o pedido pode ter sido cancelado e não deve esperar)
+            self.encerrados += 1
+            self._repor(trabalhador, True)
+            raise
+
+        trabalhador.tarefas += 1
+        if trabalhador.tarefas >= self.tarefas_maximas or memoria > self.memoria_maxima:
+            self.reciclados += 1
+            self._repor(trabalhador, False)
+        else:
+            self._livres.put_nowait(trabalhador)
+
+        if status == "erro":
+            raise RuntimeError(resultado)
+        return resultado
+
+
+pool = PoolValidacao()
+
+
+@asynccontextmanager
+async def ciclo_de_vida(app):
+    await pool.abrir()
+    try:
+        yield
+    finally:
+        pool.fechar()
+
+
+app = FastAPI(lifespan=ciclo_de_vida)
+
+class ValidateRequest(BaseModel):
+    sequent: str
+    steps: str
+    svg: str = "none"
+    timeout: Optional[float] = None
+
+class ValidateResponse(BaseModel):
+    valid: Optional[bool] = None
+    report: Optional[dict] = None
+    svg: Optional[str] = None
+    svg_url: Optional[str] = None
+    svg_error: Optional[str] = None
+    time: Optional[float] = None
+    error: Optional[str] = None
+
+class BatchItem(BaseModel):
+    sequent: str
+    steps: str
+
+class BatchRequest(BaseModel):
+    items: List[BatchItem]
+    svg: str = "none"
+    timeout: Optional[float] = None
+
+class BatchResponse(BaseModel):
+    results: List[ValidateResponse]
+
+def verificar_svg(svg):
+    if svg not in SVG_FORMAS:
+        raise HTTPException(status_code=422, detail=f"svg deve ser um de {', '.join(SVG_FORMAS)}.")
+
+def erro_http(erro):
+    if isinstance(erro, TimeoutError):
+        return HTTPException(status_code=504, detail=str(erro))
+    return HTTPException(status_code=500, detail=f"Erro ao validar: {erro}")
+
+@app.post("/validate", response_model=ValidateResponse)
+async def validate(request: ValidateRequest):
+    """Valida uma dedução; o SVG do grafo vem no corpo (inline), por referência (ref) ou não é gerado."""
+    verificar_svg(request.svg)
+    try:
+        resultado = await pool.executar((request.sequent, request.steps, request.svg), request.timeout)
+    except (TimeoutError, TrabalhadorMorto, RuntimeError) as e:
+        raise erro_http(e)
+    return ValidateResponse(**resultado)
+
+@app.post("/validate/batch", response_model=BatchResponse)
+async def validate_batch(request: BatchRequest):
+    """
+    Valida várias deduções em paralelo, nos processos do pool, e devolve os
+    resultados na mesma ordem. Uma falha ou timeout afeta só o item correspondente.
+    """
+    verificar_svg(request.svg)
+    if len(request.items) > LOTE_MAXIMO:
+        raise HTTPException(status_code=413, detail=f"O lote tem {len(request.items)} deduções; o máximo é {LOTE_MAXIMO}.")
+
+    async def validar_item(item):
+        try:
+            resultado = await pool.executar((item.sequent, item.steps, request.svg), request.timeout)
+        except (TimeoutError, TrabalhadorMorto, RuntimeError) as e:
+            return ValidateResponse(error=erro_http(e).detail)
+        return ValidateResponse(**resultado)
+
+    resultados = await asyncio.gather(*(validar_item(item) for item in request.items))
+    return BatchResponse(results=list(resultados))
+
+@app.get("/graphs/{chave}")
+async def graph(chave: str):
+    """SVG de um grafo devolvido por referência (svg_url)."""
+    caminho = cache_grafos.obter(chave) if _CHAVE_GRAFO.fullmatch(chave) else None
+    if caminho is None:
+        raise HTTPException(status_code=404, detail="Grafo não encontrado.")
+    return FileResponse(caminho, media_type="image/svg+xml")
+
+@app.get("/health")
+async def health(response: Response):
+    """Estado do pool, para verificações de um balanceador de carga (503 sem nenhum processo vivo)."""
+    vivos = pool.vivos
+    if not vivos:
+        response.status_code = 503
+    return {
+        "workers": vivos,
+        "target": pool.quantidade,
+        "idle": pool.livres,
+        "replacing": pool.em_reposicao,
+        "recycled": pool.reciclados,
+        "killed": pool.encerrados,
+        "replacement_errors": pool.falhas_reposicao,
+    }